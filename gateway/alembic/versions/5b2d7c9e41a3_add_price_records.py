@@ -0,0 +1,50 @@
+"""add price records
+
+Revision ID: 5b2d7c9e41a3
+Revises: ee14c992abb8
+Create Date: 2025-08-10 11:20:41.903114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b2d7c9e41a3'
+down_revision: Union[str, Sequence[str], None] = 'ee14c992abb8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # range partitioned by month on date, monthly partitions are created on demand by the price store
+    op.create_table('price_records',
+    sa.Column('state_key', sa.String(length=100), nullable=False),
+    sa.Column('commodity_key', sa.String(length=100), nullable=False),
+    sa.Column('date', sa.Date(), nullable=False),
+    sa.Column('market_key', sa.String(length=150), nullable=False),
+    sa.Column('state', sa.String(length=100), nullable=False),
+    sa.Column('commodity', sa.String(length=100), nullable=False),
+    sa.Column('market', sa.String(length=150), nullable=False),
+    sa.Column('variety', sa.String(length=100), nullable=True),
+    sa.Column('min_price', sa.Integer(), nullable=False),
+    sa.Column('max_price', sa.Integer(), nullable=False),
+    sa.Column('modal_price', sa.Integer(), nullable=False),
+    sa.Column('fingerprint', sa.String(length=40), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('state_key', 'commodity_key', 'date', 'market_key'),
+    postgresql_partition_by='RANGE (date)'
+    )
+    op.create_index('ix_price_records_market_date', 'price_records', ['state_key', 'commodity_key', 'market_key', 'date'], unique=False)
+    op.create_index('ix_price_records_updated_at', 'price_records', ['state_key', 'commodity_key', 'updated_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_price_records_updated_at', table_name='price_records')
+    op.drop_index('ix_price_records_market_date', table_name='price_records')
+    # dropping the partitioned parent drops every monthly partition with it
+    op.drop_table('price_records')
@@ -0,0 +1,33 @@
+"""add price records change xid
+
+Revision ID: 9f3a6c2d8e15
+Revises: 5b2d7c9e41a3
+Create Date: 2025-08-14 09:42:17.530266
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9f3a6c2d8e15'
+down_revision: Union[str, Sequence[str], None] = '5b2d7c9e41a3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # id of the transaction that last wrote each row, the delta sync orders and fences on it
+    op.execute(
+        "ALTER TABLE price_records ADD COLUMN change_xid xid8 NOT NULL DEFAULT pg_current_xact_id()"
+    )
+    op.create_index('ix_price_records_change_xid', 'price_records', ['state_key', 'commodity_key', 'change_xid'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_price_records_change_xid', table_name='price_records')
+    op.drop_column('price_records', 'change_xid')
@@ -1,6 +1,26 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.api import api_router
+from app.core.config import config
+from app.core.http_client import get_http_client, close_http_client
+from app.services.crop_disease import shutdown_image_pool
+from app.services.price_scheduler import price_scheduler
+from app.services.remedy_cache import remedy_cache
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # open the pooled upstream http client once for the whole process
+    app.state.http_client = get_http_client()
+    # common remedies and disease name synonyms, so the first analyses already hit the remedy cache
+    remedy_cache.warm_up(config.REMEDY_SEED_FILE)
+    # keep watched prices fresh in the background, unless a separate price_worker does it
+    if config.PRICE_SCHEDULER_ENABLED:
+        price_scheduler.start()
+    yield
+    await price_scheduler.stop()
+    await close_http_client()
+    shutdown_image_pool()
 
 # Create FastAPI app
 app = FastAPI(
@@ -9,7 +29,7 @@ app = FastAPI(
     version="1.0.0",
     docs_url="/docs",
     redoc_url="/redoc",
-    # lifespan=lifespan
+    lifespan=lifespan
 )
 
 # CORS middleware
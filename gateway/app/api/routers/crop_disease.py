@@ -1,5 +1,7 @@
 from fastapi import APIRouter, Query, UploadFile, File, HTTPException
 from app.services.crop_disease import analyze_crop_disease
+from app.services.analysis_cache import analysis_cache
+from app.services.remedy_cache import remedy_cache
 from app.db.firestore import firestore_service
 import os
 import uuid
@@ -50,7 +52,7 @@ async def upload_crop_image(image: UploadFile = File(...)):
         # Store in Firestore
         doc_id = f"crop_images/{filename}"
         doc_ref = firestore_service.db.document(doc_id)
-        doc_ref.set(image_metadata)
+        await doc_ref.set(image_metadata)
         
         # Create local file path for temporary storage (for crop disease detection)
         local_path = f"/tmp/{filename}"
@@ -78,7 +80,11 @@ async def upload_crop_image(image: UploadFile = File(...)):
         }
 
 @router.post("/analyze")
-async def upload_and_analyze_crop_image(image: UploadFile = File(...)):
+async def upload_and_analyze_crop_image(
+        image: UploadFile = File(...),
+        mode: str = Query(None, pattern="^(combined|two_step)$", description="defaults to DISEASE_ANALYSIS_MODE"),
+        language: str = Query(None, description="remedy language, e.g. the farmer's preferred_language"),
+):
     """
     Upload a crop image and immediately perform disease detection analysis.
     
@@ -119,7 +125,7 @@ async def upload_and_analyze_crop_image(image: UploadFile = File(...)):
         # Store in Firestore
         doc_id = f"crop_images/{filename}"
         doc_ref = firestore_service.db.document(doc_id)
-        doc_ref.set(image_metadata)
+        await doc_ref.set(image_metadata)
         
         # Create local file path for temporary storage
         local_path = f"/tmp/{filename}"
@@ -129,7 +135,7 @@ async def upload_and_analyze_crop_image(image: UploadFile = File(...)):
             f.write(image_data)
         
         # Perform disease detection
-        disease_result = analyze_crop_disease(local_path)
+        disease_result = await analyze_crop_disease(local_path, mode=mode, language=language)
         
         # Clean up temporary file
         try:
@@ -186,7 +192,11 @@ async def upload_and_analyze_crop_image(image: UploadFile = File(...)):
         }
 
 @router.get("/detect")
-async def detect_crop_disease(image_path: str = Query(..., description="Path to the crop image file")):
+async def detect_crop_disease(
+        image_path: str = Query(..., description="Path to the crop image file"),
+        mode: str = Query(None, pattern="^(combined|two_step)$", description="defaults to DISEASE_ANALYSIS_MODE"),
+        language: str = Query(None, description="remedy language, e.g. the farmer's preferred_language"),
+):
     """
     Detect crop disease from an image and provide remedy information.
     
@@ -221,7 +231,7 @@ async def detect_crop_disease(image_path: str = Query(..., description="Path to
             }
         
         # Analyze crop disease
-        result = analyze_crop_disease(image_path)
+        result = await analyze_crop_disease(image_path, mode=mode, language=language)
         
         if result:
             return {
@@ -259,5 +269,7 @@ async def health_check():
     return {
         "status": "ok",
         "service": "crop-disease",
-        "message": "Crop disease detection service is running"
+        "message": "Crop disease detection service is running",
+        "analysis_cache": analysis_cache.stats(),
+        "remedy_cache": remedy_cache.stats()
     } 
\ No newline at end of file
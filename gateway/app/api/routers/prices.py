@@ -1,41 +1,79 @@
-from fastapi import APIRouter, Query
-from app.services.price_updater import CropPriceUpdater
+import asyncio
+import httpx
+from datetime import datetime, timedelta
+from fastapi import APIRouter, Query, Depends
+from app.core.config import config
+from app.core.http_client import get_http_client
+from app.services.price_updater import CropPriceUpdater, refresh_flight, upstream_breakers
+from app.services.price_rollups import price_rollups
+from app.services.price_scheduler import price_scheduler
+from app.services.price_screener import price_screener
+from app.services.price_store import price_store
+from app.services.price_sync import InvalidCursorError, sync_prices
 from app.db.firestore import firestore_service
+from app.db.price_storage import price_storage
+from app.models.price_record import BatchPriceRequest, PriceSyncRequest
 
 router = APIRouter()
 
 @router.get("/daily-prices")
-async def update_prices(
-        api_key: str = Query(...),
-        resource_id: str = Query(...),
+async def get_daily_prices(
         commodity: str = Query(...),
         state: str = Query(...),
         market: str = Query(None),
-        days_back: int = Query(0)
+        days_back: int = Query(0),
+        refresh: bool = Query(False, description="fetch from data.gov.in before reading"),
+        api_key: str = Query(None),
+        resource_id: str = Query(None),
+        http_client: httpx.AsyncClient = Depends(get_http_client)
 ):
+    """
+    Serve stored prices for a day. Watched commodities are kept fresh by the ingestion scheduler,
+    refresh=true pulls from data.gov.in first for anything outside the watchlist.
+    If the refresh can't complete within PRICE_REFRESH_DEADLINE_SECONDS, or upstream's circuit breaker is open,
+    the stored data is served as is and marked stale.
+    """
     try:
-        updater = CropPriceUpdater(
-            api_key=api_key,
-            resource_id=resource_id,
-            commodity=commodity,
-            state=state,
-            market=market,
-            days_back=days_back
-        )
-        
-        # This will fetch data and store in Firestore
-        await updater.update_daily_prices()
-        
-        # Fetch data from Firestore for the current date
-        from datetime import datetime, timedelta
         fetch_date = (datetime.today() - timedelta(days=days_back)).strftime("%Y-%m-%d")
+        stale_reason = None
+
+        if refresh:
+            updater = CropPriceUpdater(
+                api_key=api_key or config.DATA_GOV_API_KEY,
+                resource_id=resource_id or config.DATA_GOV_RESOURCE_ID,
+                commodity=commodity,
+                state=state,
+                market=market,
+                days_back=days_back,
+                client=http_client
+            )
+            if not updater.upstream_available():
+                stale_reason = "data.gov.in circuit breaker is open"
+            else:
+                try:
+                    # the refresh keeps running in the background if the deadline passes, see refresh_flight
+                    await asyncio.wait_for(updater.update_daily_prices(), timeout=config.PRICE_REFRESH_DEADLINE_SECONDS)
+                except asyncio.TimeoutError:
+                    stale_reason = f"refresh did not finish within {config.PRICE_REFRESH_DEADLINE_SECONDS:.0f}s"
+                except Exception as e:
+                    stale_reason = f"refresh failed: {e}"
+                if stale_reason:
+                    print(f"[PRICES] Serving stored prices for {commodity} in {state}: {stale_reason}")
         
-        # Get stored data from Firestore
-        stored_data = await firestore_service.get_price_records(
-            date_str=fetch_date,
-            state=state,
-            commodity=commodity
-        )
+        # A whole day is one snapshot document read, single markets and older days read the per-market documents
+        snapshot = None
+        if not market:
+            snapshot = await price_storage.get_price_snapshot(fetch_date, state, commodity)
+
+        if snapshot is not None:
+            stored_data = snapshot["records"]
+        else:
+            stored_data = await price_storage.get_price_records(
+                date_str=fetch_date,
+                state=state,
+                commodity=commodity,
+                market=market
+            )
         
         # Format the data as a list of markets with commodity values
         markets_data = []
@@ -53,13 +91,183 @@ async def update_prices(
         
         return {
             "status": "ok", 
-            "message": f"Updated prices for {commodity} in {state}",
+            "message": f"{'Updated prices' if refresh and not stale_reason else 'Prices'} for {commodity} in {state}",
             "data": markets_data,
-            "firestore_status": f"Data stored in Firestore. Retrieved {len(markets_data)} market records."
+            "summary": snapshot["summary"] if snapshot is not None else None,
+            "stale": stale_reason is not None,
+            "stale_reason": stale_reason,
+            "firestore_status": f"Retrieved {len(markets_data)} market records from Firestore."
+        }
+    except Exception as e:
+        return {"status": "failed", "error": str(e)}
+
+@router.post("/batch")
+async def get_batch_prices(request: BatchPriceRequest):
+    """
+    Stored prices for several (state, commodity, market?) keys on one day in a single call,
+    e.g. a farmer's crops across nearby mandis. Keys without a market return every market plus a summary.
+    """
+    try:
+        fetch_date = request.date or (datetime.today() - timedelta(days=request.days_back)).strftime("%Y-%m-%d")
+        results = await price_storage.get_price_records_batch(
+            fetch_date,
+            [(item.state, item.commodity, item.market) for item in request.items],
+        )
+        return {
+            "status": "ok",
+            "date": fetch_date,
+            "data": [
+                {
+                    "state": result["state"],
+                    "commodity": result["commodity"],
+                    "market": result["market"],
+                    "summary": result["summary"],
+                    "markets": [
+                        {
+                            "market": record.get("market"),
+                            "variety": record.get("variety"),
+                            "min_price": record.get("min_price"),
+                            "max_price": record.get("max_price"),
+                            "modal_price": record.get("modal_price"),
+                        }
+                        for record in result["records"]
+                    ],
+                }
+                for result in results
+            ],
         }
     except Exception as e:
         return {"status": "failed", "error": str(e)}
 
+@router.post("/sync")
+async def sync_price_changes(request: PriceSyncRequest):
+    """
+    Delta sync for offline clients: only the records inserted or changed since the cursor,
+    for the subscribed (state, commodity) pairs, plus a new cursor to send next time
+    """
+    try:
+        data = await sync_prices(
+            [(subscription.state, subscription.commodity) for subscription in request.subscriptions],
+            cursor=request.cursor,
+            since_days=request.since_days,
+        )
+        return {"status": "ok", **data}
+    except InvalidCursorError as e:
+        return {"status": "failed", "error": str(e), "reset_cursor": True}
+    except Exception as e:
+        return {"status": "failed", "error": str(e)}
+
+@router.get("/moving-average")
+async def get_moving_average(
+        commodity: str = Query(...),
+        state: str = Query(...),
+        market: str = Query(None),
+        window: int = Query(7, ge=1, le=365),
+        date: str = Query(None, description="last day of the window, YYYY-MM-DD, defaults to the latest day"),
+):
+    """
+    N-day moving average of modal prices per market
+    """
+    try:
+        partition = await price_store.ensure_loaded(state, commodity)
+        return {"status": "ok", "data": price_store.moving_average(partition, window, date, market)}
+    except Exception as e:
+        return {"status": "failed", "error": str(e)}
+
+@router.get("/spread")
+async def get_price_spread(
+        commodity: str = Query(...),
+        state: str = Query(...),
+        date: str = Query(None, description="YYYY-MM-DD, defaults to the latest day"),
+):
+    """
+    Min/max and spread of prices across markets on a day
+    """
+    try:
+        partition = await price_store.ensure_loaded(state, commodity)
+        return {"status": "ok", "data": price_store.spread(partition, date)}
+    except Exception as e:
+        return {"status": "failed", "error": str(e)}
+
+@router.get("/day-over-day")
+async def get_day_over_day(
+        commodity: str = Query(...),
+        state: str = Query(...),
+        market: str = Query(None),
+        date: str = Query(None, description="YYYY-MM-DD, defaults to the latest day"),
+):
+    """
+    Modal price change per market against its previous reported day
+    """
+    try:
+        partition = await price_store.ensure_loaded(state, commodity)
+        return {"status": "ok", "data": price_store.day_over_day(partition, date, market)}
+    except Exception as e:
+        return {"status": "failed", "error": str(e)}
+
+@router.get("/top-markets")
+async def get_top_markets(
+        commodity: str = Query(...),
+        state: str = Query(...),
+        k: int = Query(5, ge=1, le=100),
+        order: str = Query("cheapest", pattern="^(cheapest|expensive)$"),
+        date: str = Query(None, description="YYYY-MM-DD, defaults to the latest day"),
+):
+    """
+    Top-K cheapest or most expensive mandis by modal price
+    """
+    try:
+        partition = await price_store.ensure_loaded(state, commodity)
+        return {"status": "ok", "data": price_store.top_markets(partition, k, order == "cheapest", date)}
+    except Exception as e:
+        return {"status": "failed", "error": str(e)}
+
+@router.get("/trend")
+async def get_price_trend(
+        commodity: str = Query(...),
+        state: str = Query(...),
+        market: str = Query(None),
+        start: str = Query(None, description="YYYY-MM-DD, defaults to a year before end"),
+        end: str = Query(None, description="YYYY-MM-DD, defaults to today"),
+        granularity: str = Query(None, pattern="^(day|week|month)$", description="defaults to the coarsest that fits"),
+        min_points: int = Query(None, ge=1, le=366),
+):
+    """
+    Price trend over a date range from the weekly/monthly rollups, or daily snapshots for short windows
+    """
+    try:
+        end_date = datetime.strptime(end, "%Y-%m-%d").date() if end else datetime.today().date()
+        start_date = datetime.strptime(start, "%Y-%m-%d").date() if start else end_date - timedelta(days=365)
+        data = await price_rollups.trend(
+            state=state,
+            commodity=commodity,
+            start=start_date,
+            end=end_date,
+            market=market,
+            granularity=granularity,
+            min_points=min_points,
+        )
+        return {"status": "ok", "data": data}
+    except Exception as e:
+        return {"status": "failed", "error": str(e)}
+
+@router.get("/stats")
+async def get_price_stats():
+    """
+    Counters for the in-process price caches and the ingestion scheduler
+    """
+    return {
+        "status": "ok",
+        "data": {
+            "cache": price_storage.cache_stats(),
+            "columnar_store": price_store.stats(),
+            "screener": price_screener.stats(),
+            "refresh_coalescing": refresh_flight.stats(),
+            "upstream_breakers": upstream_breakers.stats(),
+            "scheduler": price_scheduler.status()
+        }
+    }
+
 @router.get("/sample-data")
 async def get_sample_data(
         commodity: str = Query("Wheat"),
@@ -132,7 +340,7 @@ async def cleanup_debug_data():
         # Delete the debug document
         debug_doc_path = "crops/uttar_pradesh/wheat/2025-07-26_debug"
         doc_ref = firestore_service.db.document(debug_doc_path)
-        doc_ref.delete()
+        await doc_ref.delete()
         
         return {
             "status": "ok",
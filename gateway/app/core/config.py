@@ -1,3 +1,4 @@
+import json
 import os
 from dotenv import load_dotenv
 
@@ -20,5 +21,95 @@ class Config:
     JWT_ACCESS_TOKEN_EXPIRE_MINUTES = os.getenv("JWT_ACCESS_TOKEN_EXPIRE_MINUTES", "30")
     JWT_REFRESH_TOKEN_EXPIRE_DAYS = os.getenv("JWT_REFRESH_TOKEN_EXPIRE_DAYS", "7")
 
+    # data.gov.in price api
+    PRICE_API_RATE_LIMIT = float(os.getenv("PRICE_API_RATE_LIMIT", 5))  # requests per second, 0 disables
+    PRICE_API_BURST = int(os.getenv("PRICE_API_BURST", 10))
+    PRICE_API_MAX_CONCURRENCY = int(os.getenv("PRICE_API_MAX_CONCURRENCY", 4))
+    PRICE_API_PAGE_SIZE = int(os.getenv("PRICE_API_PAGE_SIZE", 1000))
+    PRICE_STORE_CHUNK_SIZE = int(os.getenv("PRICE_STORE_CHUNK_SIZE", 500))
+    DATA_GOV_API_KEY = os.getenv("DATA_GOV_API_KEY", "")
+    DATA_GOV_RESOURCE_ID = os.getenv("DATA_GOV_RESOURCE_ID", "9ef84268-d588-465a-a308-a864a43d0070")
+    PRICE_API_DEADLINE_SECONDS = float(os.getenv("PRICE_API_DEADLINE_SECONDS", 8))  # per upstream request
+    PRICE_REFRESH_DEADLINE_SECONDS = float(os.getenv("PRICE_REFRESH_DEADLINE_SECONDS", 10))  # refresh inside a request
+    PRICE_API_BREAKER_FAILURES = int(os.getenv("PRICE_API_BREAKER_FAILURES", 5))
+    PRICE_API_BREAKER_RESET_SECONDS = float(os.getenv("PRICE_API_BREAKER_RESET_SECONDS", 30))
+    # per resource id failure thresholds, e.g. {"9ef84268-...": 3}
+    PRICE_API_BREAKER_THRESHOLDS = json.loads(os.getenv("PRICE_API_BREAKER_THRESHOLDS", "{}"))
+
+    # background price ingestion
+    PRICE_SCHEDULER_ENABLED = os.getenv("PRICE_SCHEDULER_ENABLED", "false").lower() == "true"
+    PRICE_WATCHLIST_FILE = os.getenv("PRICE_WATCHLIST_FILE", "price_watchlist.json")
+    PRICE_REFRESH_INTERVAL_SECONDS = int(os.getenv("PRICE_REFRESH_INTERVAL_SECONDS", 3600))
+    PRICE_SCHEDULER_CONCURRENCY = int(os.getenv("PRICE_SCHEDULER_CONCURRENCY", 4))
+    PRICE_REFRESH_COALESCE_SECONDS = float(os.getenv("PRICE_REFRESH_COALESCE_SECONDS", 60))  # identical refreshes share a result
+    PRICE_BACKFILL_CONCURRENCY = int(os.getenv("PRICE_BACKFILL_CONCURRENCY", 8))
+
+    # shared upstream http client
+    HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", 100))
+    HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", 20))
+    HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", 30))
+    HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", 30))
+    HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", 5))
+    HTTP_POOL_TIMEOUT = float(os.getenv("HTTP_POOL_TIMEOUT", 10))
+    HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "false").lower() == "true"
+
+    # where prices are stored: firestore, or postgres for the partitioned price_records table
+    PRICE_STORAGE_BACKEND = os.getenv("PRICE_STORAGE_BACKEND", "firestore").lower()
+
+    # crop disease analysis
+    GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.5-pro")
+    GEMINI_TIMEOUT_SECONDS = float(os.getenv("GEMINI_TIMEOUT_SECONDS", 45))  # per model call
+    GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", 16))  # model calls in flight per process
+    # combined: disease and remedy from one model call, two_step: detect then look up the remedy
+    DISEASE_ANALYSIS_MODE = os.getenv("DISEASE_ANALYSIS_MODE", "combined")
+    # remedies cached on normalised (disease, severity, language), in memory and in the remedy_cache collection
+    REMEDY_CACHE_TTL_SECONDS = float(os.getenv("REMEDY_CACHE_TTL_SECONDS", 30 * 86400))
+    REMEDY_CACHE_MAX_ENTRIES = int(os.getenv("REMEDY_CACHE_MAX_ENTRIES", 5000))
+    REMEDY_CACHE_PERSIST = os.getenv("REMEDY_CACHE_PERSIST", "true").lower() == "true"
+    REMEDY_SEED_FILE = os.getenv("REMEDY_SEED_FILE", "remedy_seed.json")  # synonyms and remedies loaded at startup
+    DEFAULT_REMEDY_LANGUAGE = os.getenv("DEFAULT_REMEDY_LANGUAGE", "english")
+    # analyses cached per image: exact content hash, then dHash within ANALYSIS_CACHE_MAX_DISTANCE of 64 bits
+    ANALYSIS_CACHE_ENABLED = os.getenv("ANALYSIS_CACHE_ENABLED", "true").lower() == "true"
+    ANALYSIS_CACHE_TTL_SECONDS = float(os.getenv("ANALYSIS_CACHE_TTL_SECONDS", 86400))
+    ANALYSIS_CACHE_MAX_ENTRIES = int(os.getenv("ANALYSIS_CACHE_MAX_ENTRIES", 2000))
+    ANALYSIS_CACHE_MAX_DISTANCE = int(os.getenv("ANALYSIS_CACHE_MAX_DISTANCE", 6))
+    # images are downscaled and re-encoded in a process pool before they are sent to the model
+    IMAGE_PREPROCESS_ENABLED = os.getenv("IMAGE_PREPROCESS_ENABLED", "true").lower() == "true"
+    IMAGE_PREPROCESS_WORKERS = int(os.getenv("IMAGE_PREPROCESS_WORKERS", min(4, os.cpu_count() or 1)))
+    IMAGE_MAX_EDGE = int(os.getenv("IMAGE_MAX_EDGE", 1536))  # pixels, longest side
+    IMAGE_FORMAT = os.getenv("IMAGE_FORMAT", "JPEG").upper()  # JPEG or WEBP
+    IMAGE_QUALITY = int(os.getenv("IMAGE_QUALITY", 85))
+    IMAGE_MIN_QUALITY = int(os.getenv("IMAGE_MIN_QUALITY", 50))
+    IMAGE_TARGET_BYTES = int(os.getenv("IMAGE_TARGET_BYTES", 400_000))  # 0 to encode at IMAGE_QUALITY regardless of size
+
+    # firestore
+    FIRESTORE_BATCH_SIZE = int(os.getenv("FIRESTORE_BATCH_SIZE", 500))
+    FIRESTORE_MAX_INFLIGHT_BATCHES = int(os.getenv("FIRESTORE_MAX_INFLIGHT_BATCHES", 4))
+    PRICE_FINGERPRINT_INDEX_SIZE = int(os.getenv("PRICE_FINGERPRINT_INDEX_SIZE", 200000))
+    PRICE_FINGERPRINT_TTL_SECONDS = float(os.getenv("PRICE_FINGERPRINT_TTL_SECONDS", 86400))
+
+    # price read cache
+    PRICE_CACHE_TTL_SECONDS = float(os.getenv("PRICE_CACHE_TTL_SECONDS", 900))
+    PRICE_CACHE_MAX_ENTRIES = int(os.getenv("PRICE_CACHE_MAX_ENTRIES", 10000))
+    PRICE_SYNC_PAGE_SIZE = int(os.getenv("PRICE_SYNC_PAGE_SIZE", 500))  # changed records per subscription per sync
+
+    # in-process columnar price store behind the analytics endpoints
+    PRICE_STORE_HISTORY_DAYS = int(os.getenv("PRICE_STORE_HISTORY_DAYS", 90))
+    PRICE_STORE_RELOAD_DAYS = int(os.getenv("PRICE_STORE_RELOAD_DAYS", 2))
+    PRICE_STORE_REFRESH_SECONDS = float(os.getenv("PRICE_STORE_REFRESH_SECONDS", 900))
+
+    # weekly/monthly rollups, /trend uses the coarsest granularity with at least this many points
+    PRICE_TREND_MIN_POINTS = int(os.getenv("PRICE_TREND_MIN_POINTS", 6))
+
+    # ingest-time anomaly screening, outliers go to the price_quarantine collection
+    PRICE_SCREEN_ENABLED = os.getenv("PRICE_SCREEN_ENABLED", "true").lower() == "true"
+    PRICE_SCREEN_WINDOW_DAYS = int(os.getenv("PRICE_SCREEN_WINDOW_DAYS", 30))
+    PRICE_SCREEN_MIN_HISTORY = int(os.getenv("PRICE_SCREEN_MIN_HISTORY", 5))  # days of history before scoring a market
+    PRICE_SCREEN_MAD_THRESHOLD = float(os.getenv("PRICE_SCREEN_MAD_THRESHOLD", 6.0))
+    # spread floor as a fraction of the median, so flat history doesn't turn ordinary price moves into outliers.
+    # With the threshold of 6 a market on quiet history is flagged once it is more than 30% off its median
+    # (after the day's common move across markets), wider when its own history is noisier
+    PRICE_SCREEN_MIN_SPREAD = float(os.getenv("PRICE_SCREEN_MIN_SPREAD", 0.05))
+
 
 config = Config()
\ No newline at end of file
@@ -0,0 +1,54 @@
+import httpx
+from typing import Optional
+from app.core.config import config
+
+# process-wide client, opened in the app lifespan and reused by every upstream call
+_client: Optional[httpx.AsyncClient] = None
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def create_http_client() -> httpx.AsyncClient:
+    """ build a keep-alive pooled client from config """
+    http2 = config.HTTP2_ENABLED
+    if http2 and not _http2_available():
+        print("[HTTP] HTTP2_ENABLED is set but the h2 package is not installed, falling back to HTTP/1.1")
+        http2 = False
+
+    return httpx.AsyncClient(
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=config.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=config.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=config.HTTP_KEEPALIVE_EXPIRY,
+        ),
+        timeout=httpx.Timeout(
+            config.HTTP_TIMEOUT,
+            connect=config.HTTP_CONNECT_TIMEOUT,
+            pool=config.HTTP_POOL_TIMEOUT,
+        ),
+    )
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Dependency to get the shared http client.
+    Created lazily so scripts that run outside the app lifespan can use it too.
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        _client = create_http_client()
+    return _client
+
+
+async def close_http_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
@@ -1,8 +1,15 @@
 import firebase_admin
-from firebase_admin import credentials, firestore
-from typing import List, Dict, Any
-from datetime import date
+from firebase_admin import credentials, firestore, firestore_async
+from google.cloud.firestore_v1.field_path import FieldPath
+from typing import List, Dict, Any, Optional, Tuple
+import asyncio
+import hashlib
+import json
+import statistics
+from datetime import date, datetime, timedelta
 import os
+from app.core.config import config
+from app.utils.cache import TTLCache
 
 # Initialize Firebase Admin SDK
 try:
@@ -42,13 +49,69 @@ except Exception as e:
     # Initialize without credentials (will use default)
     firebase_admin.initialize_app()
 
-# Get Firestore client
-db = firestore.client()
+# Get the async Firestore client, so reads and writes never block the event loop
+db = firestore_async.client()
 
 class FirestoreService:
     def __init__(self):
         self.db = db
         self.collection_name = "crops"  # Updated to match new structure
+        # one pre-aggregated document per (state, commodity, date), see _merge_snapshot
+        self.snapshot_collection = "price_snapshots"
+        self.quarantine_collection = "price_quarantine"
+        # firestore caps a batched write at 500 operations
+        self.batch_size = min(500, config.FIRESTORE_BATCH_SIZE)
+        self.max_inflight_batches = max(1, config.FIRESTORE_MAX_INFLIGHT_BATCHES)
+        # doc path -> content fingerprint of what we last wrote or read, lets re-ingestion skip unchanged records
+        self.fingerprints = TTLCache(
+            maxsize=config.PRICE_FINGERPRINT_INDEX_SIZE, ttl=config.PRICE_FINGERPRINT_TTL_SECONDS
+        )
+        # read-through cache for get_price_records, keyed on the normalised query
+        self.price_cache = TTLCache(maxsize=config.PRICE_CACHE_MAX_ENTRIES, ttl=config.PRICE_CACHE_TTL_SECONDS)
+        # snapshot paths this process has seen merged successfully, others are repaired on the next ingest
+        self.complete_snapshots = TTLCache(
+            maxsize=config.PRICE_CACHE_MAX_ENTRIES, ttl=config.PRICE_FINGERPRINT_TTL_SECONDS
+        )
+
+    def _build_price_document(self, record: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+        """
+        Build the document path and payload for a price record.
+
+        Structure: crops/{state}/{commodity}/{date}_{market}
+        """
+        # Convert date to string for document ID
+        date_str = record['date']
+        if isinstance(date_str, date):
+            date_str = date_str.strftime("%Y-%m-%d")
+
+        # Create document path: crops/{state}/{commodity}/{date}_{market}
+        state = self._path_key(record['state'])
+        commodity = self._path_key(record['commodity'])
+        market = self._path_key(record['market'])
+        doc_id = f"{date_str}_{market}"
+
+        doc_path = f"crops/{state}/{commodity}/{doc_id}"
+
+        # Prepare data for Firestore
+        firestore_data = {
+            'date': date_str,
+            'market': record['market'],
+            'commodity': record['commodity'],
+            'state': record['state'],
+            'variety': record.get('variety'),
+            'min_price': record['min_price'],
+            'max_price': record['max_price'],
+            'modal_price': record['modal_price'],
+        }
+        firestore_data['fingerprint'] = self._fingerprint(firestore_data)
+        firestore_data['timestamp'] = firestore.SERVER_TIMESTAMP
+        return doc_path, firestore_data
+
+    @staticmethod
+    def _fingerprint(firestore_data: Dict[str, Any]) -> str:
+        """ stable hash of a record's content, excludes the write timestamp """
+        canonical = json.dumps(firestore_data, sort_keys=True, separators=(',', ':'), default=str)
+        return hashlib.sha1(canonical.encode('utf-8')).hexdigest()
 
     async def store_price_record(self, record: Dict[str, Any]) -> bool:
         """
@@ -57,40 +120,14 @@ class FirestoreService:
         Structure: crops/{state}/{commodity}/{date}_{market}/data
         """
         try:
-            print(f"[FIRESTORE DEBUG] Attempting to store record: {record}")
-            
-            # Convert date to string for document ID
-            date_str = record['date']
-            if isinstance(date_str, date):
-                date_str = date_str.strftime("%Y-%m-%d")
-            
-            # Create document path: crops/{state}/{commodity}/{date}_{market}
-            state = record['state'].replace(" ", "_").lower()
-            commodity = record['commodity'].replace(" ", "_").lower()
-            market = record['market'].replace(" ", "_").lower()
-            doc_id = f"{date_str}_{market}"
-            
-            doc_path = f"crops/{state}/{commodity}/{doc_id}"
-            print(f"[FIRESTORE DEBUG] Document path: {doc_path}")
-            
-            # Prepare data for Firestore
-            firestore_data = {
-                'date': date_str,
-                'market': record['market'],
-                'commodity': record['commodity'],
-                'state': record['state'],
-                'variety': record.get('variety'),
-                'min_price': record['min_price'],
-                'max_price': record['max_price'],
-                'modal_price': record['modal_price'],
-                'timestamp': firestore.SERVER_TIMESTAMP
-            }
-            
-            print(f"[FIRESTORE DEBUG] Firestore data: {firestore_data}")
-            
+            doc_path, firestore_data = self._build_price_document(record)
+
             # Store in Firestore using the hierarchical path
             doc_ref = self.db.document(doc_path)
-            doc_ref.set(firestore_data)
+            await doc_ref.set(firestore_data)
+            self._invalidate_price_cache(firestore_data)
+            self.fingerprints.set(doc_path, firestore_data['fingerprint'])
+            await self._update_snapshots([firestore_data])
             
             print(f"[FIRESTORE] Successfully stored record: {doc_path}")
             return True
@@ -101,80 +138,568 @@ class FirestoreService:
             traceback.print_exc()
             return False
 
+    async def _load_stored_fingerprints(self, doc_paths: List[str]) -> Dict[str, Any]:
+        """
+        Read the stored fingerprint of each document in one get_all round trip.
+        Documents that don't exist map to None.
+        """
+        stored = {}
+        refs = [self.db.document(doc_path) for doc_path in doc_paths]
+        async for snapshot in self.db.get_all(refs, field_paths=['fingerprint']):
+            doc_path = snapshot.reference.path
+            # snapshot.get raises KeyError for a missing field, documents from before fingerprints have none
+            stored[doc_path] = ((snapshot.to_dict() or {}).get('fingerprint') or '') if snapshot.exists else None
+        return stored
+
     async def store_price_records(self, records: List[Dict[str, Any]]) -> Dict[str, int]:
         """
-        Store multiple price records in Firestore.
-        Returns success and failure counts.
+        Store multiple price records in Firestore using batched writes.
+        Records whose fingerprint matches the stored document are skipped, the rest are grouped into
+        batches of up to FIRESTORE_BATCH_SIZE writes with up to FIRESTORE_MAX_INFLIGHT_BATCHES commits in flight.
+        Returns success/failure counts plus how many records were inserted, updated or unchanged.
         """
         success_count = 0
         failure_count = 0
-        
+
+        # build documents up front so a malformed record only fails itself
+        documents = {}
+        records_per_doc = {}
         for record in records:
-            if await self.store_price_record(record):
+            try:
+                doc_path, firestore_data = self._build_price_document(record)
+                documents[doc_path] = firestore_data
+                records_per_doc[doc_path] = records_per_doc.get(doc_path, 0) + 1
                 success_count += 1
-            else:
+            except Exception as e:
+                print(f"[FIRESTORE ERROR] Skipping malformed record {record}: {e}")
                 failure_count += 1
-        
+
+        # records that map to the same document collapse into one write, the last one wins
+        # skip documents the local fingerprint index already knows are unchanged
+        unchanged = {
+            doc_path for doc_path, firestore_data in documents.items()
+            if self.fingerprints.get(doc_path) == firestore_data['fingerprint']
+        }
+        unknown = [doc_path for doc_path in documents if doc_path not in unchanged]
+
+        # fall back to the fingerprints stored in firestore for the rest
+        inserted = set()
+        try:
+            stored = await self._load_stored_fingerprints(unknown) if unknown else {}
+        except Exception as e:
+            print(f"[FIRESTORE ERROR] Failed to read stored fingerprints, rewriting {len(unknown)} records: {e}")
+            stored = {}
+        for doc_path in unknown:
+            stored_fingerprint = stored.get(doc_path, '')
+            if stored_fingerprint is None:
+                inserted.add(doc_path)
+            elif stored_fingerprint == documents[doc_path]['fingerprint']:
+                unchanged.add(doc_path)
+                self.fingerprints.set(doc_path, stored_fingerprint)
+
+        doc_items = [(doc_path, data) for doc_path, data in documents.items() if doc_path not in unchanged]
+        semaphore = asyncio.Semaphore(self.max_inflight_batches)
+
+        async def commit_chunk(chunk: List[Tuple[str, Dict[str, Any]]]) -> List[str]:
+            """ commit one batch, returns the paths of documents that failed """
+            batch = self.db.batch()
+            for doc_path, firestore_data in chunk:
+                batch.set(self.db.document(doc_path), firestore_data)
+
+            async with semaphore:
+                try:
+                    await batch.commit()
+                    print(f"[FIRESTORE] Committed batch of {len(chunk)} records")
+                except Exception as e:
+                    print(f"[FIRESTORE ERROR] Failed to commit batch of {len(chunk)} records: {e}")
+                    return [doc_path for doc_path, _ in chunk]
+
+            # only once committed, a read that overlapped the commit sees the new generation and isn't cached
+            for doc_path, firestore_data in chunk:
+                self._invalidate_price_cache(firestore_data)
+                self.fingerprints.set(doc_path, firestore_data['fingerprint'])
+            return []
+
+        failed_paths = set()
+        for chunk_failures in await asyncio.gather(*(
+            commit_chunk(doc_items[start:start + self.batch_size])
+            for start in range(0, len(doc_items), self.batch_size)
+        )):
+            failed_paths.update(chunk_failures)
+
+        # fold the documents that were actually written into their daily snapshots, unchanged ones repair
+        # snapshots that are missing or that a failed merge left behind
+        await self._update_snapshots(
+            [data for doc_path, data in doc_items if doc_path not in failed_paths],
+            [documents[doc_path] for doc_path in unchanged],
+        )
+
+        failed = sum(records_per_doc[doc_path] for doc_path in failed_paths)
+        success_count -= failed
+        failure_count += failed
+
+        def count(doc_paths) -> int:
+            return sum(records_per_doc[doc_path] for doc_path in doc_paths if doc_path not in failed_paths)
+
+        written = {doc_path for doc_path, _ in doc_items}
         return {
             'success': success_count,
             'failure': failure_count,
-            'total': len(records)
+            'total': len(records),
+            'inserted': count(inserted),
+            'updated': count(written - inserted),
+            'unchanged': count(unchanged),
         }
 
-    async def get_price_records(self, date_str: str, state: str = None, commodity: str = None) -> List[Dict[str, Any]]:
+    def _snapshot_path(self, date_str: str, state: str, commodity: str) -> str:
+        """ Structure: price_snapshots/{state}/{commodity}/{date} """
+        return f"{self.snapshot_collection}/{self._path_key(state)}/{self._path_key(commodity)}/{date_str}"
+
+    @staticmethod
+    def _snapshot_entry(firestore_data: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            'market': firestore_data['market'],
+            'variety': firestore_data.get('variety'),
+            'min_price': firestore_data['min_price'],
+            'max_price': firestore_data['max_price'],
+            'modal_price': firestore_data['modal_price'],
+        }
+
+    @staticmethod
+    def _snapshot_summary(markets: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        """ summary stats over every market in a snapshot """
+        modal = [entry['modal_price'] for entry in markets.values()]
+        if not modal:
+            return {'market_count': 0}
+        return {
+            'market_count': len(modal),
+            'median_modal_price': statistics.median(modal),
+            'min_price': min(entry['min_price'] for entry in markets.values()),
+            'max_price': max(entry['max_price'] for entry in markets.values()),
+            'min_modal_price': min(modal),
+            'max_modal_price': max(modal),
+            'modal_range': max(modal) - min(modal),
+        }
+
+    async def _read_day_markets(self, date_str: str, state: str, commodity: str,
+                                transaction=None) -> Dict[str, Dict[str, Any]]:
+        """ snapshot markets for a day built from its per-market documents, for missing or incomplete snapshots """
+        day = self.db.collection(f"crops/{self._path_key(state)}/{self._path_key(commodity)}").where('date', '==', date_str)
+        markets = {}
+        async for doc in day.stream(transaction=transaction):
+            record = doc.to_dict()
+            markets[self._path_key(record['market'])] = self._snapshot_entry(record)
+        return markets
+
+    async def _merge_snapshot(self, snapshot_path: str, updates: List[Dict[str, Any]]):
         """
-        Retrieve price records from Firestore using the new hierarchical structure.
+        Merge written price documents into their daily snapshot inside a transaction,
+        so concurrent ingests for the same day don't drop each other's markets.
+
+        A snapshot that is missing or not marked complete is rebuilt from the day's per-market documents
+        first, so it never holds just the markets of one ingest.
+        """
+        snapshot_ref = self.db.document(snapshot_path)
+        first = updates[0]
+
+        @firestore.async_transactional
+        async def merge(transaction):
+            current = await snapshot_ref.get(transaction=transaction)
+            data = (current.to_dict() or {}) if current.exists else {}
+            if data.get('complete'):
+                markets = data.get('markets') or {}
+            else:
+                markets = await self._read_day_markets(
+                    first['date'], first['state'], first['commodity'], transaction=transaction
+                )
+            for firestore_data in updates:
+                markets[self._path_key(firestore_data['market'])] = self._snapshot_entry(firestore_data)
+            transaction.set(snapshot_ref, {
+                'date': first['date'],
+                'state': first['state'],
+                'commodity': first['commodity'],
+                'markets': markets,
+                'summary': self._snapshot_summary(markets),
+                'complete': True,
+                'timestamp': firestore.SERVER_TIMESTAMP,
+            })
+
+        await merge(self.db.transaction())
+
+    async def _update_snapshots(self, written: List[Dict[str, Any]], unchanged: List[Dict[str, Any]] = ()):
+        """
+        Update the snapshot of every (state, commodity, date) touched by a write. Unchanged documents
+        are merged too when their snapshot isn't known to be complete, so an ingest that writes nothing
+        still repairs a snapshot a failed merge left behind.
+        """
+        groups: Dict[str, List[Dict[str, Any]]] = {}
+        for firestore_data in written:
+            snapshot_path = self._snapshot_path(firestore_data['date'], firestore_data['state'], firestore_data['commodity'])
+            groups.setdefault(snapshot_path, []).append(firestore_data)
+        for firestore_data in unchanged:
+            snapshot_path = self._snapshot_path(firestore_data['date'], firestore_data['state'], firestore_data['commodity'])
+            if snapshot_path not in self.complete_snapshots:
+                groups.setdefault(snapshot_path, []).append(firestore_data)
+        if not groups:
+            return
+
+        semaphore = asyncio.Semaphore(self.max_inflight_batches)
+
+        async def update(snapshot_path: str, updates: List[Dict[str, Any]]):
+            async with semaphore:
+                try:
+                    await self._merge_snapshot(snapshot_path, updates)
+                    self.complete_snapshots.set(snapshot_path, True)
+                except Exception as e:
+                    print(f"[FIRESTORE ERROR] Failed to update snapshot {snapshot_path}: {e}")
+                    self.complete_snapshots.invalidate(snapshot_path)
+                    try:
+                        # readers fall back to the per-market query until the next ingest rebuilds it
+                        await self.db.document(snapshot_path).update({'complete': False})
+                    except Exception:
+                        pass  # missing snapshots aren't trusted anyway
+            # a read between the document commit and the merge may have cached the old snapshot,
+            # directly or as the records of the day's (state, commodity) query
+            first = updates[0]
+            self.price_cache.invalidate(('snapshot', snapshot_path))
+            self.price_cache.invalidate(self._price_cache_key(first['date'], first['state'], first['commodity']))
+
+        await asyncio.gather(*(update(path, updates) for path, updates in groups.items()))
+
+    async def store_quarantined_records(self, records: List[Dict[str, Any]]) -> int:
+        """
+        Store rows rejected by the ingest screener for review, keyed by state, commodity, date and market
+        so re-ingesting the same bad row overwrites it. Returns how many were stored.
+
+        Structure: price_quarantine/{state}_{commodity}_{date}_{market}
         """
+        stored = 0
+        for start in range(0, len(records), self.batch_size):
+            chunk = records[start:start + self.batch_size]
+            batch = self.db.batch()
+            for record in chunk:
+                doc_id = "_".join(
+                    self._path_key(str(record[field])) for field in ('state', 'commodity', 'date', 'market')
+                )
+                batch.set(
+                    self.db.document(f"{self.quarantine_collection}/{doc_id}"),
+                    {**record, 'timestamp': firestore.SERVER_TIMESTAMP},
+                )
+            try:
+                await batch.commit()
+                stored += len(chunk)
+            except Exception as e:
+                print(f"[FIRESTORE ERROR] Failed to store {len(chunk)} quarantined records: {e}")
+        return stored
+
+    @staticmethod
+    def _path_key(value: str) -> str:
+        """ normalise a state/commodity/market name into a path segment """
+        return value.replace(" ", "_").lower()
+
+    def _price_cache_key(self, date_str: str, state: str = None, commodity: str = None, market: str = None) -> Tuple:
+        return (
+            self._path_key(state) if state else None,
+            self._path_key(commodity) if commodity else None,
+            date_str,
+            self._path_key(market) if market else None,
+        )
+
+    def _invalidate_price_cache(self, firestore_data: Dict[str, Any]):
+        """ drop every cached query whose answer could include this document """
+        date_str = firestore_data['date']
+        state = firestore_data['state']
+        commodity = firestore_data['commodity']
+        market = firestore_data['market']
+        for key in (
+            self._price_cache_key(date_str, state, commodity, market),
+            self._price_cache_key(date_str, state, commodity),
+            self._price_cache_key(date_str, state, market=market),
+            self._price_cache_key(date_str, state),
+            self._price_cache_key(date_str),
+            ('snapshot', self._snapshot_path(date_str, state, commodity)),
+        ):
+            self.price_cache.invalidate(key)
+
+    def cache_stats(self) -> Dict[str, Any]:
+        return self.price_cache.stats()
+
+    @staticmethod
+    def _doc_to_record(doc) -> Dict[str, Any]:
+        record = doc.to_dict()
+        record['id'] = doc.id
+        return record
+
+    async def _read_snapshot(self, date_str: str, state: str, commodity: str) -> Optional[Dict[str, Any]]:
+        doc = await self.db.document(self._snapshot_path(date_str, state, commodity)).get()
+        return self._snapshot_from_doc(doc)
+
+    def _snapshot_from_doc(self, doc) -> Optional[Dict[str, Any]]:
+        """ records for every market plus the summary, None if the snapshot doesn't exist or isn't complete """
+        if not doc.exists:
+            return None
+        snapshot = doc.to_dict()
+        if not snapshot.get('complete'):
+            return None
+        markets = snapshot.get('markets') or {}
+        records = []
+        for market_key, entry in sorted(markets.items()):
+            record = dict(entry)
+            record.update({
+                'date': snapshot['date'],
+                'state': snapshot['state'],
+                'commodity': snapshot['commodity'],
+                'id': f"{snapshot['date']}_{market_key}",
+            })
+            records.append(record)
+        return {
+            'date': snapshot['date'],
+            'state': snapshot['state'],
+            'commodity': snapshot['commodity'],
+            'records': records,
+            'summary': snapshot.get('summary') or self._snapshot_summary(markets),
+        }
+
+    async def get_price_snapshot(self, date_str: str, state: str, commodity: str) -> Optional[Dict[str, Any]]:
+        """
+        The pre-aggregated snapshot for one (state, commodity, date) in a single document read:
+        records for every market plus summary stats. None when there is no complete snapshot yet.
+        """
+        cache_key = ('snapshot', self._snapshot_path(date_str, state, commodity))
+        cached = self.price_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        generation = self.price_cache.generation(cache_key)
         try:
-            records = []
-            
-            if state and commodity:
-                # Query specific state and commodity
-                state_path = state.replace(" ", "_").lower()
-                commodity_path = commodity.replace(" ", "_").lower()
-                collection_ref = self.db.collection(f"crops/{state_path}/{commodity_path}")
-                
-                # Get all documents in this collection
-                docs = collection_ref.stream()
-                for doc in docs:
-                    record = doc.to_dict()
-                    record['id'] = doc.id
-                    # Only include records for the specified date
-                    if record.get('date') == date_str:
-                        records.append(record)
-                        
-            elif state:
-                # Query all commodities for a specific state
-                state_path = state.replace(" ", "_").lower()
-                state_ref = self.db.collection(f"crops/{state_path}")
-                
-                # Get all commodity collections
-                commodity_collections = state_ref.list_collections()
-                for commodity_collection in commodity_collections:
-                    commodity_docs = commodity_collection.stream()
-                    for doc in commodity_docs:
-                        record = doc.to_dict()
-                        record['id'] = doc.id
-                        if record.get('date') == date_str:
-                            records.append(record)
-                            
+            snapshot = await self._read_snapshot(date_str, state, commodity)
+        except Exception as e:
+            print(f"[FIRESTORE ERROR] Failed to read snapshot: {e}")
+            return None
+
+        if snapshot is not None:
+            self.price_cache.set(cache_key, snapshot, generation=generation)
+        return snapshot
+
+    def _price_doc_path(self, date_str: str, state: str, commodity: str, market: str) -> str:
+        return f"crops/{self._path_key(state)}/{self._path_key(commodity)}/{date_str}_{self._path_key(market)}"
+
+    async def get_price_records_batch(
+            self,
+            date_str: str,
+            keys: List[Tuple[str, str, Optional[str]]],
+    ) -> List[Dict[str, Any]]:
+        """
+        Resolve many (state, commodity, market) lookups for one date, in the order given.
+
+        Keys with a market read that market's document, keys without one read the day's snapshot.
+        Answers not in the price cache are fetched together in one get_all round trip. Days stored
+        without a complete snapshot fall back to the per-commodity query, concurrently.
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(keys)
+        pending: Dict[str, List[int]] = {}
+        # cache generation of each pending document, taken before the read
+        generations: Dict[str, int] = {}
+
+        for i, (state, commodity, market) in enumerate(keys):
+            if market:
+                cache_key = self._price_cache_key(date_str, state, commodity, market)
+                cached = self.price_cache.get(cache_key)
+                if cached is not None:
+                    results[i] = {'records': list(cached), 'summary': None}
+                    continue
+                doc_path = self._price_doc_path(date_str, state, commodity, market)
             else:
-                # Query all records for the date (expensive operation)
-                print("[WARNING] Querying all records without state/commodity filter")
-                all_collections = self.db.collection_group(self.collection_name)
-                docs = all_collections.where('date', '==', date_str).stream()
-                
-                for doc in docs:
-                    record = doc.to_dict()
-                    record['id'] = doc.id
-                    records.append(record)
-            
-            return records
-            
+                doc_path = self._snapshot_path(date_str, state, commodity)
+                cache_key = ('snapshot', doc_path)
+                cached = self.price_cache.get(cache_key)
+                if cached is not None:
+                    results[i] = {'records': cached['records'], 'summary': cached['summary']}
+                    continue
+            pending.setdefault(doc_path, []).append(i)
+            generations.setdefault(doc_path, self.price_cache.generation(cache_key))
+
+        documents = {}
+        if pending:
+            async for doc in self.db.get_all([self.db.document(doc_path) for doc_path in pending]):
+                documents[doc.reference.path] = doc
+
+        missing_snapshots = []
+        for doc_path, indexes in pending.items():
+            doc = documents.get(doc_path)
+            state, commodity, market = keys[indexes[0]]
+            if market:
+                records = [self._doc_to_record(doc)] if doc is not None and doc.exists else []
+                self.price_cache.set(
+                    self._price_cache_key(date_str, state, commodity, market), records, generation=generations[doc_path]
+                )
+                answer = {'records': records, 'summary': None}
+            else:
+                snapshot = self._snapshot_from_doc(doc) if doc is not None else None
+                if snapshot is None:
+                    missing_snapshots.append(indexes)
+                    continue
+                self.price_cache.set(('snapshot', doc_path), snapshot, generation=generations[doc_path])
+                answer = {'records': snapshot['records'], 'summary': snapshot['summary']}
+            for i in indexes:
+                results[i] = answer
+
+        async def fallback(indexes: List[int]):
+            state, commodity, _ = keys[indexes[0]]
+            records = await self.get_price_records(date_str, state=state, commodity=commodity)
+            for i in indexes:
+                results[i] = {'records': records, 'summary': None}
+
+        await asyncio.gather(*(fallback(indexes) for indexes in missing_snapshots))
+
+        return [
+            {'state': state, 'commodity': commodity, 'market': market, **result}
+            for (state, commodity, market), result in zip(keys, results)
+        ]
+
+    async def get_price_records(
+            self,
+            date_str: str,
+            state: str = None,
+            commodity: str = None,
+            market: str = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Retrieve price records from Firestore using the new hierarchical structure.
+        Answers are served from the in-process price cache when possible.
+        """
+        cache_key = self._price_cache_key(date_str, state, commodity, market)
+        cached = self.price_cache.get(cache_key)
+        if cached is not None:
+            return list(cached)
+
+        generation = self.price_cache.generation(cache_key)
+        try:
+            records = await self._query_price_records(date_str, state, commodity, market)
         except Exception as e:
             print(f"[FIRESTORE ERROR] Failed to retrieve records: {e}")
             return []
 
+        self.price_cache.set(cache_key, records, generation=generation)
+        return list(records)
+
+    async def _query_price_records(
+            self,
+            date_str: str,
+            state: str = None,
+            commodity: str = None,
+            market: str = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Query price records from Firestore.
+        The date and market predicates run inside Firestore, so cost follows the size of the answer.
+        """
+        records = []
+        
+        if state and commodity:
+            state_path = self._path_key(state)
+            commodity_path = self._path_key(commodity)
+
+            if market:
+                # document ids are {date}_{market}, so a single market is a direct lookup
+                doc_path = f"crops/{state_path}/{commodity_path}/{date_str}_{self._path_key(market)}"
+                doc = await self.db.document(doc_path).get()
+                if doc.exists:
+                    records.append(self._doc_to_record(doc))
+            else:
+                # one snapshot document answers the whole day, days without a complete snapshot fall back to the query
+                snapshot = await self._read_snapshot(date_str, state, commodity)
+                if snapshot is not None:
+                    return snapshot['records']
+
+                query = self.db.collection(f"crops/{state_path}/{commodity_path}").where('date', '==', date_str)
+                async for doc in query.stream():
+                    records.append(self._doc_to_record(doc))
+                    
+        elif state:
+            # Query all commodities for a specific state, one filtered query per commodity in parallel
+            state_path = self._path_key(state)
+            state_ref = self.db.document(f"crops/{state_path}")
+
+            async def query_commodity(commodity_collection) -> List[Dict[str, Any]]:
+                query = commodity_collection.where('date', '==', date_str)
+                return [self._doc_to_record(doc) async for doc in query.stream()]
+
+            commodity_collections = [collection async for collection in state_ref.collections()]
+            if market:
+                # the {date}_{market} document in each commodity, keyed on the normalised market like the cache
+                refs = [c.document(f"{date_str}_{self._path_key(market)}") for c in commodity_collections]
+                async for doc in self.db.get_all(refs):
+                    if doc.exists:
+                        records.append(self._doc_to_record(doc))
+            else:
+                for commodity_records in await asyncio.gather(*(query_commodity(c) for c in commodity_collections)):
+                    records.extend(commodity_records)
+                        
+        else:
+            # Query all records for the date (expensive operation)
+            print("[WARNING] Querying all records without state/commodity filter")
+            all_collections = self.db.collection_group(self.collection_name)
+            docs = all_collections.where('date', '==', date_str).stream()
+            
+            async for doc in docs:
+                records.append(self._doc_to_record(doc))
+        
+        return records
+
+    async def get_price_changes(
+            self,
+            state: str,
+            commodity: str,
+            after_timestamp: datetime,
+            after_id: str = "",
+            limit: int = 500,
+            since: Optional[datetime] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Price records for a state and commodity written after (after_timestamp, after_id), oldest first.
+        Ties on the write timestamp are broken by document id, so a batch committed with one timestamp
+        can be paged through without skipping records. `since` is implied: the position is itself a
+        write timestamp no earlier than the subscription's first sync.
+        """
+        collection_ref = self.db.collection(f"crops/{self._path_key(state)}/{self._path_key(commodity)}")
+        query = collection_ref.order_by('timestamp').order_by(FieldPath.document_id())
+        if after_id:
+            query = query.start_after({'timestamp': after_timestamp, '__name__': after_id})
+        else:
+            query = query.where('timestamp', '>', after_timestamp)
+        return [self._doc_to_record(doc) async for doc in query.limit(limit).stream()]
+
+    async def get_price_records_range(
+            self,
+            start_date: str,
+            end_date: str,
+            state: str,
+            commodity: str,
+            market: str = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Retrieve price records for a state and commodity between two dates (inclusive), ordered by date.
+
+        The date range alone is served by Firestore's automatic single field index. A market turns into
+        direct gets of its {date}_{market} documents, one per day, so no composite index is needed for
+        any commodity collection. Errors are raised, an empty list means there is no data.
+        """
+        collection_ref = self.db.collection(f"crops/{self._path_key(state)}/{self._path_key(commodity)}")
+        if market:
+            start = datetime.strptime(start_date, "%Y-%m-%d").date()
+            days = (datetime.strptime(end_date, "%Y-%m-%d").date() - start).days + 1
+            market_key = self._path_key(market)
+            refs = [
+                collection_ref.document(f"{(start + timedelta(days=offset)).strftime('%Y-%m-%d')}_{market_key}")
+                for offset in range(max(days, 0))
+            ]
+            records = [self._doc_to_record(doc) async for doc in self.db.get_all(refs) if doc.exists]
+            return sorted(records, key=lambda record: record['date'])
+
+        query = collection_ref.where('date', '>=', start_date).where('date', '<=', end_date).order_by('date')
+        return [self._doc_to_record(doc) async for doc in query.stream()]
+
 # Global instance
 firestore_service = FirestoreService()
 
@@ -0,0 +1,44 @@
+from sqlalchemy import Column, Date, DateTime, Index, Integer, String, func, text
+from sqlalchemy.types import UserDefinedType
+
+from ..models.base import Base
+
+
+class XID8(UserDefinedType):
+    """ postgres 64 bit transaction id """
+    cache_ok = True
+
+    def get_col_spec(self, **kw):
+        return "xid8"
+
+
+class MarketPrice(Base):
+    """
+    Daily mandi price for one (state, commodity, market), the Postgres price storage backend.
+    The *_key columns hold the normalised names used for lookups, partitioned by month on date.
+    """
+    __tablename__ = "price_records"
+    __table_args__ = (
+        Index("ix_price_records_market_date", "state_key", "commodity_key", "market_key", "date"),
+        Index("ix_price_records_updated_at", "state_key", "commodity_key", "updated_at"),
+        Index("ix_price_records_change_xid", "state_key", "commodity_key", "change_xid"),
+        {"postgresql_partition_by": "RANGE (date)"},
+    )
+
+    state_key = Column(String(100), primary_key=True)
+    commodity_key = Column(String(100), primary_key=True)
+    date = Column(Date, primary_key=True)
+    market_key = Column(String(150), primary_key=True)
+    state = Column(String(100), nullable=False)
+    commodity = Column(String(100), nullable=False)
+    market = Column(String(150), nullable=False)
+    variety = Column(String(100), nullable=True)
+    min_price = Column(Integer, nullable=False)
+    max_price = Column(Integer, nullable=False)
+    modal_price = Column(Integer, nullable=False)
+    fingerprint = Column(String(40), nullable=False)
+    updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    # transaction that last wrote the row, orders the delta sync independently of commit timing
+    change_xid = Column(XID8, nullable=False, server_default=text("pg_current_xact_id()"))
+
+    pass
@@ -1,4 +1,5 @@
 from .base import Base
 
 from .user import User
-from .farmer import FarmerProfile
\ No newline at end of file
+from .farmer import FarmerProfile
+from .price import MarketPrice
\ No newline at end of file
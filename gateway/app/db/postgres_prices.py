@@ -0,0 +1,415 @@
+import asyncio
+import csv
+import io
+import statistics
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Set, Tuple, Union
+
+from app.db.firestore import FirestoreService, firestore_service
+from app.db.session import engine
+
+COLUMNS = (
+    "state_key", "commodity_key", "date", "market_key",
+    "state", "commodity", "market", "variety",
+    "min_price", "max_price", "modal_price", "fingerprint",
+)
+RECORD_FIELDS = (
+    "date", "state", "commodity", "market", "variety", "min_price", "max_price", "modal_price", "updated_at",
+)
+GRANULARITIES = {"day": "day", "week": "week", "month": "month"}
+
+
+def select_fields(prefix: str = "") -> str:
+    """ the RECORD_FIELDS columns, dates formatted as YYYY-MM-DD """
+    return ", ".join(
+        f"to_char({prefix}date, 'YYYY-MM-DD')" if field == "date" else f"{prefix}{field}" for field in RECORD_FIELDS
+    )
+
+
+def _path_key(value: str) -> str:
+    return FirestoreService._path_key(value)
+
+
+class PostgresPriceStore:
+    """
+    Price storage backend on the gateway's Postgres database, selected with PRICE_STORAGE_BACKEND=postgres.
+
+    Mirrors the FirestoreService price interface. Rows live in the month partitioned price_records table,
+    writes go through COPY into a temp table and one INSERT .. ON CONFLICT upsert, which only touches rows
+    whose fingerprint changed. Range and aggregate queries run in the database. psycopg2 is blocking,
+    so every call runs in a worker thread.
+    """
+
+    def __init__(self):
+        self.engine = engine
+        self._partitions: Set[date] = set()
+
+    # writes
+
+    def _ensure_partitions(self, cursor, months: Set[date]) -> Set[date]:
+        """
+        Create the monthly partitions a load needs, returns the months it checked. Callers record them
+        in self._partitions only after their transaction commits, a rollback also drops the partitions.
+
+        Concurrent CREATE TABLE IF NOT EXISTS .. PARTITION OF for the same month can still fail on the
+        catalog, so creation takes a transaction scoped advisory lock per month: a second loader waits
+        for the first to commit and then finds the partition there.
+        """
+        missing = months - self._partitions
+        for month in sorted(missing):
+            name = f"price_records_y{month.year}m{month.month:02d}"
+            next_month = date(month.year + month.month // 12, month.month % 12 + 1, 1)
+            cursor.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", (name,))
+            cursor.execute(
+                f"CREATE TABLE IF NOT EXISTS {name} "
+                f"PARTITION OF price_records FOR VALUES FROM ('{month}') TO ('{next_month}')"
+            )
+        return missing
+
+    def _row(self, record: Dict[str, Any]) -> Tuple:
+        date_str = record['date']
+        if isinstance(date_str, date):
+            date_str = date_str.strftime("%Y-%m-%d")
+        fingerprint = FirestoreService._fingerprint({
+            'date': date_str,
+            'market': record['market'],
+            'commodity': record['commodity'],
+            'state': record['state'],
+            'variety': record.get('variety'),
+            'min_price': record['min_price'],
+            'max_price': record['max_price'],
+            'modal_price': record['modal_price'],
+        })
+        return (
+            _path_key(record['state']), _path_key(record['commodity']), date_str, _path_key(record['market']),
+            record['state'], record['commodity'], record['market'], record.get('variety'),
+            int(record['min_price']), int(record['max_price']), int(record['modal_price']), fingerprint,
+        )
+
+    def _store_sync(self, rows: List[Tuple]) -> Tuple[int, int]:
+        """ COPY rows into a temp table and upsert them, returns (inserted, updated) """
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow(row)
+        buffer.seek(0)
+
+        columns = ", ".join(COLUMNS)
+        assignments = ", ".join(f"{column} = EXCLUDED.{column}" for column in COLUMNS[4:])
+        connection = self.engine.raw_connection()
+        try:
+            with connection.cursor() as cursor:
+                months = self._ensure_partitions(
+                    cursor, {datetime.strptime(row[2], "%Y-%m-%d").date().replace(day=1) for row in rows}
+                )
+                cursor.execute(
+                    "CREATE TEMP TABLE price_records_load (LIKE price_records INCLUDING DEFAULTS) ON COMMIT DROP"
+                )
+                # an unquoted empty CSV field is NULL, which is how csv.writer writes a None variety
+                cursor.copy_expert(f"COPY price_records_load ({columns}) FROM STDIN WITH (FORMAT csv)", buffer)
+                cursor.execute(
+                    f"INSERT INTO price_records ({columns}) SELECT {columns} FROM price_records_load "
+                    f"ON CONFLICT (state_key, commodity_key, date, market_key) "
+                    f"DO UPDATE SET {assignments}, updated_at = now(), change_xid = pg_current_xact_id() "
+                    f"WHERE price_records.fingerprint IS DISTINCT FROM EXCLUDED.fingerprint "
+                    f"RETURNING (xmax = 0)"
+                )
+                written = [inserted for (inserted,) in cursor.fetchall()]
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            connection.close()
+
+        self._partitions |= months
+        inserted = sum(1 for flag in written if flag)
+        return inserted, len(written) - inserted
+
+    async def store_price_records(self, records: List[Dict[str, Any]]) -> Dict[str, int]:
+        """
+        Upsert price records. Records for the same (state, commodity, date, market) collapse into one row,
+        the last one wins. Same counts as FirestoreService.store_price_records.
+        """
+        rows = {}
+        failure_count = 0
+        for record in records:
+            try:
+                row = self._row(record)
+            except Exception as e:
+                print(f"[POSTGRES ERROR] Skipping malformed record {record}: {e}")
+                failure_count += 1
+                continue
+            rows[row[:4]] = row
+
+        stored = len(records) - failure_count
+        if not rows:
+            return {'success': 0, 'failure': failure_count, 'total': len(records),
+                    'inserted': 0, 'updated': 0, 'unchanged': 0}
+
+        try:
+            inserted, updated = await asyncio.to_thread(self._store_sync, list(rows.values()))
+        except Exception as e:
+            print(f"[POSTGRES ERROR] Failed to store {len(rows)} price records: {e}")
+            return {'success': 0, 'failure': len(records), 'total': len(records),
+                    'inserted': 0, 'updated': 0, 'unchanged': 0}
+
+        print(f"[POSTGRES] Stored {len(rows)} price rows ({inserted} inserted, {updated} updated)")
+        # counts are per row, duplicates within the load count as unchanged
+        return {
+            'success': stored,
+            'failure': failure_count,
+            'total': len(records),
+            'inserted': inserted,
+            'updated': updated,
+            'unchanged': stored - inserted - updated,
+        }
+
+    async def store_price_record(self, record: Dict[str, Any]) -> bool:
+        result = await self.store_price_records([record])
+        return result['success'] == 1
+
+    async def store_quarantined_records(self, records: List[Dict[str, Any]]) -> int:
+        # quarantined rows are for review only, they stay in firestore whichever backend holds prices
+        return await firestore_service.store_quarantined_records(records)
+
+    # reads
+
+    def _query_sync(self, sql: str, params: Dict[str, Any]) -> List[Tuple]:
+        connection = self.engine.raw_connection()
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(sql, params)
+                rows = cursor.fetchall()
+            connection.commit()
+            return rows
+        finally:
+            connection.close()
+
+    async def _query(self, sql: str, params: Dict[str, Any]) -> List[Tuple]:
+        return await asyncio.to_thread(self._query_sync, sql, params)
+
+    @staticmethod
+    def _to_record(row: Tuple) -> Dict[str, Any]:
+        record = dict(zip(RECORD_FIELDS, row))
+        record['timestamp'] = record.pop('updated_at')
+        record['id'] = f"{record['date']}_{_path_key(record['market'])}"
+        return record
+
+    @staticmethod
+    def _filters(state: str = None, commodity: str = None, market: str = None) -> Tuple[str, Dict[str, Any]]:
+        clauses, params = [], {}
+        for column, value in (("state_key", state), ("commodity_key", commodity), ("market_key", market)):
+            if value:
+                clauses.append(f"{column} = %({column})s")
+                params[column] = _path_key(value)
+        return "".join(f" AND {clause}" for clause in clauses), params
+
+    async def get_price_records(
+            self,
+            date_str: str,
+            state: str = None,
+            commodity: str = None,
+            market: str = None,
+    ) -> List[Dict[str, Any]]:
+        filters, params = self._filters(state, commodity, market)
+        try:
+            rows = await self._query(
+                f"SELECT {select_fields()} FROM price_records WHERE date = %(date)s{filters} ORDER BY market_key",
+                {"date": date_str, **params},
+            )
+        except Exception as e:
+            print(f"[POSTGRES ERROR] Failed to retrieve records: {e}")
+            return []
+        return [self._to_record(row) for row in rows]
+
+    @staticmethod
+    def _summary(records: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """ the same summary stats as the firestore snapshot documents """
+        modal = [record['modal_price'] for record in records]
+        return {
+            'market_count': len(records),
+            'median_modal_price': statistics.median(modal),
+            'min_price': min(record['min_price'] for record in records),
+            'max_price': max(record['max_price'] for record in records),
+            'min_modal_price': min(modal),
+            'max_modal_price': max(modal),
+            'modal_range': max(modal) - min(modal),
+        }
+
+    async def get_price_snapshot(self, date_str: str, state: str, commodity: str) -> Optional[Dict[str, Any]]:
+        """ every market for a day plus summary stats, None if nothing is stored for the day """
+        records = await self.get_price_records(date_str, state=state, commodity=commodity)
+        if not records:
+            return None
+        return {'date': date_str, 'state': state, 'commodity': commodity,
+                'records': records, 'summary': self._summary(records)}
+
+    async def get_price_records_batch(
+            self,
+            date_str: str,
+            keys: List[Tuple[str, str, Optional[str]]],
+    ) -> List[Dict[str, Any]]:
+        """ resolve many (state, commodity, market) lookups for one date in a single query, in the order given """
+        values = ", ".join(f"(%(i{i})s, %(s{i})s, %(c{i})s, %(m{i})s::text)" for i in range(len(keys)))
+        params: Dict[str, Any] = {"date": date_str}
+        for i, (state, commodity, market) in enumerate(keys):
+            params.update({
+                f"i{i}": i,
+                f"s{i}": _path_key(state),
+                f"c{i}": _path_key(commodity),
+                f"m{i}": _path_key(market) if market else None,
+            })
+        rows = await self._query(
+            f"SELECT k.idx, {select_fields('p.')} "
+            f"FROM (VALUES {values}) AS k(idx, state_key, commodity_key, market_key) "
+            f"JOIN price_records p ON p.state_key = k.state_key AND p.commodity_key = k.commodity_key "
+            f"AND (k.market_key IS NULL OR p.market_key = k.market_key) "
+            f"WHERE p.date = %(date)s ORDER BY k.idx, p.market_key",
+            params,
+        )
+
+        records: List[List[Dict[str, Any]]] = [[] for _ in keys]
+        for row in rows:
+            records[row[0]].append(self._to_record(row[1:]))
+
+        return [
+            {
+                'state': state,
+                'commodity': commodity,
+                'market': market,
+                'records': key_records,
+                'summary': self._summary(key_records) if not market and key_records else None,
+            }
+            for (state, commodity, market), key_records in zip(keys, records)
+        ]
+
+    async def get_price_records_range(
+            self,
+            start_date: str,
+            end_date: str,
+            state: str,
+            commodity: str,
+            market: str = None,
+    ) -> List[Dict[str, Any]]:
+        """ records between two dates (inclusive) ordered by date, pruned to the months' partitions """
+        filters, params = self._filters(state, commodity, market)
+        try:
+            rows = await self._query(
+                f"SELECT {select_fields()} FROM price_records "
+                f"WHERE date BETWEEN %(start)s AND %(end)s{filters} ORDER BY date, market_key",
+                {"start": start_date, "end": end_date, **params},
+            )
+        except Exception as e:
+            print(f"[POSTGRES ERROR] Failed to retrieve records for range {start_date}..{end_date}: {e}")
+            return []
+        return [self._to_record(row) for row in rows]
+
+    async def get_price_changes(
+            self,
+            state: str,
+            commodity: str,
+            after: Union[datetime, int],
+            after_id: str = "",
+            limit: int = 500,
+            since: Optional[datetime] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Records changed after a sync position, oldest first, each with its change_xid as the next position.
+
+        updated_at is the writing transaction's start time, so a long load that commits after a shorter
+        one would fall behind a timestamp watermark. Rows are ordered by the writing transaction id instead
+        and only returned once every transaction before it has finished: change_xid below the snapshot's
+        xmin. Rows of transactions still in flight are held back rather than skipped. `after` is a
+        change_xid from a previous page, or a datetime for a subscription's first sync.
+
+        `since` is the subscription's updated_at lower bound. It applies on every page, so later pages
+        don't pick up rows older than the first sync asked for just because their xid is higher.
+        """
+        filters, params = self._filters(state, commodity)
+        if isinstance(after, datetime):
+            since = max(since, after) if since else after
+            conditions = []
+        else:
+            conditions = ["(change_xid, to_char(date, 'YYYY-MM-DD') || '_' || market_key) > (%(after)s::text::xid8, %(after_id)s)"]
+            after = str(after)
+        if since is not None:
+            conditions.append("updated_at > %(since)s")
+        conditions.append("change_xid < pg_snapshot_xmin(pg_current_snapshot())")
+        rows = await self._query(
+            f"SELECT {select_fields()}, change_xid::text FROM price_records "
+            f"WHERE {' AND '.join(conditions)}{filters} "
+            f"ORDER BY change_xid, date, market_key LIMIT %(limit)s",
+            {"after": after, "after_id": after_id, "since": since, "limit": limit, **params},
+        )
+        records = []
+        for row in rows:
+            record = self._to_record(row[:-1])
+            record['change_xid'] = int(row[-1])
+            records.append(record)
+        return records
+
+    async def get_price_aggregates(
+            self,
+            state: str,
+            commodity: str,
+            start_date: str,
+            end_date: str,
+            granularity: str,
+            market: str = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Per day, week or month stats in one grouped query: distinct days and markets, mean of the daily
+        cross-market mean modal price, modal quartiles and the min/max price.
+        """
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"granularity must be one of {', '.join(GRANULARITIES)}")
+        filters, params = self._filters(state, commodity, market)
+        rows = await self._query(
+            f"""
+            WITH daily AS (
+                SELECT date_trunc(%(granularity)s, date)::date AS period_start, date,
+                       count(*) AS observations, avg(modal_price) AS mean_modal,
+                       min(min_price) AS min_price, max(max_price) AS max_price
+                FROM price_records
+                WHERE date BETWEEN %(start)s AND %(end)s{filters}
+                GROUP BY 1, 2
+            ), periods AS (
+                SELECT date_trunc(%(granularity)s, date)::date AS period_start,
+                       count(DISTINCT market_key) AS market_count,
+                       percentile_cont(ARRAY[0.25, 0.5, 0.75]) WITHIN GROUP (ORDER BY modal_price) AS quartiles
+                FROM price_records
+                WHERE date BETWEEN %(start)s AND %(end)s{filters}
+                GROUP BY 1
+            )
+            SELECT d.period_start, count(*), p.market_count, sum(d.observations), avg(d.mean_modal),
+                   p.quartiles, min(d.min_price), max(d.max_price)
+            FROM daily d JOIN periods p USING (period_start)
+            GROUP BY d.period_start, p.market_count, p.quartiles
+            ORDER BY d.period_start
+            """,
+            {"granularity": GRANULARITIES[granularity], "start": start_date, "end": end_date, **params},
+        )
+        return [
+            {
+                'period_start': period_start,
+                'days': int(days),
+                'market_count': int(market_count),
+                'observations': int(observations),
+                'mean_modal_price': round(float(mean_modal), 2),
+                'p25_modal_price': float(quartiles[0]),
+                'median_modal_price': float(quartiles[1]),
+                'p75_modal_price': float(quartiles[2]),
+                'min_price': int(min_price),
+                'max_price': int(max_price),
+            }
+            for period_start, days, market_count, observations, mean_modal, quartiles, min_price, max_price in rows
+        ]
+
+    def cache_stats(self) -> Dict[str, Any]:
+        # reads go straight to postgres, there is no in-process price cache for this backend
+        return {'backend': 'postgres'}
+
+
+# Global instance
+postgres_price_store = PostgresPriceStore()
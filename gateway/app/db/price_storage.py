@@ -0,0 +1,17 @@
+from app.core.config import config
+from app.db.firestore import firestore_service
+
+
+def _select_backend():
+    """ the price storage backend named by PRICE_STORAGE_BACKEND, firestore or postgres """
+    backend = config.PRICE_STORAGE_BACKEND
+    if backend == "postgres":
+        from app.db.postgres_prices import postgres_price_store
+        return postgres_price_store
+    if backend != "firestore":
+        raise ValueError(f"unknown PRICE_STORAGE_BACKEND {backend!r}, expected firestore or postgres")
+    return firestore_service
+
+
+# Global instance, what the price services and endpoints read from and write to
+price_storage = _select_backend()
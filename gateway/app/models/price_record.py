@@ -1,5 +1,6 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
+from pydantic import Field
 from datetime import date
 
 class PriceRecord(BaseModel):
@@ -10,3 +11,36 @@ class PriceRecord(BaseModel):
     min_price: int
     max_price: int
     modal_price: int
+
+
+class WatchlistEntry(BaseModel):
+    """ a (state, commodity, market) tuple the ingestion scheduler keeps fresh """
+    state: str
+    commodity: str
+    market: Optional[str] = None
+    interval_seconds: Optional[int] = Field(None, gt=0)  # falls back to PRICE_REFRESH_INTERVAL_SECONDS
+    lookback_days: int = Field(1, ge=0)  # also refresh the previous days, mandis report late
+
+
+class PriceLookupKey(BaseModel):
+    """ one (state, commodity, market?) lookup in a batch, no market means every market """
+    state: str
+    commodity: str
+    market: Optional[str] = None
+
+
+class BatchPriceRequest(BaseModel):
+    items: List[PriceLookupKey] = Field(..., min_length=1, max_length=50)
+    date: Optional[str] = None  # YYYY-MM-DD, defaults to today minus days_back
+    days_back: int = Field(0, ge=0)
+
+
+class SyncSubscription(BaseModel):
+    state: str
+    commodity: str
+
+
+class PriceSyncRequest(BaseModel):
+    cursor: Optional[str] = None  # opaque, returned by the previous sync
+    subscriptions: List[SyncSubscription] = Field(..., min_length=1, max_length=50)
+    since_days: int = Field(7, ge=1, le=90)  # how far back a subscription without a watermark starts
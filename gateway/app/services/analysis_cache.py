@@ -0,0 +1,102 @@
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from app.core.config import config
+from app.utils.cache import TTLCache
+from app.utils.single_flight import SingleFlight
+from imaging.hashing import ImageFingerprint, hamming_distance
+
+
+class AnalysisCache:
+    """
+    Crop disease analyses keyed on the image, so resent photos don't cost another model call.
+
+    Lookups try the exact content hash first, then the closest perceptual hash within
+    ANALYSIS_CACHE_MAX_DISTANCE bits for near-identical shots. Analyses of the same image already
+    in flight are shared rather than started again. Results are per remedy language.
+    """
+
+    def __init__(self):
+        self.max_distance = config.ANALYSIS_CACHE_MAX_DISTANCE
+        self.memory = TTLCache(maxsize=config.ANALYSIS_CACHE_MAX_ENTRIES, ttl=config.ANALYSIS_CACHE_TTL_SECONDS)
+        self.inflight = SingleFlight()
+        # (sha256, language) -> dhash of every cached analysis, scanned for near matches
+        self._hashes: Dict[Tuple[str, str], int] = {}
+        self.exact_hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self.near_distances: Dict[int, int] = {}
+
+    def _near_match(self, fingerprint: ImageFingerprint, language: str) -> Optional[Tuple[Tuple[str, str], int]]:
+        best = None
+        for key, other in list(self._hashes.items()):
+            if key[1] != language:
+                continue
+            distance = hamming_distance(fingerprint.dhash, other)
+            if distance <= self.max_distance and (best is None or distance < best[1]):
+                if key not in self.memory:
+                    del self._hashes[key]  # expired or evicted
+                    continue
+                best = (key, distance)
+        return best
+
+    def lookup(self, fingerprint: ImageFingerprint, language: str) -> Optional[Dict[str, Any]]:
+        analysis = self.memory.get((fingerprint.sha256, language))
+        if analysis is not None:
+            self.exact_hits += 1
+            return analysis
+
+        match = self._near_match(fingerprint, language)
+        if match is not None:
+            key, distance = match
+            analysis = self.memory.get(key)
+            if analysis is not None:
+                self.near_hits += 1
+                self.near_distances[distance] = self.near_distances.get(distance, 0) + 1
+                return analysis
+
+        self.misses += 1
+        return None
+
+    def store(self, fingerprint: ImageFingerprint, language: str, analysis: Dict[str, Any]):
+        key = (fingerprint.sha256, language)
+        self.memory.set(key, analysis)
+        self._hashes[key] = fingerprint.dhash
+        if len(self._hashes) > 2 * self.memory.maxsize:
+            self._hashes = {key: value for key, value in self._hashes.items() if key in self.memory}
+
+    async def analyze(
+            self,
+            fingerprint: ImageFingerprint,
+            language: str,
+            fn: Callable[[], Awaitable[Optional[Dict[str, Any]]]],
+    ) -> Optional[Dict[str, Any]]:
+        """ cached analysis for the image, otherwise run `fn` once for all concurrent requests and keep a good result """
+        analysis = self.lookup(fingerprint, language)
+        if analysis is not None:
+            return analysis
+
+        analysis = await self.inflight.do((fingerprint.sha256, language), fn)
+        if analysis is not None:
+            self.store(fingerprint, language, analysis)
+        return analysis
+
+    def stats(self) -> Dict[str, Any]:
+        coalesced = self.inflight.stats()["coalesced"]
+        lookups = self.exact_hits + self.near_hits + self.misses
+        return {
+            "size": len(self.memory),
+            "maxsize": self.memory.maxsize,
+            "ttl_seconds": self.memory.ttl,
+            "max_distance": self.max_distance,
+            "exact_hits": self.exact_hits,
+            "near_hits": self.near_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.exact_hits + self.near_hits) / lookups, 4) if lookups else 0.0,
+            "coalesced": coalesced,
+            "near_distances": dict(sorted(self.near_distances.items())),
+            "model_analyses_saved": self.exact_hits + self.near_hits + coalesced,
+        }
+
+
+# Global instance
+analysis_cache = AnalysisCache()
@@ -1,6 +1,14 @@
 from __future__ import annotations
 
+import asyncio
+import functools
+import io
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
 from google import genai
+from google.genai import types as genai_types
 
 # Initialize Gemini client
 client = genai.Client(
@@ -8,10 +16,21 @@ client = genai.Client(
 )
 
 from PIL import Image
+from typing import Tuple
 from typing_extensions import TypedDict, Optional
 import google.generativeai as genai
 import os
 
+from app.core.config import config
+from app.services.analysis_cache import analysis_cache
+from app.services.remedy_cache import remedy_cache
+from imaging.hashing import ImageFingerprint, image_fingerprint
+from imaging.preprocess import prepare_image
+
+# caps model calls in flight, so a burst of uploads queues here instead of piling onto the model
+_model_calls = asyncio.Semaphore(max(1, config.GEMINI_MAX_CONCURRENCY))
+# image preprocessing workers, started on first use
+_image_pool: Optional[ProcessPoolExecutor] = None
 
 
 # Define the expected structure of the response
@@ -28,23 +47,117 @@ class DiseaseAnalysis(TypedDict):
     disease: Disease
     remedy: Remedy
 
-def detect_disease_from_image(image_path: str) -> Optional[Disease]:
+async def _generate(contents, response_schema):
     """
-    Detects plant disease from an image using Gemini.
-    Returns a dictionary with disease_name and severity.
+    One structured Gemini call on the async client, so the event loop keeps serving other requests
+    while the model works. Raises asyncio.TimeoutError after GEMINI_TIMEOUT_SECONDS.
     """
+    async with _model_calls:
+        response = await asyncio.wait_for(
+            client.aio.models.generate_content(
+                model=config.GEMINI_MODEL,
+                contents=contents,
+                config={
+                    "response_mime_type": "application/json",
+                    "response_schema": response_schema,
+                },
+            ),
+            timeout=config.GEMINI_TIMEOUT_SECONDS,
+        )
+    return response.parsed  # Return the parsed dictionary
+
+
+def _load_image(image_path: str) -> Tuple[Image.Image, ImageFingerprint]:
+    with open(image_path, "rb") as f:
+        data = f.read()
+    image = Image.open(io.BytesIO(data))
+    image.load()  # decode now, in the worker thread, rather than when the request is serialised
+    return image, image_fingerprint(data, image)
+
+
+def _get_image_pool() -> ProcessPoolExecutor:
+    global _image_pool
+    if _image_pool is None:
+        # spawn rather than fork, forking a process that already has gRPC channels open is unsafe.
+        # workers import imaging only, plus the parent's __main__ script, which under `uvicorn main:app` is uvicorn's
+        _image_pool = ProcessPoolExecutor(
+            max_workers=max(1, config.IMAGE_PREPROCESS_WORKERS),
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _image_pool
+
+
+def shutdown_image_pool():
+    global _image_pool
+    if _image_pool is not None:
+        _image_pool.shutdown(wait=False, cancel_futures=True)
+        _image_pool = None
+
+
+def _replace_broken_pool(pool: ProcessPoolExecutor):
+    """ drop a broken pool so the next call starts a fresh one, unless a concurrent request already did """
+    global _image_pool
+    if _image_pool is pool:
+        print("[IMAGE POOL] Worker process died, restarting the image pool")
+        _image_pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+async def _load_model_image(image_path: str):
+    """
+    The image as sent to the model and its fingerprint: decoded, oriented, downscaled and re-encoded
+    in the process pool, so neither the decode nor the SDK's own re-encode of a full size image runs
+    on the event loop. With IMAGE_PREPROCESS_ENABLED off, the decoded original as before.
+    """
+    if not config.IMAGE_PREPROCESS_ENABLED:
+        return await asyncio.to_thread(_load_image, image_path)
+
+    job = functools.partial(
+        prepare_image,
+        image_path,
+        config.IMAGE_MAX_EDGE,
+        config.IMAGE_FORMAT,
+        config.IMAGE_QUALITY,
+        config.IMAGE_MIN_QUALITY,
+        config.IMAGE_TARGET_BYTES,
+    )
+    pool = _get_image_pool()
+    try:
+        prepared = await asyncio.get_running_loop().run_in_executor(pool, job)
+    except BrokenProcessPool:
+        # a worker died (OOM kill, segfault in a decoder), the pool refuses all work from then on
+        _replace_broken_pool(pool)
+        prepared = await asyncio.get_running_loop().run_in_executor(_get_image_pool(), job)
+    return genai_types.Part.from_bytes(data=prepared.data, mime_type=prepared.mime_type), prepared.fingerprint
+
+
+async def _open_image(image_path: str):
+    """ (model image, fingerprint) for a path, None (logged) if the file is missing or can't be loaded """
     # Check if image file exists
     if not os.path.exists(image_path):
         print(f"❌ Image file not found: {image_path}")
         return None
 
-    # Load image using PIL
     try:
-        image = Image.open(image_path)
+        return await _load_model_image(image_path)
     except Exception as e:
         print(f"❌ Error loading image: {e}")
         return None
 
+
+async def detect_disease_from_image(image_path: str) -> Optional[Disease]:
+    """
+    Detects plant disease from an image using Gemini.
+    Returns a dictionary with disease_name and severity.
+    """
+    loaded = await _open_image(image_path)
+    if loaded is None:
+        return None
+    return await _detect_disease(loaded[0])
+
+
+async def _detect_disease(image) -> Optional[Disease]:
+    """ disease detection on an already loaded image """
     # Construct prompt
     prompt = """
     Analyze the following image of a crop and identify any diseases or health issues.
@@ -56,61 +169,148 @@ def detect_disease_from_image(image_path: str) -> Optional[Disease]:
 
     # Call Gemini model with structured response config
     try:
-        response = client.models.generate_content(
-            model="gemini-2.5-pro",
-            contents=[prompt, image],
-            config={
-                "response_mime_type": "application/json",
-                "response_schema": Disease,
-            },
-        )
-        return response.parsed  # Return the parsed dictionary
+        return await _generate([prompt, image], Disease)
+    except asyncio.TimeoutError:
+        print(f"❌ Gemini disease detection timed out after {config.GEMINI_TIMEOUT_SECONDS:.0f}s")
+        return None
     except Exception as e:
         print(f"❌ Gemini API call failed: {e}")
         return None
 
-def get_remedy_for_disease(disease_name: str, severity: str) -> Optional[Remedy]:
+async def get_remedy_for_disease(disease_name: str, severity: str, language: Optional[str] = None) -> Optional[Remedy]:
     """
-    Given disease name and severity, return structured remedy guidance.
+    Given disease name and severity, return structured remedy guidance in `language`
+    (default DEFAULT_REMEDY_LANGUAGE). Served from the remedy cache when possible.
     """
+    language = language or config.DEFAULT_REMEDY_LANGUAGE
+    cached = await remedy_cache.get(disease_name, severity, language)
+    if cached is not None:
+        return cached
+
     prompt = f"""
     The crop is infected with "{disease_name}" and severity is "{severity}".
 
     Please respond in JSON with:
-    - remedy_steps: 1-3 actionable bullet points for treatment
+    - remedy_steps: 1-3 actionable bullet points for treatment, written in {language}
     - recheck_days: number of days to recheck the crop
     - estimated_cost: estimated cost in Indian Rupees (₹)
     """
 
     try:
-        response = client.models.generate_content(
-            model="gemini-2.5-pro",
-            contents=prompt,
-            config={
-                "response_mime_type": "application/json",
-                "response_schema": Remedy,
-            },
-        )
-        return response.parsed  # Return the parsed dictionary
+        remedy = await _generate(prompt, Remedy)
+        if remedy:
+            await remedy_cache.set(disease_name, severity, language, remedy)
+        return remedy
+    except asyncio.TimeoutError:
+        print(f"❌ Gemini remedy lookup timed out after {config.GEMINI_TIMEOUT_SECONDS:.0f}s")
+        return None
     except Exception as e:
         print(f"❌ Gemini API call failed: {e}")
         return None
 
-def analyze_crop_disease(image_path: str) -> Optional[DiseaseAnalysis]:
+ANALYSIS_MODES = ("combined", "two_step")
+
+
+def _is_valid_analysis(result) -> bool:
+    """ whether a combined response has every DiseaseAnalysis field with the right type """
+    if not isinstance(result, dict):
+        return False
+    disease, remedy = result.get("disease"), result.get("remedy")
+    return (
+        isinstance(disease, dict)
+        and isinstance(disease.get("disease_name"), str) and bool(disease["disease_name"])
+        and isinstance(disease.get("severity"), str)
+        and isinstance(remedy, dict)
+        and isinstance(remedy.get("remedy_steps"), str)
+        and isinstance(remedy.get("recheck_days"), int)
+        and isinstance(remedy.get("estimated_cost"), int)
+    )
+
+
+async def _generate_combined(image, language: str):
+    """
+    Disease and remedy from a single structured-output call on an already loaded image.
+    Returns the parsed response as is, model errors are raised.
+    """
+    prompt = f"""
+    Analyze the following image of a crop, identify any diseases or health issues and recommend a remedy.
+
+    Respond in JSON with:
+    - disease:
+        - disease_name: The name of the disease or "Healthy" if no disease detected
+        - severity: low, medium, high, or "none" if healthy
+    - remedy:
+        - remedy_steps: 1-3 actionable bullet points for treatment, written in {language}
+        - recheck_days: number of days to recheck the crop
+        - estimated_cost: estimated cost in Indian Rupees (₹)
+    """
+    return await _generate([prompt, image], DiseaseAnalysis)
+
+
+async def analyze_crop_disease(
+        image_path: str,
+        mode: Optional[str] = None,
+        language: Optional[str] = None,
+) -> Optional[DiseaseAnalysis]:
     """
     Complete crop disease analysis: detects disease and provides remedy.
     Returns a dictionary with both disease and remedy information.
+
+    mode (default DISEASE_ANALYSIS_MODE) is "combined" for one model call, falling back to the two-step
+    path only when the combined response doesn't match DiseaseAnalysis, or "two_step", whose remedy call
+    is skipped on a remedy cache hit. Remedies are written in `language` (default DEFAULT_REMEDY_LANGUAGE).
+    Resent and near-identical images are answered from the analysis cache.
     """
+    mode = mode or config.DISEASE_ANALYSIS_MODE
+    language = language or config.DEFAULT_REMEDY_LANGUAGE
+    if mode not in ANALYSIS_MODES:
+        raise ValueError(f"analysis mode must be one of {', '.join(ANALYSIS_MODES)}")
+
+    # one read and decode gives both the model image and the cache key
+    loaded = await _open_image(image_path)
+    if loaded is None:
+        return None
+    image, fingerprint = loaded
+    if not config.ANALYSIS_CACHE_ENABLED:
+        return await _analyze(image, mode, language)
+    return await analysis_cache.analyze(fingerprint, language, lambda: _analyze(image, mode, language))
+
+
+async def _analyze(image, mode: str, language: str) -> Optional[DiseaseAnalysis]:
+    """ analyse an already loaded image on the model, in the given mode """
+    if mode == "combined":
+        try:
+            result = await _generate_combined(image, language)
+        except asyncio.TimeoutError:
+            print(f"❌ Gemini analysis timed out after {config.GEMINI_TIMEOUT_SECONDS:.0f}s")
+            return None
+        except Exception as e:
+            print(f"❌ Gemini API call failed: {e}")
+            return None
+        if _is_valid_analysis(result):
+            # later two-step lookups for the same disease skip their remedy call
+            disease = result["disease"]
+            if not remedy_cache.contains(disease["disease_name"], disease["severity"], language):
+                await remedy_cache.set(disease["disease_name"], disease["severity"], language, result["remedy"])
+            return result
+        print("⚠️ Combined analysis did not match the schema, falling back to two-step analysis")
+
+    return await _analyze_two_step(image, language)
+
+
+async def _analyze_two_step(image, language: str) -> Optional[DiseaseAnalysis]:
+    """ detect the disease, then ask for a remedy in a second call """
     try:
         # Detect disease from image
-        disease_result = detect_disease_from_image(image_path)
+        disease_result = await _detect_disease(image)
         if not disease_result:
             return None
         
         # Get remedy for the detected disease
-        remedy_result = get_remedy_for_disease(
+        remedy_result = await get_remedy_for_disease(
             disease_result['disease_name'], 
-            disease_result['severity']
+            disease_result['severity'],
+            language,
         )
         
         if not remedy_result:
@@ -128,7 +328,7 @@ def analyze_crop_disease(image_path: str) -> Optional[DiseaseAnalysis]:
 
 # Example usage (for testing)
 if __name__ == "__main__":
-    result = analyze_crop_disease("plant_disease.jpg")
+    result = asyncio.run(analyze_crop_disease("plant_disease.jpg"))
     if result:
         print(f"🦠 Disease: {result['disease']['disease_name']}")
         print(f"📉 Severity: {result['disease']['severity']}")
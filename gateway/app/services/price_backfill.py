@@ -0,0 +1,177 @@
+import argparse
+import asyncio
+import json
+import os
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import httpx
+
+from app.core.config import config
+from app.core.http_client import close_http_client
+from app.services.price_updater import CropPriceUpdater
+
+
+class PriceBackfill:
+    """
+    Load historical prices for a date range, sharded by (date, commodity).
+
+    Shards run in parallel under the shared upstream rate limiter. Every completed shard is appended
+    to a checkpoint file, so an interrupted run picks up where it stopped when started again.
+    """
+
+    def __init__(
+            self,
+            start_date: date,
+            end_date: date,
+            states: List[str],
+            commodities: List[str],
+            checkpoint_path: str,
+            api_key: Optional[str] = None,
+            resource_id: Optional[str] = None,
+            concurrency: Optional[int] = None,
+            client: Optional[httpx.AsyncClient] = None,
+    ):
+        if end_date < start_date:
+            raise ValueError(f"end date {end_date} is before start date {start_date}")
+
+        self.start_date = start_date
+        self.end_date = end_date
+        self.states = sorted(set(states))
+        self.commodities = sorted(set(commodities))
+        self.checkpoint_path = checkpoint_path
+        self.api_key = api_key or config.DATA_GOV_API_KEY
+        self.resource_id = resource_id or config.DATA_GOV_RESOURCE_ID
+        self.concurrency = max(1, concurrency or config.PRICE_BACKFILL_CONCURRENCY)
+        self.client = client
+        self._checkpoint_lock = asyncio.Lock()
+
+    def shards(self) -> List[Tuple[str, str]]:
+        """ every (date, commodity) pair in the range, newest dates first """
+        days = (self.end_date - self.start_date).days
+        dates = [(self.end_date - timedelta(days=i)).strftime("%Y-%m-%d") for i in range(days + 1)]
+        return [(date_str, commodity) for date_str in dates for commodity in self.commodities]
+
+    def load_completed(self) -> Set[Tuple[str, str]]:
+        """ shards already completed for at least the requested states """
+        completed = set()
+        if not os.path.exists(self.checkpoint_path):
+            return completed
+
+        with open(self.checkpoint_path) as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # a run killed mid-write can leave a truncated last line
+                    continue
+                if set(self.states) <= set(entry.get("states", [])):
+                    completed.add((entry["date"], entry["commodity"]))
+        return completed
+
+    async def _checkpoint(self, date_str: str, commodity: str, result: Dict[str, int]):
+        entry = {"date": date_str, "commodity": commodity, "states": self.states, "result": result}
+        async with self._checkpoint_lock:
+            with open(self.checkpoint_path, "a") as f:
+                f.write(json.dumps(entry) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+    async def run_shard(self, date_str: str, commodity: str) -> Dict[str, int]:
+        """ ingest one date of one commodity for every requested state """
+        totals = {'success': 0, 'failure': 0, 'total': 0, 'inserted': 0, 'updated': 0, 'unchanged': 0, 'quarantined': 0}
+        for state in self.states:
+            updater = CropPriceUpdater(
+                api_key=self.api_key,
+                resource_id=self.resource_id,
+                commodity=commodity,
+                state=state,
+                client=self.client,
+            )
+            result = await updater.ingest(date_str)
+            for key in totals:
+                totals[key] += result.get(key, 0)
+        return totals
+
+    async def run(self) -> Dict[str, Any]:
+        if not self.api_key:
+            raise ValueError("a data.gov.in api key is required, pass --api-key or set DATA_GOV_API_KEY")
+
+        shards = self.shards()
+        completed = self.load_completed()
+        pending = [shard for shard in shards if shard not in completed]
+        print(f"[BACKFILL] {len(shards)} shards, {len(shards) - len(pending)} already done, {len(pending)} to run")
+
+        queue: asyncio.Queue = asyncio.Queue()
+        for shard in pending:
+            queue.put_nowait(shard)
+
+        summary = {"shards": len(shards), "skipped": len(shards) - len(pending), "completed": 0, "failed": 0, "records": 0}
+
+        async def worker():
+            while True:
+                try:
+                    date_str, commodity = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                try:
+                    result = await self.run_shard(date_str, commodity)
+                    if result["failure"]:
+                        raise RuntimeError(f"{result['failure']} of {result['total']} records failed to store")
+                    await self._checkpoint(date_str, commodity, result)
+                    summary["completed"] += 1
+                    summary["records"] += result["success"]
+                    print(f"[BACKFILL] {date_str} {commodity}: {result}")
+                except Exception as e:
+                    # failed shards are not checkpointed, the next run retries them
+                    summary["failed"] += 1
+                    print(f"[BACKFILL ERROR] {date_str} {commodity} failed: {e}")
+
+        await asyncio.gather(*(worker() for _ in range(min(self.concurrency, len(pending)))))
+        print(f"[BACKFILL] Done: {summary}")
+        return summary
+
+
+def _parse_date(value: str) -> date:
+    return datetime.strptime(value, "%Y-%m-%d").date()
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Backfill historical mandi prices from data.gov.in")
+    parser.add_argument("--start", type=_parse_date, required=True, help="first date, YYYY-MM-DD")
+    parser.add_argument("--end", type=_parse_date, default=date.today(), help="last date, YYYY-MM-DD (default today)")
+    parser.add_argument("--states", nargs="+", required=True)
+    parser.add_argument("--commodities", nargs="+", required=True)
+    parser.add_argument("--checkpoint", default="price_backfill.checkpoint.jsonl")
+    parser.add_argument("--concurrency", type=int, default=None, help="shards in flight at once")
+    parser.add_argument("--api-key", default=None)
+    parser.add_argument("--resource-id", default=None)
+    args = parser.parse_args(argv)
+
+    backfill = PriceBackfill(
+        start_date=args.start,
+        end_date=args.end,
+        states=args.states,
+        commodities=args.commodities,
+        checkpoint_path=args.checkpoint,
+        api_key=args.api_key,
+        resource_id=args.resource_id,
+        concurrency=args.concurrency,
+    )
+
+    async def run():
+        try:
+            return await backfill.run()
+        finally:
+            await close_http_client()
+
+    summary = asyncio.run(run())
+    if summary["failed"]:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
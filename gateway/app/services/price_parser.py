@@ -0,0 +1,202 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.models.price_record import PriceRecord
+
+DATE_FORMATS = ("%Y-%m-%d", "%d/%m/%Y")
+PRICE_FIELDS = ("min_price", "max_price", "modal_price")
+RAW_FIELDS = ("arrival_date", "market", "commodity", "variety") + PRICE_FIELDS
+INT64_LIMIT = 2.0 ** 63  # exact as a float, anything below it fits in an int64
+
+
+class PriceBatch:
+    """
+    Columnar view of a page of parsed price records.
+
+    Markets, commodities and varieties are stored as integer codes into small lookup arrays,
+    a variety code of -1 means no variety. Rows that failed to parse are kept in `errors`
+    as (row index in the page, reason) instead of raising.
+    """
+
+    def __init__(
+            self,
+            dates: np.ndarray,
+            market_codes: np.ndarray,
+            markets: np.ndarray,
+            commodity_codes: np.ndarray,
+            commodities: np.ndarray,
+            variety_codes: np.ndarray,
+            varieties: np.ndarray,
+            min_price: np.ndarray,
+            max_price: np.ndarray,
+            modal_price: np.ndarray,
+            rows: np.ndarray,
+            errors: Optional[List[Tuple[int, str]]] = None,
+    ):
+        self.dates = dates
+        self.market_codes = market_codes
+        self.markets = markets
+        self.commodity_codes = commodity_codes
+        self.commodities = commodities
+        self.variety_codes = variety_codes
+        self.varieties = varieties
+        self.min_price = min_price
+        self.max_price = max_price
+        self.modal_price = modal_price
+        self.rows = rows
+        self.errors = errors or []
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    @classmethod
+    def empty(cls, errors: Optional[List[Tuple[int, str]]] = None) -> "PriceBatch":
+        no_codes = np.empty(0, dtype=np.int64)
+        no_names = np.empty(0, dtype=object)
+        return cls(
+            dates=np.empty(0, dtype="datetime64[D]"),
+            market_codes=no_codes, markets=no_names,
+            commodity_codes=no_codes, commodities=no_names,
+            variety_codes=no_codes, varieties=no_names,
+            min_price=no_codes, max_price=no_codes, modal_price=no_codes,
+            rows=no_codes,
+            errors=errors,
+        )
+
+    def market_names(self) -> np.ndarray:
+        return self.markets[self.market_codes]
+
+    def commodity_names(self) -> np.ndarray:
+        return self.commodities[self.commodity_codes]
+
+    def variety_names(self) -> np.ndarray:
+        # append a None slot so code -1 resolves to it
+        return np.append(self.varieties, None)[self.variety_codes]
+
+    def filter(self, mask: np.ndarray) -> "PriceBatch":
+        """ keep only the rows where mask is true, lookup arrays and errors are shared """
+        return PriceBatch(
+            dates=self.dates[mask],
+            market_codes=self.market_codes[mask], markets=self.markets,
+            commodity_codes=self.commodity_codes[mask], commodities=self.commodities,
+            variety_codes=self.variety_codes[mask], varieties=self.varieties,
+            min_price=self.min_price[mask],
+            max_price=self.max_price[mask],
+            modal_price=self.modal_price[mask],
+            rows=self.rows[mask],
+            errors=self.errors,
+        )
+
+    def to_dicts(self, state: Optional[str] = None) -> List[Dict[str, Any]]:
+        """ plain dicts in the shape the storage layer expects, dates as YYYY-MM-DD strings """
+        columns = {
+            "date": self.dates.astype(str).tolist(),
+            "market": self.market_names().tolist(),
+            "commodity": self.commodity_names().tolist(),
+            "variety": self.variety_names().tolist(),
+            "min_price": self.min_price.tolist(),
+            "max_price": self.max_price.tolist(),
+            "modal_price": self.modal_price.tolist(),
+        }
+        keys = list(columns)
+        records = [dict(zip(keys, values)) for values in zip(*columns.values())]
+        if state is not None:
+            for record in records:
+                record["state"] = state
+        return records
+
+    def to_records(self) -> List[PriceRecord]:
+        """ materialise pydantic records, only for responses that need them """
+        return [PriceRecord(**record) for record in self.to_dicts()]
+
+
+def _parse_dates(raw_dates: pd.Series) -> pd.Series:
+    """ vectorised date parsing, each format is only tried on the rows the previous ones missed """
+    dates = pd.Series(pd.NaT, index=raw_dates.index, dtype="datetime64[ns]")
+    for fmt in DATE_FORMATS:
+        missing = dates.isna() & raw_dates.notna()
+        if not missing.any():
+            break
+        dates[missing] = pd.to_datetime(raw_dates[missing], format=fmt, errors="coerce")
+    return dates
+
+
+def _parse_prices(values: List[Any]) -> np.ndarray:
+    """ numeric column as float64 with NaN for anything unparseable """
+    try:
+        # fast path, numpy parses a column of clean numeric strings in one call
+        return np.array(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        return pd.to_numeric(pd.Series(values, dtype=object), errors="coerce").to_numpy(dtype=np.float64)
+
+
+def parse_price_batch(entries: List[Dict[str, Any]]) -> PriceBatch:
+    """
+    Parse a page of raw data.gov.in records into a PriceBatch in one pass.
+    Dates and prices are converted column-wise, bad rows are collected as errors.
+    """
+    if not entries:
+        return PriceBatch.empty()
+
+    columns = {field: np.array([entry.get(field) for entry in entries], dtype=object) for field in RAW_FIELDS}
+    dates = _parse_dates(pd.Series(columns["arrival_date"]).astype("string"))
+    prices = {field: _parse_prices(columns[field].tolist()) for field in PRICE_FIELDS}
+
+    def is_blank(field: str) -> np.ndarray:
+        values = columns[field]
+        return pd.isna(values) | (values == "")
+
+    checks = [
+        ("missing market", is_blank("market")),
+        ("missing commodity", is_blank("commodity")),
+        ("unrecognized date format", dates.isna().to_numpy(dtype=bool)),
+    ]
+    for field in PRICE_FIELDS:
+        values = prices[field]
+        finite = np.isfinite(values)
+        # same rows the per-row int() parse rejected: fractions, and values int64 can't hold after the cast
+        whole = np.zeros(len(values), dtype=bool)
+        whole[finite] = values[finite] == np.floor(values[finite])
+        in_range = np.zeros(len(values), dtype=bool)
+        in_range[finite] = np.abs(values[finite]) < INT64_LIMIT
+        checks += [
+            (f"invalid {field}", ~finite),
+            (f"non-integral {field}", finite & ~whole),
+            (f"out of range {field}", finite & ~in_range),
+        ]
+
+    invalid = np.zeros(len(entries), dtype=bool)
+    for _, failed in checks:
+        invalid |= failed
+
+    errors = []
+    if invalid.any():
+        # only the failing rows are visited one by one, to describe what went wrong
+        for row in np.flatnonzero(invalid):
+            reason = next(name for name, failed in checks if failed[row])
+            errors.append((int(row), f"{reason}: {entries[row]}"))
+
+    valid = ~invalid
+    if not valid.any():
+        return PriceBatch.empty(errors)
+
+    market_codes, markets = pd.factorize(columns["market"][valid])
+    commodity_codes, commodities = pd.factorize(columns["commodity"][valid])
+    variety_codes, varieties = pd.factorize(columns["variety"][valid])
+
+    return PriceBatch(
+        dates=dates[valid].to_numpy(dtype="datetime64[D]"),
+        market_codes=market_codes,
+        markets=np.asarray(markets, dtype=object),
+        commodity_codes=commodity_codes,
+        commodities=np.asarray(commodities, dtype=object),
+        variety_codes=variety_codes,
+        varieties=np.asarray(varieties, dtype=object),
+        min_price=prices["min_price"][valid].astype(np.int64),
+        max_price=prices["max_price"][valid].astype(np.int64),
+        modal_price=prices["modal_price"][valid].astype(np.int64),
+        rows=np.flatnonzero(valid),
+        errors=errors,
+    )
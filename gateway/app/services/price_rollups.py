@@ -0,0 +1,291 @@
+import asyncio
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from firebase_admin import firestore
+
+from app.core.config import config
+from app.db.firestore import firestore_service
+from app.db.price_storage import price_storage
+
+GRANULARITIES = ("month", "week", "day")
+MAX_DAILY_POINTS = 366
+SUMMARY_FIELDS = (
+    "days", "market_count", "observations", "mean_modal_price", "p25_modal_price",
+    "median_modal_price", "p75_modal_price", "min_price", "max_price",
+)
+
+
+def _to_date(value: str) -> date:
+    return datetime.strptime(value, "%Y-%m-%d").date()
+
+
+def period_bounds(granularity: str, day: date) -> Tuple[str, date, date]:
+    """ (period id, first day, last day) of the week or month containing `day` """
+    if granularity == "week":
+        year, week, _ = day.isocalendar()
+        start = day - timedelta(days=day.weekday())
+        return f"{year}-W{week:02d}", start, start + timedelta(days=6)
+    if granularity == "month":
+        start = day.replace(day=1)
+        next_month = (start + timedelta(days=32)).replace(day=1)
+        return start.strftime("%Y-%m"), start, next_month - timedelta(days=1)
+    if granularity == "day":
+        return day.strftime("%Y-%m-%d"), day, day
+    raise ValueError(f"unknown granularity {granularity}")
+
+
+def periods_between(granularity: str, start: date, end: date) -> List[Tuple[str, date, date]]:
+    """ every period overlapping start..end, oldest first """
+    periods = []
+    day = start
+    while day <= end:
+        period = period_bounds(granularity, day)
+        periods.append(period)
+        day = period[2] + timedelta(days=1)
+    return periods
+
+
+def aggregate_days(days: Dict[str, Dict[str, Dict[str, Any]]]) -> Dict[str, Any]:
+    """
+    Aggregate daily snapshot markets ({date: {market_key: entry}}) into per market and
+    state level stats. The state mean is the mean of the daily cross-market means, like moving_average.
+    """
+    rows = [
+        (day, market_key, entry)
+        for day, markets in sorted(days.items())
+        for market_key, entry in markets.items()
+    ]
+    if not rows:
+        return {"days": 0, "market_count": 0, "observations": 0, "markets": {}}
+
+    day_codes = np.array([day for day, _, _ in rows])
+    market_keys = np.array([market_key for _, market_key, _ in rows])
+    modal = np.array([entry["modal_price"] for _, _, entry in rows], dtype=np.float64)
+    low = np.array([entry["min_price"] for _, _, entry in rows], dtype=np.float64)
+    high = np.array([entry["max_price"] for _, _, entry in rows], dtype=np.float64)
+
+    _, day_index = np.unique(day_codes, return_inverse=True)
+    daily_means = np.bincount(day_index, weights=modal) / np.bincount(day_index)
+    p25, p50, p75 = np.percentile(modal, [25, 50, 75])
+
+    names = {market_key: entry["market"] for _, market_key, entry in rows}
+    markets = {}
+    for market_key in np.unique(market_keys):
+        mask = market_keys == market_key
+        markets[str(market_key)] = {
+            "market": names[market_key],
+            "days": int(mask.sum()),
+            "mean_modal_price": round(float(modal[mask].mean()), 2),
+            "median_modal_price": float(np.median(modal[mask])),
+            "min_price": int(low[mask].min()),
+            "max_price": int(high[mask].max()),
+        }
+
+    return {
+        "days": int(len(daily_means)),
+        "market_count": len(markets),
+        "observations": len(rows),
+        "mean_modal_price": round(float(daily_means.mean()), 2),
+        "p25_modal_price": float(p25),
+        "median_modal_price": float(p50),
+        "p75_modal_price": float(p75),
+        "min_price": int(low.min()),
+        "max_price": int(high.max()),
+        "markets": markets,
+    }
+
+
+class PriceRollups:
+    """
+    Weekly and monthly price aggregates per (state, commodity).
+
+    Structure: price_rollups/{state}/{commodity}/{granularity}_{period}, e.g. month_2025-07 or week_2025-W28.
+    A rollup is recomputed from the daily snapshot documents of its period whenever one of its days is
+    written, so re-ingesting a day never double counts. Range reads fetch one document per period.
+    """
+
+    def __init__(self):
+        self.collection_name = "price_rollups"
+        self.db = firestore_service.db
+
+    def _rollup_path(self, state: str, commodity: str, granularity: str, period: str) -> str:
+        return (
+            f"{self.collection_name}/{firestore_service._path_key(state)}/"
+            f"{firestore_service._path_key(commodity)}/{granularity}_{period}"
+        )
+
+    async def _read_days(self, state: str, commodity: str, dates: List[str], transaction=None,
+                         rebuild_missing: bool = False) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """
+        Markets per day from the daily snapshots. A snapshot not marked complete, or a missing one with
+        rebuild_missing, is rebuilt from the day's per-market documents like _merge_snapshot does, so a
+        partial day never feeds an aggregate. Days with no data are left out.
+        """
+        refs = [self.db.document(firestore_service._snapshot_path(date_str, state, commodity)) for date_str in dates]
+        days, rebuild = {}, []
+        async for snapshot in self.db.get_all(refs, transaction=transaction):
+            data = snapshot.to_dict() if snapshot.exists else None
+            if data and data.get("complete"):
+                days[data["date"]] = data.get("markets") or {}
+            elif data or rebuild_missing:
+                rebuild.append(snapshot.reference.id)
+
+        rebuilt = await asyncio.gather(*(
+            firestore_service._read_day_markets(date_str, state, commodity, transaction=transaction)
+            for date_str in rebuild
+        ))
+        for date_str, markets in zip(rebuild, rebuilt):
+            if markets:
+                days[date_str] = markets
+        return days
+
+    async def _recompute(self, state: str, commodity: str, granularity: str, period: Tuple[str, date, date]):
+        period_id, start, end = period
+        dates = [(start + timedelta(days=i)).strftime("%Y-%m-%d") for i in range((end - start).days + 1)]
+        rollup_ref = self.db.document(self._rollup_path(state, commodity, granularity, period_id))
+
+        # reading the snapshots inside the transaction retries the rollup if a day changes underneath it
+        @firestore.async_transactional
+        async def recompute(transaction):
+            days = await self._read_days(state, commodity, dates, transaction=transaction, rebuild_missing=True)
+            transaction.set(rollup_ref, {
+                "state": state,
+                "commodity": commodity,
+                "granularity": granularity,
+                "period": period_id,
+                "start": start.strftime("%Y-%m-%d"),
+                "end": end.strftime("%Y-%m-%d"),
+                **aggregate_days(days),
+                "timestamp": firestore.SERVER_TIMESTAMP,
+            })
+
+        await recompute(self.db.transaction())
+
+    async def update(self, state: str, commodity: str, dates: Iterable[str]):
+        """ recompute the week and month rollups containing each of `dates` """
+        if config.PRICE_STORAGE_BACKEND == "postgres":
+            # postgres aggregates ranges at query time, see trend
+            return
+
+        periods = {
+            (granularity, period_bounds(granularity, _to_date(date_str)))
+            for date_str in dates
+            for granularity in ("week", "month")
+        }
+
+        async def recompute(granularity: str, period: Tuple[str, date, date]):
+            try:
+                await self._recompute(state, commodity, granularity, period)
+            except Exception as e:
+                print(f"[ROLLUP ERROR] Failed to update {granularity} {period[0]} for {state}/{commodity}: {e}")
+
+        await asyncio.gather(*(recompute(granularity, period) for granularity, period in periods))
+        if periods:
+            print(f"[ROLLUP] Updated {len(periods)} rollups for {state}/{commodity}")
+
+    @staticmethod
+    def choose_granularity(start: date, end: date, min_points: int) -> str:
+        """ the coarsest granularity that still gives at least min_points points over the window """
+        for granularity in ("month", "week"):
+            if len(periods_between(granularity, start, end)) >= min_points:
+                return granularity
+        return "day"
+
+    async def trend(
+            self,
+            state: str,
+            commodity: str,
+            start: date,
+            end: date,
+            market: Optional[str] = None,
+            granularity: Optional[str] = None,
+            min_points: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """
+        Price trend over start..end, one point per period. Weeks and months read their rollup documents,
+        days are aggregated from the daily snapshots. On the postgres backend every granularity is one
+        grouped query.
+        """
+        if end < start:
+            raise ValueError(f"end date {end} is before start date {start}")
+        granularity = granularity or self.choose_granularity(start, end, min_points or config.PRICE_TREND_MIN_POINTS)
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"granularity must be one of {', '.join(GRANULARITIES)}")
+
+        if config.PRICE_STORAGE_BACKEND == "postgres":
+            return await self._trend_from_database(state, commodity, start, end, market, granularity)
+
+        periods = periods_between(granularity, start, end)
+        if granularity == "day":
+            if len(periods) > MAX_DAILY_POINTS:
+                raise ValueError(f"daily trends are limited to {MAX_DAILY_POINTS} days, use week or month")
+            days = await self._read_days(state, commodity, [period_id for period_id, _, _ in periods])
+            documents = {
+                period_id: {"period": period_id, "start": period_id, "end": period_id,
+                            **aggregate_days({period_id: days[period_id]})}
+                for period_id, _, _ in periods if period_id in days
+            }
+        else:
+            refs = [self.db.document(self._rollup_path(state, commodity, granularity, period_id))
+                    for period_id, _, _ in periods]
+            documents = {}
+            async for snapshot in self.db.get_all(refs):
+                if snapshot.exists:
+                    data = snapshot.to_dict()
+                    documents[data["period"]] = data
+
+        market_key = firestore_service._path_key(market) if market else None
+        points = []
+        for period_id, _, _ in periods:
+            data = documents.get(period_id)
+            if data is None:
+                continue
+            markets = data.get("markets") or {}
+            if market_key:
+                if market_key not in markets:
+                    continue
+                stats = markets[market_key]
+            else:
+                stats = {key: value for key, value in data.items() if key in SUMMARY_FIELDS}
+            points.append({"period": period_id, "start": data["start"], "end": data["end"], **stats})
+
+        return {
+            "state": state,
+            "commodity": commodity,
+            "market": market,
+            "granularity": granularity,
+            "start": start.strftime("%Y-%m-%d"),
+            "end": end.strftime("%Y-%m-%d"),
+            "points": points,
+        }
+
+
+    async def _trend_from_database(self, state: str, commodity: str, start: date, end: date,
+                                   market: Optional[str], granularity: str) -> Dict[str, Any]:
+        rows = await price_storage.get_price_aggregates(
+            state, commodity, start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d"), granularity, market
+        )
+        points = []
+        for row in rows:
+            period_id, period_start, period_end = period_bounds(granularity, row.pop("period_start"))
+            points.append({
+                "period": period_id,
+                "start": period_start.strftime("%Y-%m-%d"),
+                "end": period_end.strftime("%Y-%m-%d"),
+                **row,
+            })
+        return {
+            "state": state,
+            "commodity": commodity,
+            "market": market,
+            "granularity": granularity,
+            "start": start.strftime("%Y-%m-%d"),
+            "end": end.strftime("%Y-%m-%d"),
+            "points": points,
+        }
+
+
+# Global instance
+price_rollups = PriceRollups()
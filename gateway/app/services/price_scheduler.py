@@ -0,0 +1,127 @@
+import asyncio
+import json
+import os
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from app.core.config import config
+from app.models.price_record import WatchlistEntry
+from app.services.price_updater import CropPriceUpdater
+
+
+class PriceIngestionScheduler:
+    """
+    Keeps prices for a watchlist of (state, commodity, market) tuples fresh in Firestore,
+    so the read endpoints only serve stored data and never call data.gov.in themselves.
+    """
+
+    def __init__(
+            self,
+            watchlist: Optional[List[WatchlistEntry]] = None,
+            api_key: Optional[str] = None,
+            resource_id: Optional[str] = None,
+            client: Optional[httpx.AsyncClient] = None,
+    ):
+        self.watchlist = watchlist
+        self.api_key = api_key or config.DATA_GOV_API_KEY
+        self.resource_id = resource_id or config.DATA_GOV_RESOURCE_ID
+        self.client = client
+        self._task: Optional[asyncio.Task] = None
+        self._status: Dict[str, Dict[str, Any]] = {}
+
+    @staticmethod
+    def load_watchlist(path: str) -> List[WatchlistEntry]:
+        """ read the watchlist, a json list of WatchlistEntry objects """
+        if not os.path.exists(path):
+            print(f"[SCHEDULER] Watchlist file not found: {path}")
+            return []
+        with open(path) as f:
+            return [WatchlistEntry(**entry) for entry in json.load(f)]
+
+    @staticmethod
+    def _entry_name(entry: WatchlistEntry) -> str:
+        return "/".join(part for part in (entry.state, entry.commodity, entry.market) if part)
+
+    @staticmethod
+    def _interval(entry: WatchlistEntry) -> int:
+        return entry.interval_seconds or config.PRICE_REFRESH_INTERVAL_SECONDS
+
+    async def refresh_entry(self, entry: WatchlistEntry) -> Dict[str, int]:
+        """ fetch and store today's prices for an entry, plus its lookback days """
+        updater = CropPriceUpdater(
+            api_key=self.api_key,
+            resource_id=self.resource_id,
+            commodity=entry.commodity,
+            state=entry.state,
+            market=entry.market,
+            client=self.client,
+        )
+
+        totals = {'success': 0, 'failure': 0, 'total': 0, 'inserted': 0, 'updated': 0, 'unchanged': 0, 'quarantined': 0}
+        for days_back in range(entry.lookback_days + 1):
+            fetch_date = (datetime.today() - timedelta(days=days_back)).strftime("%Y-%m-%d")
+            result = await updater.refresh(fetch_date)
+            for key in totals:
+                totals[key] += result.get(key, 0)
+        return totals
+
+    async def _run_entry(self, entry: WatchlistEntry, semaphore: asyncio.Semaphore):
+        name = self._entry_name(entry)
+        interval = self._interval(entry)
+
+        while True:
+            status = self._status.setdefault(name, {"interval_seconds": interval})
+            async with semaphore:
+                status["last_run"] = datetime.now().isoformat()
+                try:
+                    status["last_result"] = await self.refresh_entry(entry)
+                    status["last_error"] = None
+                    print(f"[SCHEDULER] Refreshed {name}: {status['last_result']}")
+                except Exception as e:
+                    status["last_error"] = str(e)
+                    print(f"[SCHEDULER ERROR] Failed to refresh {name}: {e}")
+
+            status["next_run"] = (datetime.now() + timedelta(seconds=interval)).isoformat()
+            await asyncio.sleep(interval)
+
+    async def run_forever(self):
+        """ refresh every watchlist entry on its own interval until cancelled """
+        if self.watchlist is None:
+            self.watchlist = self.load_watchlist(config.PRICE_WATCHLIST_FILE)
+
+        if not self.api_key:
+            print("[SCHEDULER] DATA_GOV_API_KEY is not set, price ingestion is disabled")
+            return
+        if not self.watchlist:
+            print("[SCHEDULER] Watchlist is empty, nothing to refresh")
+            return
+
+        print(f"[SCHEDULER] Refreshing {len(self.watchlist)} watchlist entries")
+        semaphore = asyncio.Semaphore(max(1, config.PRICE_SCHEDULER_CONCURRENCY))
+        await asyncio.gather(*(self._run_entry(entry, semaphore) for entry in self.watchlist))
+
+    def start(self):
+        """ run the scheduler in the background on the current event loop """
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run_forever())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "entries": self._status,
+        }
+
+
+# Global instance, started from the app lifespan or the price worker
+price_scheduler = PriceIngestionScheduler()
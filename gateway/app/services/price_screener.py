@@ -0,0 +1,205 @@
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from app.core.config import config
+from app.utils.cache import TTLCache
+from app.services.price_parser import PriceBatch
+from app.services.price_store import ColumnarPriceStore, PricePartition, price_store
+
+# reason codes, the first matching rule wins
+ZERO_PRICE = "zero_price"
+MIN_ABOVE_MAX = "min_above_max"
+MODAL_OUT_OF_RANGE = "modal_out_of_range"
+SCALE_ERROR = "scale_error"
+MODAL_OUTLIER = "modal_outlier"
+REASONS = (ZERO_PRICE, MIN_ABOVE_MAX, MODAL_OUT_OF_RANGE, SCALE_ERROR, MODAL_OUTLIER)
+
+# scales MAD to a standard deviation for normally distributed prices
+MAD_SCALE = 1.4826
+# markets with history needed on a day before their common move is taken out of the score
+MIN_DAY_MARKETS = 3
+# a quarantined move repeated within this fraction on a later day is taken as a real price change
+CONFIRM_TOLERANCE = 0.1
+
+
+def group_median(codes: np.ndarray, values: np.ndarray, n_groups: int) -> Tuple[np.ndarray, np.ndarray]:
+    """ median of values per integer group code in one sort, NaN for empty groups, plus group sizes """
+    order = np.lexsort((values, codes))
+    sorted_values = values[order]
+    counts = np.bincount(codes, minlength=n_groups)
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    present = counts > 0
+
+    medians = np.full(n_groups, np.nan)
+    lo = starts[present] + (counts[present] - 1) // 2
+    hi = starts[present] + counts[present] // 2
+    medians[present] = (sorted_values[lo] + sorted_values[hi]) / 2
+    return medians, counts
+
+
+class PriceScreener:
+    """
+    Flags suspicious rows in a parsed batch before they are stored.
+
+    Rule checks (zeroes, min above max, modal outside min..max) run on the batch columns. Modal prices are
+    then scored against each market's recent history in the columnar price store using median/MAD, so a
+    whole batch costs a couple of sorts rather than a history lookup per row.
+
+    Quarantined rows never become history, so two things keep a real move from being blocked for good:
+    the history median is scaled by the same day's median move across markets, and a market whose outlier
+    repeats on a later day is let through and keeps passing while it holds that level.
+    """
+
+    def __init__(self, store: ColumnarPriceStore = price_store):
+        self.store = store
+        self.window_days = config.PRICE_SCREEN_WINDOW_DAYS
+        self.min_history = config.PRICE_SCREEN_MIN_HISTORY
+        self.threshold = config.PRICE_SCREEN_MAD_THRESHOLD
+        self.min_spread = config.PRICE_SCREEN_MIN_SPREAD
+        # (state, commodity, market) -> (date, modal) of the last unconfirmed or confirmed outlying level
+        self.pending = TTLCache(maxsize=100_000, ttl=self.window_days * 86400)
+        self.counts: Dict[str, int] = {
+            "screened": 0, "quarantined": 0, "confirmed_moves": 0, **{reason: 0 for reason in REASONS}
+        }
+
+    def _history(self, partition: PricePartition, market_names: np.ndarray,
+                 before: np.datetime64) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """ median, MAD and history size of the modal price per row's market over the window before `before` """
+        uniques, inverse = np.unique(market_names.astype(str), return_inverse=True)
+        codes = np.array([
+            code if code is not None else -1
+            for code in (partition.market_code(name) for name in uniques)
+        ], dtype=np.int64)[inverse]
+
+        rows = partition.window(before - np.timedelta64(self.window_days, "D"), before - np.timedelta64(1, "D"))
+        history_codes = partition.market_codes[rows]
+        history_modal = partition.modal_price[rows].astype(np.float64)
+
+        n_markets = len(partition.markets)
+        if len(history_codes) == 0 or n_markets == 0:
+            empty = np.full(len(codes), np.nan)
+            return empty, empty, np.zeros(len(codes), dtype=np.int64)
+
+        medians, counts = group_median(history_codes, history_modal, n_markets)
+        deviations = np.abs(history_modal - medians[history_codes])
+        mads, _ = group_median(history_codes, deviations, n_markets)
+
+        known = codes >= 0
+        row_median = np.where(known, medians[np.where(known, codes, 0)], np.nan)
+        row_mad = np.where(known, mads[np.where(known, codes, 0)], np.nan)
+        row_count = np.where(known, counts[np.where(known, codes, 0)], 0)
+        return row_median, row_mad, row_count
+
+    @staticmethod
+    def _day_ratio(commodity_codes: np.ndarray, dates: np.ndarray, ratios: np.ndarray,
+                   usable: np.ndarray) -> np.ndarray:
+        """ per row, the median modal/history ratio of its commodity's markets on the same day, 1 if too few """
+        result = np.ones(len(ratios))
+        if not usable.any():
+            return result
+        keys = np.stack([commodity_codes, dates.astype("datetime64[D]").astype(np.int64)], axis=1)
+        uniques, groups = np.unique(keys[usable], axis=0, return_inverse=True)
+        groups = groups.reshape(-1)
+        medians, counts = group_median(groups, ratios[usable], len(uniques))
+        day_medians = np.where(counts >= MIN_DAY_MARKETS, medians, 1.0)
+
+        # map every row, not just the usable ones, onto its (commodity, day) group
+        lookup = {tuple(key): i for i, key in enumerate(uniques)}
+        for i, key in enumerate(map(tuple, keys)):
+            group = lookup.get(key)
+            if group is not None:
+                result[i] = day_medians[group]
+        return result
+
+    def _confirmed(self, state: str, batch: PriceBatch, market_names: np.ndarray, outlier: np.ndarray) -> np.ndarray:
+        """ outliers that repeat an earlier quarantined level for the same market, and remember the rest """
+        confirmed = np.zeros(len(outlier), dtype=bool)
+        for i in np.flatnonzero(outlier):
+            key = (state, batch.commodities[batch.commodity_codes[i]], str(market_names[i]))
+            day, modal = batch.dates[i], float(batch.modal_price[i])
+            previous = self.pending.get(key)
+            if previous is not None and previous[0] < day and abs(modal / previous[1] - 1) <= CONFIRM_TOLERANCE:
+                confirmed[i] = True
+            if previous is None or previous[0] < day:
+                self.pending.set(key, (day, modal))
+        return confirmed
+
+    async def screen(self, state: str, batch: PriceBatch) -> Tuple[PriceBatch, List[Dict[str, Any]]]:
+        """
+        Split a batch into the rows that passed and quarantine records for the ones that didn't.
+        Quarantine records carry the row, a reason code and the reference median it was scored against.
+        """
+        if not config.PRICE_SCREEN_ENABLED or len(batch) == 0:
+            return batch, []
+
+        n = len(batch)
+        reasons = np.full(n, "", dtype=object)
+
+        def flag(reason: str, failed: np.ndarray):
+            reasons[(reasons == "") & failed] = reason
+
+        low, high, modal = batch.min_price, batch.max_price, batch.modal_price
+        flag(ZERO_PRICE, (low <= 0) | (high <= 0) | (modal <= 0))
+        flag(MIN_ABOVE_MAX, low > high)
+        flag(MODAL_OUT_OF_RANGE, (modal < low) | (modal > high))
+
+        medians = np.full(n, np.nan)
+        mads = np.full(n, np.nan)
+        history = np.zeros(n, dtype=np.int64)
+        market_names = batch.market_names()
+        for code, commodity in enumerate(batch.commodities):
+            mask = batch.commodity_codes == code
+            if not mask.any():
+                continue
+            try:
+                partition = await self.store.ensure_loaded(state, commodity)
+            except Exception as e:
+                print(f"[SCREENER ERROR] No history for {state}/{commodity}, applying rule checks only: {e}")
+                continue
+            medians[mask], mads[mask], history[mask] = self._history(
+                partition, market_names[mask], batch.dates[mask].min()
+            )
+
+        scored = (history >= self.min_history) & np.isfinite(medians) & (medians > 0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            magnitude = np.abs(np.log10(modal / medians))
+            # a move shared by the day's markets is the market moving, score each market against it
+            day_ratio = self._day_ratio(batch.commodity_codes, batch.dates, modal / medians, scored & (reasons == ""))
+            expected = medians * day_ratio
+            spread = np.maximum(MAD_SCALE * mads, self.min_spread * medians) * day_ratio
+            score = np.abs(modal - expected) / spread
+            outlier = scored & (score > self.threshold)
+            # off by a factor of 10 or 100, a misplaced digit or a per-kg price on a per-quintal feed
+            decades = np.round(magnitude)
+            flag(SCALE_ERROR, outlier & (np.abs(magnitude - decades) < 0.15) & (decades >= 1))
+
+        candidates = outlier & (reasons == "")
+        if candidates.any():
+            confirmed = self._confirmed(state, batch, market_names, candidates)
+            self.counts["confirmed_moves"] += int(confirmed.sum())
+            flag(MODAL_OUTLIER, candidates & ~confirmed)
+
+        flagged = reasons != ""
+        self.counts["screened"] += n
+        if not flagged.any():
+            return batch, []
+
+        quarantined = batch.filter(flagged).to_dicts(state=state)
+        for record, reason, median, row in zip(
+                quarantined, reasons[flagged], medians[flagged], batch.rows[flagged]
+        ):
+            record["reason"] = reason
+            record["reference_median"] = float(median) if np.isfinite(median) else None
+            record["page_row"] = int(row)
+            self.counts[reason] += 1
+        self.counts["quarantined"] += len(quarantined)
+
+        return batch.filter(~flagged), quarantined
+
+    def stats(self) -> Dict[str, int]:
+        return dict(self.counts)
+
+
+# Global instance
+price_screener = PriceScreener()
@@ -0,0 +1,315 @@
+import asyncio
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import config
+from app.db.price_storage import price_storage
+from app.services.price_parser import PriceBatch
+
+
+def _to_day(value) -> np.datetime64:
+    if isinstance(value, str):
+        value = datetime.strptime(value, "%Y-%m-%d").date()
+    return np.datetime64(value, "D")
+
+
+class PricePartition:
+    """
+    Prices for one (state, commodity), held as NumPy columns sorted by (date, market).
+    Markets are integer codes into `markets`, one row per (date, market), the latest write wins.
+    """
+
+    def __init__(self):
+        self.dates = np.empty(0, dtype="datetime64[D]")
+        self.market_codes = np.empty(0, dtype=np.int64)
+        self.min_price = np.empty(0, dtype=np.int64)
+        self.max_price = np.empty(0, dtype=np.int64)
+        self.modal_price = np.empty(0, dtype=np.int64)
+        self.markets: List[str] = []
+        self._market_codes: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def _encode_markets(self, market_names: np.ndarray) -> np.ndarray:
+        """ map market names to partition codes, only the distinct names are visited in python """
+        uniques, inverse = np.unique(market_names.astype(str), return_inverse=True)
+        lookup = np.empty(len(uniques), dtype=np.int64)
+        for i, name in enumerate(uniques):
+            key = name.strip().lower()
+            code = self._market_codes.get(key)
+            if code is None:
+                code = len(self.markets)
+                self._market_codes[key] = code
+                self.markets.append(name)
+            lookup[i] = code
+        return lookup[inverse]
+
+    def market_code(self, market: str) -> Optional[int]:
+        return self._market_codes.get(market.strip().lower())
+
+    def upsert(self, dates: np.ndarray, market_names: np.ndarray, min_price: np.ndarray,
+               max_price: np.ndarray, modal_price: np.ndarray):
+        if len(dates) == 0:
+            return
+
+        codes = self._encode_markets(market_names)
+        all_dates = np.concatenate([self.dates, dates.astype("datetime64[D]")])
+        all_codes = np.concatenate([self.market_codes, codes])
+        all_min = np.concatenate([self.min_price, min_price.astype(np.int64)])
+        all_max = np.concatenate([self.max_price, max_price.astype(np.int64)])
+        all_modal = np.concatenate([self.modal_price, modal_price.astype(np.int64)])
+
+        # one row per (date, market): unique on the reversed arrays keeps the newest row
+        keys = all_dates.astype(np.int64) * (len(self.markets) + 1) + all_codes
+        _, last = np.unique(keys[::-1], return_index=True)
+        keep = len(keys) - 1 - last
+
+        order = np.lexsort((all_codes[keep], all_dates[keep]))
+        keep = keep[order]
+        self.dates = all_dates[keep]
+        self.market_codes = all_codes[keep]
+        self.min_price = all_min[keep]
+        self.max_price = all_max[keep]
+        self.modal_price = all_modal[keep]
+
+    def window(self, start: np.datetime64, end: np.datetime64) -> slice:
+        """ row slice for start <= date <= end, dates are sorted so this is two binary searches """
+        lo = np.searchsorted(self.dates, start, side="left")
+        hi = np.searchsorted(self.dates, end, side="right")
+        return slice(lo, hi)
+
+    def latest_date(self) -> Optional[np.datetime64]:
+        return self.dates[-1] if len(self.dates) else None
+
+
+class ColumnarPriceStore:
+    """
+    In-process columnar price store partitioned by (state, commodity).
+
+    Fed by CropPriceUpdater as batches are ingested, and lazily from Firestore for partitions
+    this process hasn't ingested itself. Analytics run as vectorised NumPy operations.
+    """
+
+    def __init__(self):
+        self._partitions: Dict[Tuple[str, str], PricePartition] = {}
+        self._loaded_at: Dict[Tuple[str, str], float] = {}
+        self._locks: Dict[Tuple[str, str], asyncio.Lock] = {}
+
+    @staticmethod
+    def _key(state: str, commodity: str) -> Tuple[str, str]:
+        return state.strip().lower(), commodity.strip().lower()
+
+    def partition(self, state: str, commodity: str) -> PricePartition:
+        key = self._key(state, commodity)
+        if key not in self._partitions:
+            self._partitions[key] = PricePartition()
+        return self._partitions[key]
+
+    def ingest_batch(self, state: str, batch: PriceBatch):
+        """ add a parsed batch, split by commodity """
+        if len(batch) == 0:
+            return
+        market_names = batch.market_names()
+        for code, commodity in enumerate(batch.commodities):
+            mask = batch.commodity_codes == code
+            if not mask.any():
+                continue
+            self.partition(state, commodity).upsert(
+                batch.dates[mask], market_names[mask],
+                batch.min_price[mask], batch.max_price[mask], batch.modal_price[mask],
+            )
+
+    def ingest_records(self, state: str, commodity: str, records: List[Dict[str, Any]]):
+        """ add stored records (dicts with string dates) to one partition """
+        if not records:
+            return
+        self.partition(state, commodity).upsert(
+            np.array([record["date"] for record in records], dtype="datetime64[D]"),
+            np.array([record["market"] for record in records], dtype=object),
+            np.array([record["min_price"] for record in records], dtype=np.int64),
+            np.array([record["max_price"] for record in records], dtype=np.int64),
+            np.array([record["modal_price"] for record in records], dtype=np.int64),
+        )
+
+    async def ensure_loaded(self, state: str, commodity: str) -> PricePartition:
+        """
+        Load PRICE_STORE_HISTORY_DAYS of history from Firestore the first time a partition is used,
+        then top up the last few days every PRICE_STORE_REFRESH_SECONDS.
+        """
+        key = self._key(state, commodity)
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            loaded_at = self._loaded_at.get(key)
+            if loaded_at is not None and time.monotonic() - loaded_at < config.PRICE_STORE_REFRESH_SECONDS:
+                return self.partition(state, commodity)
+
+            days = config.PRICE_STORE_HISTORY_DAYS if loaded_at is None else config.PRICE_STORE_RELOAD_DAYS
+            end = date.today()
+            start = end - timedelta(days=days)
+            records = await price_storage.get_price_records_range(
+                start_date=start.strftime("%Y-%m-%d"),
+                end_date=end.strftime("%Y-%m-%d"),
+                state=state,
+                commodity=commodity,
+            )
+            self.ingest_records(state, commodity, records)
+            self._loaded_at[key] = time.monotonic()
+            return self.partition(state, commodity)
+
+    @staticmethod
+    def _resolve_date(partition: PricePartition, on_date: Optional[str]) -> Optional[np.datetime64]:
+        return _to_day(on_date) if on_date else partition.latest_date()
+
+    def moving_average(self, partition: PricePartition, window: int, end_date: Optional[str] = None,
+                       market: Optional[str] = None) -> Dict[str, Any]:
+        """ average modal price per market over the `window` days ending at end_date """
+        end = self._resolve_date(partition, end_date)
+        if end is None:
+            return {"end_date": None, "window_days": window, "overall": None, "markets": []}
+
+        rows = partition.window(end - np.timedelta64(window - 1, "D"), end)
+        codes = partition.market_codes[rows]
+        modal = partition.modal_price[rows]
+        dates = partition.dates[rows]
+
+        if market:
+            code = partition.market_code(market)
+            mask = codes == (code if code is not None else -1)
+            codes, modal, dates = codes[mask], modal[mask], dates[mask]
+
+        n_markets = len(partition.markets)
+        counts = np.bincount(codes, minlength=n_markets)
+        sums = np.bincount(codes, weights=modal, minlength=n_markets)
+        present = np.flatnonzero(counts)
+
+        # overall is the mean of the daily cross-market means, so busy mandis don't dominate
+        overall = None
+        if len(dates):
+            _, day_codes = np.unique(dates, return_inverse=True)
+            daily_means = np.bincount(day_codes, weights=modal) / np.bincount(day_codes)
+            overall = round(float(daily_means.mean()), 2)
+
+        return {
+            "end_date": str(end),
+            "window_days": window,
+            "overall": overall,
+            "markets": [
+                {
+                    "market": partition.markets[code],
+                    "average_modal_price": round(float(sums[code] / counts[code]), 2),
+                    "days": int(counts[code]),
+                }
+                for code in present
+            ],
+        }
+
+    def spread(self, partition: PricePartition, on_date: Optional[str] = None) -> Dict[str, Any]:
+        """ min/max/spread of prices across markets on one day """
+        day = self._resolve_date(partition, on_date)
+        rows = partition.window(day, day) if day is not None else slice(0, 0)
+        modal = partition.modal_price[rows]
+        if len(modal) == 0:
+            return {"date": str(day) if day is not None else None, "market_count": 0}
+
+        codes = partition.market_codes[rows]
+        cheapest = int(np.argmin(modal))
+        dearest = int(np.argmax(modal))
+        return {
+            "date": str(day),
+            "market_count": int(len(modal)),
+            "min_price": int(partition.min_price[rows].min()),
+            "max_price": int(partition.max_price[rows].max()),
+            "min_modal_price": int(modal[cheapest]),
+            "max_modal_price": int(modal[dearest]),
+            "modal_spread": int(modal[dearest] - modal[cheapest]),
+            "mean_modal_price": round(float(modal.mean()), 2),
+            "median_modal_price": float(np.median(modal)),
+            "cheapest_market": partition.markets[codes[cheapest]],
+            "most_expensive_market": partition.markets[codes[dearest]],
+        }
+
+    def day_over_day(self, partition: PricePartition, on_date: Optional[str] = None,
+                     market: Optional[str] = None) -> Dict[str, Any]:
+        """ change in modal price per market against that market's previous reported day """
+        day = self._resolve_date(partition, on_date)
+        if day is None:
+            return {"date": None, "markets": []}
+
+        today = partition.window(day, day)
+        today_codes = partition.market_codes[today]
+        today_modal = partition.modal_price[today]
+
+        # rows are sorted by date, so the last occurrence of a code before `day` is its previous report
+        earlier = slice(0, today.start)
+        earlier_codes = partition.market_codes[earlier][::-1]
+        previous_codes, first = np.unique(earlier_codes, return_index=True)
+        previous_rows = today.start - 1 - first
+
+        n_markets = len(partition.markets)
+        previous_modal = np.full(n_markets, -1, dtype=np.int64)
+        previous_dates = np.full(n_markets, np.datetime64("NaT"), dtype="datetime64[D]")
+        previous_modal[previous_codes] = partition.modal_price[previous_rows]
+        previous_dates[previous_codes] = partition.dates[previous_rows]
+
+        prior = previous_modal[today_codes]
+        has_prior = prior >= 0
+        change = np.where(has_prior, today_modal - prior, 0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            change_pct = np.where(has_prior & (prior > 0), change * 100.0 / prior, np.nan)
+
+        markets = []
+        for i, code in enumerate(today_codes):
+            if market and partition.markets[code].strip().lower() != market.strip().lower():
+                continue
+            markets.append({
+                "market": partition.markets[code],
+                "modal_price": int(today_modal[i]),
+                "previous_date": str(previous_dates[code]) if has_prior[i] else None,
+                "previous_modal_price": int(prior[i]) if has_prior[i] else None,
+                "change": int(change[i]) if has_prior[i] else None,
+                "change_pct": round(float(change_pct[i]), 2) if not np.isnan(change_pct[i]) else None,
+            })
+        return {"date": str(day), "markets": markets}
+
+    def top_markets(self, partition: PricePartition, k: int, cheapest: bool = True,
+                    on_date: Optional[str] = None) -> Dict[str, Any]:
+        """ k cheapest or most expensive markets by modal price on one day """
+        day = self._resolve_date(partition, on_date)
+        rows = partition.window(day, day) if day is not None else slice(0, 0)
+        modal = partition.modal_price[rows]
+        codes = partition.market_codes[rows]
+
+        k = min(k, len(modal))
+        if k == 0:
+            return {"date": str(day) if day is not None else None, "markets": []}
+
+        scores = modal if cheapest else -modal
+        top = np.argpartition(scores, k - 1)[:k]
+        top = top[np.argsort(scores[top], kind="stable")]
+        return {
+            "date": str(day),
+            "order": "cheapest" if cheapest else "expensive",
+            "markets": [
+                {
+                    "market": partition.markets[codes[i]],
+                    "min_price": int(partition.min_price[rows][i]),
+                    "max_price": int(partition.max_price[rows][i]),
+                    "modal_price": int(modal[i]),
+                }
+                for i in top
+            ],
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "partitions": len(self._partitions),
+            "rows": sum(len(partition) for partition in self._partitions.values()),
+        }
+
+
+# Global instance
+price_store = ColumnarPriceStore()
@@ -0,0 +1,111 @@
+import asyncio
+import base64
+import json
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from app.core.config import config
+from app.db.firestore import firestore_service
+from app.db.price_storage import price_storage
+
+CURSOR_VERSION = 1
+SYNC_FIELDS = ("date", "market", "variety", "min_price", "max_price", "modal_price")
+
+# per subscription watermark: the sync position and document id of the last record the client has,
+# the position is the write timestamp on firestore and the writing transaction id on postgres, and the
+# updated_at lower bound the subscription started from, kept for every later page. Cursors from before
+# the lower bound was carried have no third element and decode it as None.
+Watermark = Tuple[Union[datetime, int], str, Optional[datetime]]
+
+
+class InvalidCursorError(ValueError):
+    pass
+
+
+def _subscription_key(state: str, commodity: str) -> str:
+    return f"{firestore_service._path_key(state)}/{firestore_service._path_key(commodity)}"
+
+
+def _encode_time(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def encode_cursor(watermarks: Dict[str, Watermark]) -> str:
+    payload = {
+        "v": CURSOR_VERSION,
+        "w": {
+            key: [_encode_time(position), doc_id, _encode_time(since)]
+            for key, (position, doc_id, since) in watermarks.items()
+        },
+    }
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> Dict[str, Watermark]:
+    if not cursor:
+        return {}
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        if payload.get("v") != CURSOR_VERSION:
+            raise ValueError(f"unsupported cursor version {payload.get('v')}")
+        watermarks = {}
+        for key, (position, doc_id, *rest) in payload["w"].items():
+            since = rest[0] if rest else None
+            watermarks[key] = (
+                datetime.fromisoformat(position) if isinstance(position, str) else int(position),
+                doc_id,
+                datetime.fromisoformat(since) if since else None,
+            )
+        return watermarks
+    except Exception as e:
+        raise InvalidCursorError(f"invalid sync cursor: {e}")
+
+
+async def sync_prices(
+        subscriptions: List[Tuple[str, str]],
+        cursor: Optional[str] = None,
+        since_days: int = 7,
+) -> Dict[str, Any]:
+    """
+    Price records changed since the cursor for each (state, commodity) subscription, plus the next cursor.
+
+    Relies on a sync position on every price record, which only moves when a record's content changes:
+    the write timestamp on firestore, the writing transaction id on postgres. Subscriptions new to the
+    cursor start `since_days` back. Each subscription returns at most PRICE_SYNC_PAGE_SIZE records per
+    call, has_more tells the client to sync again straight away.
+    Watermarks of subscriptions not in this request are carried over unchanged.
+    """
+    watermarks = decode_cursor(cursor)
+    initial = datetime.now(timezone.utc) - timedelta(days=since_days)
+    limit = config.PRICE_SYNC_PAGE_SIZE
+
+    async def changes(state: str, commodity: str) -> Tuple[str, List[Dict[str, Any]]]:
+        key = _subscription_key(state, commodity)
+        after, after_id, since = watermarks.get(key, (initial, "", initial))
+        records = await price_storage.get_price_changes(state, commodity, after, after_id, limit, since=since)
+        if records:
+            last = records[-1]
+            watermarks[key] = (last.get("change_xid", last["timestamp"]), last["id"], since)
+        else:
+            watermarks.setdefault(key, (after, after_id, since))
+        return key, records
+
+    unique = list(dict.fromkeys((state, commodity) for state, commodity in subscriptions))
+    results = await asyncio.gather(*(changes(state, commodity) for state, commodity in unique))
+
+    # unchanged subscriptions are left out entirely, so a quiet day is just the cursor
+    return {
+        "cursor": encode_cursor(watermarks),
+        "has_more": any(len(records) >= limit for _, records in results),
+        "changes": [
+            {
+                "state": state,
+                "commodity": commodity,
+                "records": [{field: record.get(field) for field in SYNC_FIELDS} for record in records],
+            }
+            for (state, commodity), (_, records) in zip(unique, results)
+            if records
+        ],
+    }
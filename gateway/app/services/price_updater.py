@@ -3,10 +3,33 @@
 import httpx
 import asyncio
 from datetime import datetime, timedelta
-from typing import Optional, Dict
+from typing import Optional, Dict, List, AsyncIterator
 
+from app.core.config import config
+from app.core.http_client import get_http_client
 from app.models.price_record import PriceRecord
-from app.db.firestore import store_in_firestore, store_multiple_in_firestore
+from app.services.price_parser import PriceBatch, parse_price_batch
+from app.services.price_rollups import price_rollups
+from app.services.price_screener import price_screener
+from app.services.price_store import price_store
+from app.db.firestore import store_in_firestore
+from app.db.price_storage import price_storage
+from app.utils.circuit_breaker import CircuitBreakerRegistry, CircuitOpenError
+from app.utils.rate_limiter import TokenBucket
+from app.utils.single_flight import SingleFlight
+
+# shared by every updater in the process so that together they stay under the data.gov.in limit
+upstream_rate_limiter = TokenBucket(rate=config.PRICE_API_RATE_LIMIT, burst=config.PRICE_API_BURST)
+
+# one breaker per data.gov.in resource, so a dead upstream fails fast instead of tying up every caller
+upstream_breakers = CircuitBreakerRegistry(
+    failure_threshold=config.PRICE_API_BREAKER_FAILURES,
+    reset_timeout=config.PRICE_API_BREAKER_RESET_SECONDS,
+    thresholds=config.PRICE_API_BREAKER_THRESHOLDS,
+)
+
+# concurrent refreshes of the same (resource, state, commodity, market, date) share one fetch and store
+refresh_flight = SingleFlight(window=config.PRICE_REFRESH_COALESCE_SECONDS)
 
 
 class CropPriceUpdater:
@@ -20,6 +43,8 @@ class CropPriceUpdater:
             state: str,
             market: Optional[str] = None,
             days_back: int = 0,
+            max_concurrency: Optional[int] = None,
+            client: Optional[httpx.AsyncClient] = None,
     ):
         self.api_key = api_key
         self.resource_id = resource_id
@@ -27,101 +52,221 @@ class CropPriceUpdater:
         self.state = state
         self.market = market
         self.days_back = days_back
+        self.max_concurrency = max(1, max_concurrency or config.PRICE_API_MAX_CONCURRENCY)
+        # pooled client shared across requests, so calls reuse keep-alive connections
+        self.client = client or get_http_client()
 
-    async def fetch_multi_day_data(self):
-        all_records = []
-
-        async with httpx.AsyncClient() as client:
-            for i in range(self.days_back + 1):  # include today
-                fetch_date = (datetime.today() - timedelta(days=i)).strftime("%Y-%m-%d")
-
-                params = {
-                    "api-key": self.api_key,
-                    "format": "json",
-                    "filters[commodity]": self.commodity,
-                    "filters[state]": self.state,
-                    "filters[arrival_date]": fetch_date,
-                    "limit": 1000,
-                }
-                if self.market:
-                    params["filters[market]"] = self.market
-
-                url = f"{self.BASE_URL}/{self.resource_id}"
-                response = await client.get(url, params=params)
-
-                if response.status_code == 200:
-                    data = response.json().get("records", [])
-                    all_records.extend(data)
-                else:
-                    print(f"[ERROR] Skipping date {fetch_date}: {response.status_code}")
-
-                await asyncio.sleep(1)  # avoid rate limiting
-
-        return all_records
-
-    async def update_daily_prices(self):
-        fetch_date = (datetime.today() - timedelta(days=self.days_back)).strftime("%Y-%m-%d")
+    @property
+    def url(self) -> str:
+        return f"{self.BASE_URL}/{self.resource_id}"
 
+    def _build_params(self, fetch_date: Optional[str] = None) -> Dict:
         params = {
             "api-key": self.api_key,
             "format": "json",
             "filters[commodity]": self.commodity,
             "filters[state]": self.state,
-            "filters[arrival_date]": fetch_date,
-            "limit": 1000,
+            "limit": config.PRICE_API_PAGE_SIZE,
         }
-
+        if fetch_date:
+            params["filters[arrival_date]"] = fetch_date
         if self.market:
             params["filters[market]"] = self.market
+        return params
 
-        url = f"{self.BASE_URL}/{self.resource_id}"
-        
-        print(f"[DEBUG] Making API call to: {url}")
-        print(f"[DEBUG] With params: {params}")
+    @property
+    def breaker(self):
+        return upstream_breakers.get(self.resource_id)
+
+    def upstream_available(self) -> bool:
+        """ False while this resource's circuit breaker is open """
+        return self.breaker.allows_calls()
 
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, params=params)
+    async def _get(self, url: str, params: Dict) -> httpx.Response:
+        """
+        GET against data.gov.in, paced by the process-wide rate limiter and guarded by the resource's
+        circuit breaker. Raises CircuitOpenError without calling upstream while the breaker is open.
+        Any exception, cancellation included, 429s and 5xx responses count as failures.
+        """
+        breaker = self.breaker
+        breaker.before_call()
+        # from here on every exit settles the breaker, a half-open probe that didn't would keep it half open
+        try:
+            await upstream_rate_limiter.acquire()
+            response = await asyncio.wait_for(
+                self.client.get(url, params=params), timeout=config.PRICE_API_DEADLINE_SECONDS
+            )
+        except BaseException:
+            breaker.record_failure()
+            raise
+
+        if response.status_code == 429 or response.status_code >= 500:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        return response
+
+    async def _stream_pages(self, fetch_date: Optional[str] = None) -> AsyncIterator[Dict]:
+        """
+        Yield response pages one at a time, following offset/total pagination.
+        Without a total in the response, paging goes on while pages come back full.
+        Only the current page is held in memory.
+        """
+        params = self._build_params(fetch_date)
+        limit = int(params["limit"])
+        offset = 0
+
+        while True:
+            params["offset"] = offset
+            response = await self._get(self.url, params)
             response.raise_for_status()
 
-            data = response.json()
-            print(f"[DEBUG] API Response status: {response.status_code}")
-            print(f"[DEBUG] API Response data keys: {list(data.keys()) if isinstance(data, dict) else 'Not a dict'}")
-            print(f"[DEBUG] API Response total: {data.get('total', 'N/A')}")
-            print(f"[DEBUG] API Response count: {data.get('count', 'N/A')}")
-            print(f"[DEBUG] API Response message: {data.get('message', 'N/A')}")
-            
-            # Print the full response for debugging
-            print(f"[DEBUG] Full API Response: {data}")
-            
-            records = data.get("records", [])
-            
-            print(f"[DEBUG] Fetched {len(records)} records from API")
-            
-            # Store records in Firestore
-            firestore_records = []
-            
-            for entry in records:
+            page = response.json()
+            records = page.get("records", [])
+            yield page
+
+            offset += len(records)
+            if not records:
+                break
+            total = page.get("total")
+            if total is None or total == "":
+                if len(records) < limit:
+                    break
+            elif offset >= int(total):
+                break
+
+    async def stream_records(self, fetch_date: Optional[str] = None) -> AsyncIterator[Dict]:
+        """ Yield raw upstream records across all pages """
+        async for page in self._stream_pages(fetch_date):
+            for entry in page.get("records", []):
+                yield entry
+
+    def _parse_batch(self, entries: List[Dict]) -> PriceBatch:
+        """ Parse a page of raw records in one columnar pass, logging the rows that were skipped """
+        batch = parse_price_batch(entries)
+        for _, error in batch.errors:
+            print(f"[ERROR] Skipping record due to parse error: {error}")
+        return batch
+
+    async def stream_price_batches(self, fetch_date: Optional[str] = None) -> AsyncIterator[PriceBatch]:
+        """ Yield one parsed PriceBatch per upstream page """
+        async for page in self._stream_pages(fetch_date):
+            yield self._parse_batch(page.get("records", []))
+
+    async def stream_price_records(self, fetch_date: Optional[str] = None) -> AsyncIterator[Dict]:
+        """ Yield parsed and validated records ready for Firestore, skipping rows that fail to parse """
+        async for batch in self.stream_price_batches(fetch_date):
+            for record_dict in batch.to_dicts(state=self.state):
+                yield record_dict
+
+    async def ingest(self, fetch_date: Optional[str] = None) -> Dict[str, int]:
+        """
+        Stream records for a date into Firestore in chunks of PRICE_STORE_CHUNK_SIZE.
+        Chunks are stored as soon as they fill up, so storage starts before the last page is downloaded.
+        Rows the screener flags are quarantined instead of stored.
+        """
+        totals = {'success': 0, 'failure': 0, 'total': 0, 'inserted': 0, 'updated': 0, 'unchanged': 0, 'quarantined': 0}
+        chunk: List[Dict] = []
+        # (commodity, date) pairs whose stored prices changed, their rollups are recomputed at the end
+        changed = set()
+
+        async def flush():
+            result = await price_storage.store_price_records(chunk)
+            for key in totals:
+                totals[key] += result.get(key, 0)
+            if result['inserted'] or result['updated']:
+                changed.update((record['commodity'], record['date']) for record in chunk)
+            print(f"[FIRESTORE] Stored {result['success']}/{result['total']} records successfully "
+                  f"({result['inserted']} inserted, {result['updated']} updated, {result['unchanged']} unchanged)")
+            chunk.clear()
+
+        async for batch in self.stream_price_batches(fetch_date):
+            # screen before the columnar store sees the batch, so outliers don't become history
+            batch, quarantined = await price_screener.screen(self.state, batch)
+            if quarantined:
+                totals['quarantined'] += await price_storage.store_quarantined_records(quarantined)
+                print(f"[SCREENER] Quarantined {len(quarantined)} records: "
+                      f"{sorted({record['reason'] for record in quarantined})}")
+
+            # keep the in-process columnar store current for the analytics endpoints
+            price_store.ingest_batch(self.state, batch)
+            for record_dict in batch.to_dicts(state=self.state):
+                chunk.append(record_dict)
+                if len(chunk) >= config.PRICE_STORE_CHUNK_SIZE:
+                    await flush()
+
+        if chunk:
+            await flush()
+
+        for commodity in {commodity for commodity, _ in changed}:
+            await price_rollups.update(self.state, commodity, {d for c, d in changed if c == commodity})
+
+        return totals
+
+    def _refresh_key(self, fetch_date: str) -> tuple:
+        return (
+            self.resource_id,
+            self.state.strip().lower(),
+            self.commodity.strip().lower(),
+            self.market.strip().lower() if self.market else None,
+            fetch_date,
+        )
+
+    async def refresh(self, fetch_date: str) -> Dict[str, int]:
+        """
+        ingest() coalesced across the process: callers refreshing the same key while a refresh is in flight,
+        or within PRICE_REFRESH_COALESCE_SECONDS of one finishing, get its result instead of fetching again
+        """
+        return await refresh_flight.do(self._refresh_key(fetch_date), lambda: self.ingest(fetch_date))
+
+    async def fetch_multi_day_data(self):
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def fetch_day(fetch_date: str):
+            records = []
+            async with semaphore:
                 try:
-                    record = self._parse_to_price_record(entry)
-                    # Convert to dict and add state for Firestore
-                    record_dict = record.dict()
-                    record_dict['state'] = self.state
-                    firestore_records.append(record_dict)
-                    print(f"[PARSED RECORD] {record}")
-                except Exception as e:
-                    print(f"[ERROR] Skipping record due to parse error: {e}")
-                    print(f"[ERROR] Problematic entry: {entry}")
-            
-            print(f"[DEBUG] Prepared {len(firestore_records)} records for Firestore")
-            
-            # Store all records in Firestore
-            if firestore_records:
-                result = await store_multiple_in_firestore(firestore_records)
-                print(f"[FIRESTORE] Stored {result['success']}/{result['total']} records successfully")
-            else:
-                print("[WARNING] No records to store in Firestore")
+                    async for entry in self.stream_records(fetch_date):
+                        records.append(entry)
+                except httpx.HTTPStatusError as e:
+                    print(f"[ERROR] Skipping date {fetch_date}: {e.response.status_code}")
+                except (CircuitOpenError, asyncio.TimeoutError, httpx.HTTPError) as e:
+                    # an open breaker, a deadline or a transport error on one day mustn't fail the gather
+                    print(f"[ERROR] Skipping date {fetch_date}: {type(e).__name__} {e}")
+            return records
+
+        fetch_dates = [
+            (datetime.today() - timedelta(days=i)).strftime("%Y-%m-%d")
+            for i in range(self.days_back + 1)  # include today
+        ]
+
+        results = await asyncio.gather(*(fetch_day(fetch_date) for fetch_date in fetch_dates))
+
+        all_records = []
+        for records in results:
+            all_records.extend(records)
+
+        return all_records
+
+    async def update_daily_prices(self) -> Dict[str, int]:
+        fetch_date = (datetime.today() - timedelta(days=self.days_back)).strftime("%Y-%m-%d")
+
+        # the scheduler runs this unattended, so the api key never goes to the logs
+        params = {**self._build_params(fetch_date), "api-key": "<redacted>"}
+        print(f"[DEBUG] Making API call to: {self.url}")
+        print(f"[DEBUG] With params: {params}")
+
+        result = await self.refresh(fetch_date)
+
+        if result['total'] == 0:
+            print("[WARNING] No records to store in Firestore")
+        else:
+            print(f"[FIRESTORE] Stored {result['success']}/{result['total']} records for {fetch_date}")
+
+        return result
 
     def _parse_to_price_record(self, entry: Dict) -> PriceRecord:
+        """ Per-row parser, kept for single records, pages go through parse_price_batch """
         date_str = entry["arrival_date"]
         date_obj = None
         for fmt in ("%Y-%m-%d", "%d/%m/%Y"):
@@ -144,35 +289,20 @@ class CropPriceUpdater:
 
     async def fetch_cleaned_data(self):
         raw_records = await self.fetch_multi_day_data()
-        cleaned = []
-
-        for entry in raw_records:
-            try:
-                parsed = self._parse_to_price_record(entry)
-                cleaned.append(parsed.dict())
-            except Exception as e:
-                print(f"[ERROR] Skipping record due to parse error: {e}")
-
-        return cleaned
+        # PriceRecord dicts, dates as date objects, the shape this returned before batch parsing
+        return [record.dict() for record in self._parse_batch(raw_records).to_records()]
 
     async def fetch_raw_data(self):
-        fetch_date = (datetime.today() - timedelta(days=self.days_back)).strftime("%Y-%m-%d")
+        """ Fetch every page of the unfiltered-by-date query, returned in the upstream response shape """
+        response_data = None
+        records = []
 
-        params = {
-            "api-key": self.api_key,
-            "format": "json",
-            "filters[commodity]": self.commodity,
-            "filters[state]": self.state,
-            # "filters[arrival_date]": fetch_date,
-            "limit": 1000,
-        }
-
-        if self.market:
-            params["filters[market]"] = self.market
+        async for page in self._stream_pages():
+            records.extend(page.get("records", []))
+            if response_data is None:
+                response_data = page
 
-        url = f"{self.BASE_URL}/{self.resource_id}"
-
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, params=params)
-            response.raise_for_status()
-            return response.json()  # 👈 this is what you want to print or return
+        response_data = response_data or {}
+        response_data["records"] = records
+        response_data["count"] = len(records)
+        return response_data
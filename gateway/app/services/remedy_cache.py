@@ -0,0 +1,142 @@
+import json
+import os
+import re
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from app.core.config import config
+from app.db.firestore import firestore_service
+from app.utils.cache import TTLCache
+
+SEVERITY_ALIASES = {
+    "mild": "low",
+    "minor": "low",
+    "moderate": "medium",
+    "severe": "high",
+    "critical": "high",
+    "healthy": "none",
+    "": "none",
+}
+LANGUAGE_ALIASES = {
+    "en": "english",
+    "hi": "hindi",
+    "mr": "marathi",
+    "bn": "bengali",
+    "te": "telugu",
+    "ta": "tamil",
+    "gu": "gujarati",
+    "kn": "kannada",
+    "ml": "malayalam",
+    "pa": "punjabi",
+    "or": "odia",
+}
+
+
+def _normalise_text(value: Optional[str]) -> str:
+    """ lower case, punctuation to spaces, collapsed whitespace """
+    return " ".join(re.sub(r"[^\w\s]", " ", (value or "").lower()).split())
+
+
+class RemedyCache:
+    """
+    Remedies keyed on normalised (disease, severity, language).
+
+    An in-process TTL/LRU cache answers repeat lookups without leaving the process, backed by the
+    remedy_cache Firestore collection so entries survive restarts and are shared between workers.
+    Disease names are normalised for case and punctuation and mapped through known synonyms.
+    """
+
+    def __init__(self):
+        self.collection_name = "remedy_cache"
+        self.ttl = config.REMEDY_CACHE_TTL_SECONDS
+        self.memory = TTLCache(maxsize=config.REMEDY_CACHE_MAX_ENTRIES, ttl=self.ttl)
+        self.persist = config.REMEDY_CACHE_PERSIST
+        self.synonyms: Dict[str, str] = {}
+        self.persistent_hits = 0
+        self.persistent_misses = 0
+
+    def normalise_disease(self, disease_name: str) -> str:
+        name = _normalise_text(disease_name)
+        return self.synonyms.get(name, name)
+
+    def key(self, disease_name: str, severity: str, language: str) -> Tuple[str, str, str]:
+        severity = _normalise_text(severity)
+        language = _normalise_text(language)
+        return (
+            self.normalise_disease(disease_name),
+            SEVERITY_ALIASES.get(severity, severity),
+            LANGUAGE_ALIASES.get(language, language),
+        )
+
+    def _doc_path(self, key: Tuple[str, str, str]) -> str:
+        return f"{self.collection_name}/" + "--".join(part.replace(" ", "_") or "_" for part in key)
+
+    def contains(self, disease_name: str, severity: str, language: str) -> bool:
+        """ whether the remedy is already in memory, without touching the hit counters """
+        return self.key(disease_name, severity, language) in self.memory
+
+    async def get(self, disease_name: str, severity: str, language: str) -> Optional[Dict[str, Any]]:
+        key = self.key(disease_name, severity, language)
+        remedy = self.memory.get(key)
+        if remedy is not None or not self.persist:
+            return remedy
+
+        try:
+            doc = await firestore_service.db.document(self._doc_path(key)).get()
+        except Exception as e:
+            print(f"[REMEDY CACHE ERROR] Failed to read {key}: {e}")
+            return None
+        data = doc.to_dict() if doc.exists else None
+        if not data or time.time() - data.get("cached_at", 0) > self.ttl:
+            self.persistent_misses += 1
+            return None
+
+        self.persistent_hits += 1
+        self.memory.set(key, data["remedy"])
+        return data["remedy"]
+
+    async def set(self, disease_name: str, severity: str, language: str, remedy: Dict[str, Any]):
+        key = self.key(disease_name, severity, language)
+        self.memory.set(key, remedy)
+        if not self.persist:
+            return
+        try:
+            await firestore_service.db.document(self._doc_path(key)).set({
+                "disease": key[0],
+                "severity": key[1],
+                "language": key[2],
+                "remedy": remedy,
+                "cached_at": time.time(),
+            })
+        except Exception as e:
+            print(f"[REMEDY CACHE ERROR] Failed to store {key}: {e}")
+
+    def warm_up(self, path: str) -> int:
+        """
+        Load synonyms and remedies from a seed file into memory, returns how many remedies were loaded.
+        Seed format: {"synonyms": {"alias": "disease"}, "remedies": [{"disease", "severity", "language", "remedy"}]}
+        """
+        if not os.path.exists(path):
+            return 0
+        with open(path) as f:
+            seed = json.load(f)
+
+        for alias, disease in seed.get("synonyms", {}).items():
+            self.synonyms[_normalise_text(alias)] = _normalise_text(disease)
+        remedies = seed.get("remedies", [])
+        for entry in remedies:
+            self.memory.set(self.key(entry["disease"], entry["severity"], entry["language"]), entry["remedy"])
+        print(f"[REMEDY CACHE] Loaded {len(self.synonyms)} synonyms and {len(remedies)} remedies from {path}")
+        return len(remedies)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.memory.stats(),
+            "persistent_hits": self.persistent_hits,
+            "persistent_misses": self.persistent_misses,
+            "synonyms": len(self.synonyms),
+        }
+
+
+# Global instance
+remedy_cache = RemedyCache()
@@ -0,0 +1,105 @@
+import time
+from typing import Any, Dict, Optional
+
+
+class CircuitOpenError(Exception):
+    """ raised instead of calling an endpoint whose breaker is open """
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"circuit for {name} is open, retry in {retry_after:.0f}s")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    After `failure_threshold` failures in a row the circuit opens and calls fail fast with CircuitOpenError.
+    Once `reset_timeout` seconds have passed it goes half open and lets `half_open_max_calls` probes through,
+    a successful probe closes it again and a failed one re-opens it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30, half_open_max_calls: int = 1):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.half_open_max_calls = max(1, half_open_max_calls)
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+        self.opened_count = 0
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._state = self.HALF_OPEN
+            self._probes = 0
+        return self._state
+
+    def allows_calls(self) -> bool:
+        """ whether a call would be let through right now, without taking a half-open probe slot """
+        state = self.state
+        return state == self.CLOSED or (state == self.HALF_OPEN and self._probes < self.half_open_max_calls)
+
+    def before_call(self):
+        """ raise CircuitOpenError if the call should not be made """
+        state = self.state
+        if state == self.CLOSED:
+            return
+        if state == self.HALF_OPEN and self._probes < self.half_open_max_calls:
+            self._probes += 1
+            return
+        self.rejected += 1
+        raise CircuitOpenError(self.name, max(0.0, self._opened_at + self.reset_timeout - time.monotonic()))
+
+    def record_success(self):
+        self._failures = 0
+        if self._state == self.HALF_OPEN:
+            print(f"[CIRCUIT] {self.name} closed after a successful probe")
+        self._state = self.CLOSED
+
+    def record_failure(self):
+        self._failures += 1
+        if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+            if self._state != self.OPEN:
+                self.opened_count += 1
+                print(f"[CIRCUIT] {self.name} opened after {self._failures} consecutive failures")
+            self._state = self.OPEN
+            self._opened_at = time.monotonic()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self._failures,
+            "opened": self.opened_count,
+            "rejected": self.rejected,
+        }
+
+
+class CircuitBreakerRegistry:
+    """ one breaker per endpoint, created on first use, thresholds can be set per endpoint """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30, half_open_max_calls: int = 1,
+                 thresholds: Optional[Dict[str, int]] = None):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.thresholds = thresholds or {}
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    def get(self, name: str) -> CircuitBreaker:
+        if name not in self._breakers:
+            self._breakers[name] = CircuitBreaker(
+                name, self.thresholds.get(name, self.failure_threshold), self.reset_timeout, self.half_open_max_calls
+            )
+        return self._breakers[name]
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: breaker.stats() for name, breaker in self._breakers.items()}
@@ -0,0 +1,65 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+from app.utils.cache import TTLCache
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls for the same key into one execution.
+
+    The first caller for a key runs the work, callers that arrive while it is in flight await the same
+    result. Successful results are also kept for `window` seconds, so callers shortly after still share it.
+    Failures are never kept, the next caller runs the work again.
+    """
+
+    def __init__(self, window: float = 0, maxsize: int = 1024):
+        self.window = window
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self._recent = TTLCache(maxsize=maxsize, ttl=window) if window > 0 else None
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+        self.recent_hits = 0
+        self.waiting = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        self.calls += 1
+        if self._recent is not None:
+            result = self._recent.get(key)
+            if result is not None:
+                self.recent_hits += 1
+                return result
+
+        future = self._inflight.get(key)
+        if future is None:
+            self.executions += 1
+            # run as its own task, so a leader that gets cancelled doesn't cancel the work for the others
+            future = asyncio.ensure_future(fn())
+            self._inflight[key] = future
+            future.add_done_callback(lambda done: self._finish(key, done))
+        else:
+            self.coalesced += 1
+
+        self.waiting += 1
+        try:
+            return await asyncio.shield(future)
+        finally:
+            self.waiting -= 1
+
+    def _finish(self, key: Hashable, future: asyncio.Future):
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+        if self._recent is not None and not future.cancelled() and future.exception() is None:
+            self._recent.set(key, future.result())
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "recent_hits": self.recent_hits,
+            "waiting": self.waiting,
+            "inflight": len(self._inflight),
+            "window_seconds": self.window,
+        }
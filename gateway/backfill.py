@@ -0,0 +1,8 @@
+from app.services.price_backfill import main
+
+# entry point for the resumable historical price backfill, e.g.
+#   python backfill.py --start 2023-08-01 --end 2025-07-31 \
+#       --states "Uttar Pradesh" Maharashtra --commodities Wheat Onion Potato
+# re-running the same command resumes from price_backfill.checkpoint.jsonl
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Load test: analysis time, and latency of light endpoints while crop disease analyses are in flight.
+
+Gemini is replaced by a stub that takes --model-latency seconds per call, so no model is called.
+Analyses hit /api/crop-disease/detect while a prober times /api/prices/sample-data and
+/api/crop-disease/health in the same process. With --blocking the stub sleeps synchronously,
+like the old sync client did, to show the event loop stalling for comparison.
+
+Every analysis gets its own image, so the analysis cache can't collapse them into one model call.
+--same-image sends one image for all of them instead, to see the cache and in-flight sharing at work.
+
+    FIRESTORE_CREDS=.keys/service-account-key.json python -m benchmarks.disease_load --analyses 20
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from types import SimpleNamespace
+
+import httpx
+import numpy as np
+from PIL import Image, ImageFilter
+
+from app import app
+from app.services import crop_disease
+from app.services.analysis_cache import analysis_cache
+from app.services.remedy_cache import remedy_cache
+
+
+def stub_client(latency: float, blocking: bool):
+    async def generate_content(model, contents, config):
+        if blocking:
+            time.sleep(latency)
+        else:
+            await asyncio.sleep(latency)
+        disease = {"disease_name": "Leaf Rust", "severity": "medium"}
+        remedy = {"remedy_steps": "Spray fungicide", "recheck_days": 7, "estimated_cost": 500}
+        if config["response_schema"] is crop_disease.DiseaseAnalysis:
+            return SimpleNamespace(parsed={"disease": disease, "remedy": remedy})
+        if config["response_schema"] is crop_disease.Disease:
+            return SimpleNamespace(parsed=disease)
+        return SimpleNamespace(parsed=remedy)
+
+    return SimpleNamespace(aio=SimpleNamespace(models=SimpleNamespace(generate_content=generate_content)))
+
+
+async def probe(client: httpx.AsyncClient, path: str, stop: asyncio.Event, latencies: list):
+    """ request `path` every 50 ms, latency counts from when the request was due, so loop stalls show up """
+    due = time.perf_counter()
+    while not stop.is_set():
+        await client.get(path)
+        latencies.append((time.perf_counter() - due) * 1000)
+        due = time.perf_counter() + 0.05
+        await asyncio.sleep(0.05)
+
+
+def sample_images(directory: str, count: int) -> list:
+    """ distinct textured images, far apart in dHash so none near-match another """
+    rng = np.random.default_rng(0)
+    paths = []
+    for i in range(count):
+        noise = (rng.random((480, 640, 3)) * 255).astype("uint8")
+        path = os.path.join(directory, f"crop_{i}.jpg")
+        Image.fromarray(noise).filter(ImageFilter.GaussianBlur(8)).save(path, format="JPEG")
+        paths.append(path)
+    return paths
+
+
+def summary(latencies: list) -> str:
+    if not latencies:
+        return "no samples"
+    ordered = sorted(latencies)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    return f"n={len(ordered):4d}  p50={statistics.median(ordered):8.1f} ms  p99={p99:8.1f} ms  max={ordered[-1]:8.1f} ms"
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--analyses", type=int, default=20, help="concurrent disease analyses")
+    parser.add_argument("--model-latency", type=float, default=2.0, help="seconds per stubbed model call")
+    parser.add_argument("--blocking", action="store_true", help="stub the old synchronous client")
+    parser.add_argument("--mode", choices=crop_disease.ANALYSIS_MODES, default="combined")
+    parser.add_argument("--same-image", action="store_true", help="send one image for every analysis")
+    args = parser.parse_args()
+
+    crop_disease.client = stub_client(args.model_latency, args.blocking)
+    remedy_cache.persist = False  # keep the remedy cache in memory, no Firestore
+
+    scratch = tempfile.TemporaryDirectory()
+    image_paths = sample_images(scratch.name, 1 if args.same_image else args.analyses)
+
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://gateway", timeout=None) as client:
+            stop = asyncio.Event()
+            results = {"/api/prices/sample-data": [], "/api/crop-disease/health": []}
+            probes = [asyncio.create_task(probe(client, path, stop, latencies)) for path, latencies in results.items()]
+
+            start = time.perf_counter()
+            responses = await asyncio.gather(*(
+                client.get("/api/crop-disease/detect", params={
+                    "image_path": image_paths[i % len(image_paths)], "mode": args.mode,
+                })
+                for i in range(args.analyses)
+            ))
+            elapsed = time.perf_counter() - start
+            stop.set()
+            await asyncio.gather(*probes)
+    finally:
+        scratch.cleanup()
+
+    ok = sum(1 for response in responses if response.json().get("status") == "ok")
+    print(f"{args.analyses} {args.mode} analyses ({ok} ok) in {elapsed:.1f}s, "
+          f"{'blocking' if args.blocking else 'async'} model stub, "
+          f"{len(image_paths)} distinct image{'s' if len(image_paths) > 1 else ''}")
+    cache = analysis_cache.stats()
+    print(f"analysis cache: {cache['exact_hits']} exact, {cache['near_hits']} near, {cache['coalesced']} coalesced")
+    for path, latencies in results.items():
+        print(f"{path:<28} {summary(latencies)}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
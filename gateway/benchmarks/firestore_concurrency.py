@@ -0,0 +1,93 @@
+"""
+Benchmark concurrent price reads against a local Firestore emulator.
+
+Start the emulator first and point the client at it:
+
+    gcloud emulators firestore start --host-port=localhost:8081
+    FIRESTORE_EMULATOR_HOST=localhost:8081 GOOGLE_CLOUD_PROJECT=sahayak-bench \
+        python -m benchmarks.firestore_concurrency
+
+What to look for: with the async client, throughput grows with concurrency and the event loop
+lag (how late a 10ms heartbeat fires) stays close to zero while reads are in flight. Expected
+behaviour, not recorded results: no numbers have been taken against an emulator yet.
+"""
+import argparse
+import asyncio
+import os
+import time
+from datetime import date
+
+from app.db.firestore import firestore_service
+
+STATE = "Bench State"
+COMMODITY = "Wheat"
+DATE = date.today().strftime("%Y-%m-%d")
+
+
+async def seed(markets: int):
+    records = [
+        {
+            "date": DATE,
+            "market": f"Market {i}",
+            "commodity": COMMODITY,
+            "state": STATE,
+            "variety": "Dara",
+            "min_price": 2400 + i,
+            "max_price": 2600 + i,
+            "modal_price": 2500 + i,
+        }
+        for i in range(markets)
+    ]
+    result = await firestore_service.store_price_records(records)
+    print(f"seeded {result['success']}/{result['total']} records")
+
+
+async def heartbeat(stop: asyncio.Event, lags: list, interval: float = 0.01):
+    """ record how late each tick fires, a blocked loop shows up as large lag """
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - start - interval)
+
+
+async def run_level(concurrency: int, requests: int):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one_read():
+        async with semaphore:
+            await firestore_service.get_price_records(date_str=DATE, state=STATE, commodity=COMMODITY)
+
+    stop = asyncio.Event()
+    lags = []
+    probe = asyncio.create_task(heartbeat(stop, lags))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one_read() for _ in range(requests)))
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    await probe
+
+    max_lag_ms = max(lags) * 1000 if lags else 0.0
+    print(f"concurrency={concurrency:>3}  requests={requests}  "
+          f"elapsed={elapsed:6.2f}s  throughput={requests / elapsed:7.1f} req/s  "
+          f"max_loop_lag={max_lag_ms:6.1f}ms")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--markets", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 4, 16, 64])
+    args = parser.parse_args()
+
+    if not os.getenv("FIRESTORE_EMULATOR_HOST"):
+        raise SystemExit("FIRESTORE_EMULATOR_HOST is not set, refusing to benchmark against a real project")
+
+    await seed(args.markets)
+    for level in args.levels:
+        await run_level(level, args.requests)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,140 @@
+"""
+Benchmark the image preprocessing stage: bytes sent to the model and CPU time per image, before and after.
+
+"before" is what the old path did: a full decode, then the SDK re-encoding the whole image
+(PNG for PNG uploads, JPEG otherwise). "after" is prepare_image with the IMAGE_* settings, run in
+this process for its CPU time, then through the service's process pool as requests get it, for the
+worker start up and the pickling of arguments and results on top.
+Uses the images in --corpus, or generates phone sized JPEGs and PNGs when none is given.
+
+    FIRESTORE_CREDS=.keys/service-account-key.json python -m benchmarks.image_preprocess --corpus ./samples
+"""
+import argparse
+import asyncio
+import io
+import os
+import statistics
+import tempfile
+import time
+
+import numpy as np
+from PIL import Image, ImageFilter, PngImagePlugin
+
+from imaging.preprocess import prepare_image
+
+# app is imported inside main(): spawned pool workers import this script as their __main__ and
+# must not build the app, as under uvicorn
+
+EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp")
+
+
+def synthetic_corpus(directory: str, count: int):
+    """ 12 megapixel photos with some texture, rotated by EXIF like a phone held upright """
+    rng = np.random.default_rng(0)
+    for i in range(count):
+        noise = (rng.random((750, 1000, 3)) * 255).astype("uint8")
+        image = Image.fromarray(noise).filter(ImageFilter.GaussianBlur(3)).resize((4000, 3000), Image.BICUBIC)
+        if i % 4 == 3:
+            image.save(os.path.join(directory, f"sample_{i}.png"))
+        else:
+            exif = Image.Exif()
+            exif[0x0112] = 6  # rotated 90 degrees
+            image.save(os.path.join(directory, f"sample_{i}.jpg"), quality=92, exif=exif)
+
+
+def before(path: str) -> int:
+    image = Image.open(path)
+    image.load()
+    buffer = io.BytesIO()
+    # as google.genai serialises a PIL image
+    if isinstance(image, PngImagePlugin.PngImageFile) or image.mode == "RGBA":
+        image.save(buffer, format="PNG")
+    else:
+        image.save(buffer, format="JPEG")
+    return len(buffer.getvalue())
+
+
+def after(config):
+    def run(path: str) -> int:
+        prepared = prepare_image(
+            path,
+            config.IMAGE_MAX_EDGE,
+            config.IMAGE_FORMAT,
+            config.IMAGE_QUALITY,
+            config.IMAGE_MIN_QUALITY,
+            config.IMAGE_TARGET_BYTES,
+        )
+        return len(prepared.data)
+    return run
+
+
+async def through_pool(crop_disease, paths):
+    """ wall time of the first call (pool start up), of each later call one at a time, and of all at once """
+    start = time.perf_counter()
+    await crop_disease._load_model_image(paths[0])
+    cold = (time.perf_counter() - start) * 1000
+
+    sizes, wall = [], []
+    for path in paths:
+        start = time.perf_counter()
+        part, _ = await crop_disease._load_model_image(path)
+        wall.append((time.perf_counter() - start) * 1000)
+        sizes.append(len(part.inline_data.data))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(crop_disease._load_model_image(path) for path in paths))
+    burst = (time.perf_counter() - start) * 1000
+    return sizes, cold, wall, burst
+
+
+def measure(fn, paths):
+    sizes, cpu, wall = [], [], []
+    for path in paths:
+        start, start_wall = time.process_time(), time.perf_counter()
+        sizes.append(fn(path))
+        cpu.append((time.process_time() - start) * 1000)
+        wall.append((time.perf_counter() - start_wall) * 1000)
+    return sizes, cpu, wall
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", help="directory of sample images")
+    parser.add_argument("--count", type=int, default=8, help="synthetic images when no corpus is given")
+    args = parser.parse_args()
+
+    from app.core.config import config
+    from app.services import crop_disease
+    config.IMAGE_PREPROCESS_ENABLED = True
+
+    with tempfile.TemporaryDirectory() as scratch:
+        corpus = args.corpus
+        if not corpus:
+            synthetic_corpus(scratch, args.count)
+            corpus = scratch
+        paths = sorted(
+            os.path.join(corpus, name) for name in os.listdir(corpus) if name.lower().endswith(EXTENSIONS)
+        )
+        uploaded = sum(os.path.getsize(path) for path in paths)
+
+        print(f"{len(paths)} images, {uploaded / 1e6:.1f} MB uploaded, max edge {config.IMAGE_MAX_EDGE} "
+              f"{config.IMAGE_FORMAT} target {config.IMAGE_TARGET_BYTES / 1e3:.0f} kB")
+        in_process = None
+        for label, fn in (("before", before), ("after", after(config))):
+            sizes, cpu, wall = measure(fn, paths)
+            in_process = wall
+            print(f"{label:<7} sent {sum(sizes) / 1e6:8.2f} MB  mean {statistics.mean(sizes) / 1e3:8.0f} kB  "
+                  f"cpu p50 {statistics.median(cpu):7.1f} ms  max {max(cpu):7.1f} ms")
+
+        try:
+            sizes, cold, wall, burst = asyncio.run(through_pool(crop_disease, paths))
+        finally:
+            crop_disease.shutdown_image_pool()
+        overhead = statistics.median(wall) - statistics.median(in_process)
+        print(f"pool    sent {sum(sizes) / 1e6:8.2f} MB  first call {cold:7.1f} ms  "
+              f"wall p50 {statistics.median(wall):7.1f} ms ({overhead:+.1f} ms over in process)  "
+              f"all {len(paths)} at once {burst:7.1f} ms on {config.IMAGE_PREPROCESS_WORKERS} workers")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Micro-benchmark of per-row vs batch parsing of upstream price records.
+
+Builds a synthetic page (100k rows by default, mixed date formats and a few bad rows) and times
+the per-row CropPriceUpdater._parse_to_price_record path against parse_price_batch.
+Nothing is fetched or stored, but importing the app still needs Firestore credentials:
+
+    FIRESTORE_CREDS=.keys/service-account-key.json python -m benchmarks.parse_prices --rows 100000
+"""
+import argparse
+import random
+import time
+
+from app.services.price_parser import parse_price_batch
+from app.services.price_updater import CropPriceUpdater
+
+
+def synthetic_page(rows: int, seed: int = 7):
+    rng = random.Random(seed)
+    markets = [f"Market {i}" for i in range(400)]
+    varieties = ["Dara", "Lokwan", "Sharbati", None]
+    page = []
+    for i in range(rows):
+        day = rng.randint(1, 28)
+        modal = rng.randint(1800, 3200)
+        entry = {
+            "arrival_date": f"2025-07-{day:02d}" if i % 2 else f"{day:02d}/07/2025",
+            "state": "Uttar Pradesh",
+            "market": rng.choice(markets),
+            "commodity": "Wheat",
+            "variety": rng.choice(varieties),
+            "min_price": str(modal - rng.randint(0, 200)),
+            "max_price": str(modal + rng.randint(0, 200)),
+            "modal_price": str(modal),
+        }
+        if i % 997 == 0:
+            entry["modal_price"] = "NR"  # upstream occasionally ships non numeric prices
+        page.append(entry)
+    return page
+
+
+def per_row(updater: CropPriceUpdater, page):
+    parsed, errors = [], 0
+    for entry in page:
+        try:
+            parsed.append(updater._parse_to_price_record(entry).dict())
+        except Exception:
+            errors += 1
+    return len(parsed), errors
+
+
+def batched(page):
+    batch = parse_price_batch(page)
+    return len(batch), len(batch.errors)
+
+
+def timed(label: str, fn, repeat: int):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    print(f"{label:<28} {best * 1000:9.1f} ms  parsed={result[0]} errors={result[1]}")
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    page = synthetic_page(args.rows)
+    updater = CropPriceUpdater(api_key="", resource_id="", commodity="Wheat", state="Uttar Pradesh")
+
+    row_time = timed("per-row PriceRecord", lambda: per_row(updater, page), args.repeat)
+    batch_time = timed("parse_price_batch", lambda: batched(page), args.repeat)
+    dict_time = timed("parse_price_batch+to_dicts", lambda: (len(parse_price_batch(page).to_dicts()), 0), args.repeat)
+
+    print(f"speed-up: {row_time / batch_time:.1f}x columnar, {row_time / dict_time:.1f}x including dict materialisation")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Benchmark bulk loading and range queries on the Postgres price backend.
+
+Needs a database with the price_records migration applied:
+
+    alembic upgrade head
+    FIRESTORE_CREDS=.keys/service-account-key.json python -m benchmarks.postgres_price_load --rows 100000
+
+Rows are loaded in chunks through PostgresPriceStore.store_price_records (COPY plus one upsert per chunk).
+The same chunks are then loaded again, which should report them all unchanged, and a 90 day range and a
+monthly aggregate are timed.
+"""
+import argparse
+import asyncio
+import time
+from datetime import date, timedelta
+
+from app.db.postgres_prices import postgres_price_store
+
+STATE = "Bench State"
+COMMODITY = "Wheat"
+
+
+def synthetic_records(rows: int, markets: int):
+    today = date.today()
+    return [
+        {
+            "date": (today - timedelta(days=i // markets)).strftime("%Y-%m-%d"),
+            "market": f"Market {i % markets}",
+            "commodity": COMMODITY,
+            "state": STATE,
+            "variety": "Dara",
+            "min_price": 2300 + i % 97,
+            "max_price": 2700 + i % 97,
+            "modal_price": 2500 + i % 97,
+        }
+        for i in range(rows)
+    ]
+
+
+async def load(records, chunk_size: int, label: str):
+    start = time.perf_counter()
+    totals = {}
+    for offset in range(0, len(records), chunk_size):
+        result = await postgres_price_store.store_price_records(records[offset:offset + chunk_size])
+        for key, value in result.items():
+            totals[key] = totals.get(key, 0) + value
+    elapsed = time.perf_counter() - start
+    print(f"{label:<10} {len(records) / elapsed:10.0f} rows/s  {totals}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--markets", type=int, default=400)
+    parser.add_argument("--chunk-size", type=int, default=10_000)
+    args = parser.parse_args()
+
+    records = synthetic_records(args.rows, args.markets)
+    await load(records, args.chunk_size, "first")
+    await load(records, args.chunk_size, "reload")
+
+    end = date.today()
+    start = end - timedelta(days=90)
+
+    began = time.perf_counter()
+    rows = await postgres_price_store.get_price_records_range(start.isoformat(), end.isoformat(), STATE, COMMODITY)
+    print(f"range      {(time.perf_counter() - began) * 1000:10.1f} ms  {len(rows)} rows")
+
+    began = time.perf_counter()
+    points = await postgres_price_store.get_price_aggregates(STATE, COMMODITY, start.isoformat(), end.isoformat(), "month")
+    print(f"aggregate  {(time.perf_counter() - began) * 1000:10.1f} ms  {len(points)} months")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
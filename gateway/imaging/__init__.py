@@ -0,0 +1,7 @@
+"""
+CPU bound image work for the crop disease process pool.
+
+Kept outside the app package on purpose: importing anything under app runs app/__init__.py, which
+builds the whole FastAPI app (Firebase, Firestore and Gemini clients, the database engine). Pool
+workers unpickle their functions from here and import nothing else.
+"""
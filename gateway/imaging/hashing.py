@@ -0,0 +1,30 @@
+import hashlib
+from typing import NamedTuple
+
+import numpy as np
+from PIL import Image
+
+
+class ImageFingerprint(NamedTuple):
+    sha256: str  # exact content hash of the file
+    dhash: int  # 64 bit difference hash of the picture
+
+
+def dhash(image: Image.Image, size: int = 8) -> int:
+    """
+    Difference hash: shrink to (size + 1) x size grey pixels and set one bit per pixel brighter than its
+    right hand neighbour. Resends, recompressions and resizes of a photo land within a few bits.
+    """
+    small = image.convert("L").resize((size + 1, size), Image.LANCZOS)
+    pixels = np.asarray(small, dtype=np.int16)
+    bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+def image_fingerprint(data: bytes, image: Image.Image) -> ImageFingerprint:
+    """ fingerprint of an image already read and decoded, `data` being the file's bytes """
+    return ImageFingerprint(hashlib.sha256(data).hexdigest(), dhash(image))
@@ -0,0 +1,60 @@
+import io
+import math
+from typing import NamedTuple
+
+from PIL import Image, ImageOps
+
+from imaging.hashing import ImageFingerprint, image_fingerprint
+
+MIME_TYPES = {"JPEG": "image/jpeg", "WEBP": "image/webp"}
+
+
+class PreparedImage(NamedTuple):
+    data: bytes
+    mime_type: str
+    width: int
+    height: int
+    original_bytes: int
+    fingerprint: ImageFingerprint
+
+
+def prepare_image(
+        image_path: str,
+        max_edge: int,
+        image_format: str = "JPEG",
+        quality: int = 85,
+        min_quality: int = 50,
+        target_bytes: int = 0,
+) -> PreparedImage:
+    """
+    Decode once, apply EXIF orientation, downscale to `max_edge`, drop metadata and re-encode.
+    The analysis cache fingerprint is taken from the same read and decode.
+
+    Quality steps down by 10 until the encoding fits `target_bytes` (0 for no target) or reaches
+    `min_quality`. CPU bound and picklable, meant for a process pool.
+    """
+    image_format = image_format.upper()
+    with open(image_path, "rb") as f:
+        original = f.read()
+    with Image.open(io.BytesIO(original)) as image:
+        # JPEGs decode at a reduced scale when that still covers max_edge, much cheaper than a full decode
+        scale = min(1.0, max_edge / max(image.size))
+        image.draft("RGB", (math.ceil(image.width * scale), math.ceil(image.height * scale)))
+        image.thumbnail((max_edge, max_edge), Image.BICUBIC)
+        # rotating after the downscale moves a quarter of the pixels, the max edge bound is the same either way
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        fingerprint = image_fingerprint(original, image)
+
+        # pixels only, EXIF/GPS and other metadata are not carried into the new encoding
+        quality = max(quality, min_quality)
+        while True:
+            buffer = io.BytesIO()
+            image.save(buffer, format=image_format, quality=quality, optimize=image_format == "JPEG")
+            data = buffer.getvalue()
+            if not target_bytes or len(data) <= target_bytes or quality <= min_quality:
+                break
+            quality = max(min_quality, quality - 10)
+
+        return PreparedImage(data, MIME_TYPES[image_format], image.width, image.height, len(original), fingerprint)
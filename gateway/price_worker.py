@@ -0,0 +1,17 @@
+import asyncio
+
+from app.core.http_client import close_http_client
+from app.services.price_scheduler import price_scheduler
+
+
+async def run_worker():
+    try:
+        await price_scheduler.run_forever()
+    finally:
+        await close_http_client()
+
+
+# entry point for the standalone price ingestion worker
+# run this instead of PRICE_SCHEDULER_ENABLED when the gateway is scaled to several workers
+if __name__ == "__main__":
+    asyncio.run(run_worker())
@@ -0,0 +1,29 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+GATEWAY = Path(__file__).resolve().parent.parent
+
+# importing anything under app builds the whole app, Firebase included, which needs credentials
+os.environ.setdefault("FIRESTORE_CREDS", str(GATEWAY / ".keys" / "service-account-key.json"))
+sys.path.insert(0, str(GATEWAY))
+
+
+class FakeClock:
+    """ stands in for a module's `time`, only moves when a test advances it """
+
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
@@ -0,0 +1,89 @@
+import pytest
+
+from app.utils import cache as cache_module
+from app.utils.cache import TTLCache
+
+
+@pytest.fixture
+def cache(clock, monkeypatch):
+    monkeypatch.setattr(cache_module, "time", clock)
+    return TTLCache(maxsize=2, ttl=10)
+
+
+def test_get_returns_default_on_miss(cache):
+    assert cache.get("missing") is None
+    assert cache.get("missing", "fallback") == "fallback"
+    assert cache.stats()["misses"] == 2
+
+
+def test_set_then_get(cache):
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    assert "a" in cache
+    assert cache.stats()["hits"] == 1
+
+
+def test_entries_expire_after_ttl(cache, clock):
+    cache.set("a", 1)
+    clock.advance(10)
+    assert "a" not in cache
+    assert cache.get("a") is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_per_entry_ttl_overrides_default(cache, clock):
+    cache.set("a", 1, ttl=30)
+    clock.advance(20)
+    assert cache.get("a") == 1
+
+
+def test_least_recently_used_entry_is_evicted(cache):
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_zero_maxsize_disables_caching(clock, monkeypatch):
+    monkeypatch.setattr(cache_module, "time", clock)
+    cache = TTLCache(maxsize=0, ttl=10)
+    cache.set("a", 1)
+    assert len(cache) == 0
+
+
+def test_invalidate_removes_entry(cache):
+    cache.set("a", 1)
+    assert cache.invalidate("a") is True
+    assert cache.get("a") is None
+    assert cache.invalidate("a") is False
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_load_started_before_an_invalidation_is_not_cached(cache):
+    generation = cache.generation("a")
+    cache.invalidate("a")  # a write committed while the load was in flight
+    cache.set("a", "stale", generation=generation)
+    assert cache.get("a") is None
+    assert cache.stats()["stale_loads"] == 1
+
+
+def test_invalidating_a_missing_key_still_bumps_its_generation(cache):
+    generation = cache.generation("a")
+    assert cache.invalidate("a") is False
+    assert cache.generation("a") != generation
+
+
+def test_load_with_current_generation_is_cached(cache):
+    cache.set("a", "fresh", generation=cache.generation("a"))
+    assert cache.get("a") == "fresh"
+
+
+def test_hit_rate(cache):
+    cache.set("a", 1)
+    cache.get("a")
+    cache.get("b")
+    assert cache.stats()["hit_rate"] == 0.5
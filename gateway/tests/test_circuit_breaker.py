@@ -0,0 +1,88 @@
+import pytest
+
+from app.utils import circuit_breaker as breaker_module
+from app.utils.circuit_breaker import CircuitBreaker, CircuitBreakerRegistry, CircuitOpenError
+
+
+@pytest.fixture(autouse=True)
+def fake_time(clock, monkeypatch):
+    monkeypatch.setattr(breaker_module, "time", clock)
+
+
+def open_breaker(breaker: CircuitBreaker):
+    for _ in range(breaker.failure_threshold):
+        breaker.before_call()
+        breaker.record_failure()
+
+
+def test_opens_after_consecutive_failures():
+    breaker = CircuitBreaker("upstream", failure_threshold=3, reset_timeout=30)
+    for _ in range(2):
+        breaker.before_call()
+        breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError) as raised:
+        breaker.before_call()
+    assert raised.value.retry_after == pytest.approx(30)
+    assert breaker.stats()["rejected"] == 1
+
+
+def test_success_resets_the_failure_count():
+    breaker = CircuitBreaker("upstream", failure_threshold=2)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_half_open_after_reset_timeout_lets_one_probe_through(clock):
+    breaker = CircuitBreaker("upstream", failure_threshold=1, reset_timeout=30)
+    open_breaker(breaker)
+    clock.advance(30)
+
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allows_calls()
+    breaker.before_call()
+    assert not breaker.allows_calls()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_successful_probe_closes(clock):
+    breaker = CircuitBreaker("upstream", failure_threshold=1, reset_timeout=30)
+    open_breaker(breaker)
+    clock.advance(30)
+    breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_failed_probe_reopens(clock):
+    breaker = CircuitBreaker("upstream", failure_threshold=5, reset_timeout=30)
+    open_breaker(breaker)
+    clock.advance(30)
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.stats()["opened"] == 2
+
+
+def test_allows_calls_does_not_take_a_probe(clock):
+    breaker = CircuitBreaker("upstream", failure_threshold=1, reset_timeout=30)
+    open_breaker(breaker)
+    clock.advance(30)
+    for _ in range(3):
+        assert breaker.allows_calls()
+    breaker.before_call()
+
+
+def test_registry_uses_per_endpoint_thresholds():
+    registry = CircuitBreakerRegistry(failure_threshold=5, thresholds={"flaky": 2})
+    assert registry.get("flaky").failure_threshold == 2
+    assert registry.get("other").failure_threshold == 5
+    assert registry.get("flaky") is registry.get("flaky")
+    assert set(registry.stats()) == {"flaky", "other"}
@@ -0,0 +1,95 @@
+import io
+
+import numpy as np
+import pytest
+from PIL import Image, ImageFilter
+
+from imaging.hashing import dhash, hamming_distance
+from imaging.preprocess import prepare_image
+
+
+@pytest.fixture
+def photo():
+    rng = np.random.default_rng(0)
+    noise = (rng.random((300, 400, 3)) * 255).astype("uint8")
+    return Image.fromarray(noise).filter(ImageFilter.GaussianBlur(2)).resize((2000, 1500), Image.BICUBIC)
+
+
+def decode(data: bytes) -> Image.Image:
+    return Image.open(io.BytesIO(data))
+
+
+def test_downscales_to_max_edge(tmp_path, photo):
+    path = tmp_path / "leaf.jpg"
+    photo.save(path, quality=95)
+    prepared = prepare_image(str(path), 512)
+    assert (prepared.width, prepared.height) == (512, 384)
+    assert decode(prepared.data).size == (512, 384)
+    assert prepared.mime_type == "image/jpeg"
+    assert prepared.original_bytes == path.stat().st_size
+
+
+def test_small_images_are_not_upscaled(tmp_path, photo):
+    path = tmp_path / "leaf.png"
+    photo.resize((200, 150)).save(path)
+    prepared = prepare_image(str(path), 512)
+    assert (prepared.width, prepared.height) == (200, 150)
+
+
+def test_exif_orientation_is_applied_and_metadata_dropped(tmp_path, photo):
+    exif = Image.Exif()
+    exif[0x0112] = 6  # rotated 90 degrees
+    path = tmp_path / "upright.jpg"
+    photo.save(path, exif=exif)
+    prepared = prepare_image(str(path), 512)
+    image = decode(prepared.data)
+    assert image.size == (384, 512)
+    assert 0x0112 not in image.getexif()
+
+
+def test_quality_steps_down_to_meet_target(tmp_path, photo):
+    path = tmp_path / "leaf.jpg"
+    photo.save(path, quality=95)
+    unbounded = prepare_image(str(path), 1024, quality=95)
+    bounded = prepare_image(str(path), 1024, quality=95, min_quality=30, target_bytes=len(unbounded.data) // 2)
+    assert len(bounded.data) <= len(unbounded.data) // 2
+
+
+def test_min_quality_wins_over_target(tmp_path, photo):
+    path = tmp_path / "leaf.jpg"
+    photo.save(path)
+    at_floor = prepare_image(str(path), 1024, quality=50, min_quality=50)
+    prepared = prepare_image(str(path), 1024, quality=85, min_quality=50, target_bytes=1)
+    assert len(prepared.data) == len(at_floor.data)
+
+
+def test_rgba_is_converted_for_jpeg(tmp_path, photo):
+    path = tmp_path / "leaf.png"
+    photo.convert("RGBA").save(path)
+    assert decode(prepare_image(str(path), 256).data).mode == "RGB"
+
+
+def test_webp_output(tmp_path, photo):
+    path = tmp_path / "leaf.jpg"
+    photo.save(path)
+    prepared = prepare_image(str(path), 256, image_format="webp")
+    assert prepared.mime_type == "image/webp"
+    assert decode(prepared.data).format == "WEBP"
+
+
+def test_fingerprint_matches_resends_of_the_same_photo(tmp_path, photo):
+    original, resent = tmp_path / "original.jpg", tmp_path / "resent.jpg"
+    photo.save(original, quality=95)
+    photo.resize((1000, 750)).save(resent, quality=70)
+
+    first = prepare_image(str(original), 512).fingerprint
+    again = prepare_image(str(original), 256).fingerprint
+    other = prepare_image(str(resent), 512).fingerprint
+    assert first.sha256 == again.sha256
+    assert first.sha256 != other.sha256
+    assert hamming_distance(first.dhash, other.dhash) <= 6
+
+
+def test_dhash_tells_different_pictures_apart(photo):
+    assert hamming_distance(dhash(photo), dhash(photo.transpose(Image.FLIP_LEFT_RIGHT))) > 10
+    assert hamming_distance(0b1011, 0b0001) == 2
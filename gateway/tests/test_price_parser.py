@@ -0,0 +1,100 @@
+from datetime import date
+
+import numpy as np
+import pytest
+
+from app.services.price_parser import PriceBatch, parse_price_batch
+
+
+def entry(**overrides):
+    record = {
+        "arrival_date": "01/02/2024",
+        "market": "Azadpur",
+        "commodity": "Wheat",
+        "variety": "Dara",
+        "min_price": "2000",
+        "max_price": "2400",
+        "modal_price": "2200",
+    }
+    record.update(overrides)
+    return record
+
+
+def reasons(batch: PriceBatch):
+    return [error.split(":")[0] for _, error in batch.errors]
+
+
+def test_empty_page():
+    batch = parse_price_batch([])
+    assert len(batch) == 0
+    assert batch.errors == []
+
+
+def test_parses_both_date_formats():
+    batch = parse_price_batch([entry(arrival_date="01/02/2024"), entry(arrival_date="2024-02-03", market="Okhla")])
+    assert batch.dates.astype(str).tolist() == ["2024-02-01", "2024-02-03"]
+    assert batch.errors == []
+
+
+def test_prices_are_int64():
+    batch = parse_price_batch([entry(min_price=2000, max_price="2400", modal_price="2200.0")])
+    assert batch.modal_price.dtype == np.int64
+    assert (batch.min_price.tolist(), batch.max_price.tolist(), batch.modal_price.tolist()) == ([2000], [2400], [2200])
+
+
+@pytest.mark.parametrize("overrides, reason", [
+    ({"market": ""}, "missing market"),
+    ({"commodity": None}, "missing commodity"),
+    ({"arrival_date": "Feb 1 2024"}, "unrecognized date format"),
+    ({"modal_price": "NR"}, "invalid modal_price"),
+    ({"min_price": None}, "invalid min_price"),
+    ({"modal_price": "1200.7"}, "non-integral modal_price"),
+    ({"max_price": "1e20"}, "out of range max_price"),
+    ({"min_price": "-1e19"}, "out of range min_price"),
+])
+def test_bad_rows_become_errors(overrides, reason):
+    batch = parse_price_batch([entry(market="Okhla"), entry(**overrides)])
+    assert len(batch) == 1
+    assert batch.rows.tolist() == [0]
+    assert reasons(batch) == [reason]
+    assert batch.errors[0][0] == 1
+
+
+def test_no_overflow_warning_on_huge_prices():
+    with np.errstate(all="raise"):
+        batch = parse_price_batch([entry(modal_price="1e20")])
+    assert len(batch) == 0
+
+
+def test_all_rows_invalid():
+    batch = parse_price_batch([entry(market=""), entry(modal_price="x")])
+    assert len(batch) == 0
+    assert len(batch.errors) == 2
+
+
+def test_names_are_factorised():
+    batch = parse_price_batch([
+        entry(market="Azadpur"), entry(market="Okhla"), entry(market="Azadpur", variety=None),
+    ])
+    assert len(batch.markets) == 2
+    assert batch.market_names().tolist() == ["Azadpur", "Okhla", "Azadpur"]
+    assert batch.variety_names().tolist() == ["Dara", "Dara", None]
+
+
+def test_to_dicts_and_to_records():
+    batch = parse_price_batch([entry()])
+    assert batch.to_dicts(state="Delhi") == [{
+        "date": "2024-02-01", "market": "Azadpur", "commodity": "Wheat", "variety": "Dara",
+        "min_price": 2000, "max_price": 2400, "modal_price": 2200, "state": "Delhi",
+    }]
+    record = batch.to_records()[0]
+    assert record.date == date(2024, 2, 1)
+    assert record.modal_price == 2200
+
+
+def test_filter_keeps_lookups_and_errors():
+    batch = parse_price_batch([entry(market="Azadpur"), entry(market="Okhla"), entry(market="")])
+    kept = batch.filter(batch.market_names() == "Okhla")
+    assert kept.market_names().tolist() == ["Okhla"]
+    assert kept.rows.tolist() == [1]
+    assert kept.errors == batch.errors
@@ -0,0 +1,116 @@
+import warnings
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+from app.services.price_parser import parse_price_batch
+from app.services.price_screener import (
+    MIN_ABOVE_MAX, MODAL_OUT_OF_RANGE, MODAL_OUTLIER, SCALE_ERROR, ZERO_PRICE, PriceScreener, group_median,
+)
+from app.services.price_store import ColumnarPriceStore
+
+START = date(2024, 2, 1)
+STATE = "Delhi"
+
+
+class HistoryStore(ColumnarPriceStore):
+    """ history comes from what the test ingests, never from storage """
+
+    async def ensure_loaded(self, state, commodity):
+        return self.partition(state, commodity)
+
+
+def page(day: int, prices: dict, **overrides):
+    arrival = (START + timedelta(days=day)).strftime("%Y-%m-%d")
+    return parse_price_batch([
+        {"arrival_date": arrival, "market": market, "commodity": "Wheat", "variety": None,
+         "min_price": modal - 100, "max_price": modal + 100, "modal_price": modal, **overrides}
+        for market, modal in prices.items()
+    ])
+
+
+@pytest.fixture
+def store():
+    store = HistoryStore()
+    for day in range(14):
+        store.ingest_batch(STATE, page(day, {"A": 2000, "B": 2000, "C": 2000, "D": 2000}))
+    return store
+
+
+@pytest.fixture
+def screener(store):
+    return PriceScreener(store)
+
+
+async def screen(screener, store, day, prices, **overrides):
+    passed, quarantined = await screener.screen(STATE, page(day, prices, **overrides))
+    store.ingest_batch(STATE, passed)
+    return {record["market"]: record["reason"] for record in quarantined}
+
+
+def test_group_median():
+    medians, counts = group_median(np.array([0, 0, 0, 2]), np.array([3.0, 1.0, 2.0, 5.0]), 3)
+    assert medians[0] == 2.0 and np.isnan(medians[1]) and medians[2] == 5.0
+    assert counts.tolist() == [3, 0, 1]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("overrides, reason", [
+    ({"modal_price": 0}, ZERO_PRICE),
+    ({"min_price": 2500, "max_price": 2400}, MIN_ABOVE_MAX),
+    ({"min_price": 1000, "max_price": 1500}, MODAL_OUT_OF_RANGE),
+])
+async def test_rule_checks(screener, store, overrides, reason):
+    assert await screen(screener, store, 14, {"A": 2000}, **overrides) == {"A": reason}
+
+
+@pytest.mark.asyncio
+async def test_ordinary_move_passes(screener, store):
+    assert await screen(screener, store, 14, {"A": 2400, "B": 2000, "C": 2000, "D": 2000}) == {}
+
+
+@pytest.mark.asyncio
+async def test_large_move_on_stable_history_is_flagged(screener, store):
+    assert await screen(screener, store, 14, {"A": 3200, "B": 2000, "C": 2000, "D": 2000}) == {"A": MODAL_OUTLIER}
+
+
+@pytest.mark.asyncio
+async def test_repeated_move_is_confirmed(screener, store):
+    prices = {"A": 6000, "B": 2000, "C": 2000, "D": 2000}
+    assert await screen(screener, store, 14, prices) == {"A": MODAL_OUTLIER}
+    assert await screen(screener, store, 15, prices) == {}
+    assert await screen(screener, store, 16, {**prices, "A": 6100}) == {}
+    # the level keeps passing while the market's history catches up with it
+    assert screener.stats()["confirmed_moves"] == 2
+
+
+@pytest.mark.asyncio
+async def test_scale_errors_are_never_confirmed(screener, store):
+    prices = {"A": 20000, "B": 2000, "C": 2000, "D": 2000}
+    assert await screen(screener, store, 14, prices) == {"A": SCALE_ERROR}
+    assert await screen(screener, store, 15, prices) == {"A": SCALE_ERROR}
+
+
+@pytest.mark.asyncio
+async def test_market_wide_move_passes(screener, store):
+    assert await screen(screener, store, 14, {"A": 5000, "B": 5000, "C": 5000, "D": 5100}) == {}
+
+
+@pytest.mark.asyncio
+async def test_unscorable_rows_raise_no_warnings(screener, store):
+    # a zero price scores as log10(0), a market without history as NaN
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        assert await screen(screener, store, 14, {"A": 0, "B": 2000, "New": 90000}) == {"A": ZERO_PRICE}
+
+
+@pytest.mark.asyncio
+async def test_quarantine_records(screener, store):
+    passed, quarantined = await screener.screen(STATE, page(14, {"A": 3200, "B": 2000}))
+    assert passed.market_names().tolist() == ["B"]
+    record = quarantined[0]
+    assert record["state"] == STATE
+    assert record["reference_median"] == 2000.0
+    assert record["page_row"] == 0
+    assert screener.stats()["quarantined"] == 1
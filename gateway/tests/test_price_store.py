@@ -0,0 +1,103 @@
+import numpy as np
+import pytest
+
+from app.services.price_parser import parse_price_batch
+from app.services.price_store import ColumnarPriceStore
+
+
+def page(day: str, prices: dict, commodity: str = "Wheat"):
+    return parse_price_batch([
+        {"arrival_date": day, "market": market, "commodity": commodity, "variety": None,
+         "min_price": modal - 100, "max_price": modal + 100, "modal_price": modal}
+        for market, modal in prices.items()
+    ])
+
+
+@pytest.fixture
+def store():
+    store = ColumnarPriceStore()
+    store.ingest_batch("Delhi", page("2024-02-01", {"Azadpur": 2000, "Okhla": 2100}))
+    store.ingest_batch("Delhi", page("2024-02-02", {"Azadpur": 2200, "Okhla": 1900, "Narela": 2500}))
+    return store
+
+
+def test_rows_stay_sorted_by_date_and_market(store):
+    partition = store.partition("delhi", "WHEAT ")
+    assert len(partition) == 5
+    assert np.all(np.diff(partition.dates.astype(np.int64)) >= 0)
+
+
+def test_reingesting_a_day_replaces_its_rows(store):
+    store.ingest_batch("Delhi", page("2024-02-02", {"Azadpur": 2300}))
+    partition = store.partition("Delhi", "Wheat")
+    assert len(partition) == 5
+    assert store.spread(partition, "2024-02-02")["max_modal_price"] == 2500
+    assert store.day_over_day(partition, "2024-02-02", "azadpur")["markets"][0]["modal_price"] == 2300
+
+
+def test_batches_are_split_by_commodity():
+    store = ColumnarPriceStore()
+    batch = parse_price_batch([
+        {"arrival_date": "2024-02-01", "market": "Azadpur", "commodity": commodity, "variety": None,
+         "min_price": 1, "max_price": 3, "modal_price": 2}
+        for commodity in ("Wheat", "Onion")
+    ])
+    store.ingest_batch("Delhi", batch)
+    assert len(store.partition("Delhi", "Wheat")) == 1
+    assert len(store.partition("Delhi", "Onion")) == 1
+    assert store.stats() == {"partitions": 2, "rows": 2}
+
+
+def test_ingest_records_from_storage():
+    store = ColumnarPriceStore()
+    store.ingest_records("Delhi", "Wheat", [
+        {"date": "2024-02-01", "market": "Azadpur", "min_price": 1, "max_price": 3, "modal_price": 2},
+    ])
+    assert store.partition("Delhi", "Wheat").latest_date() == np.datetime64("2024-02-01")
+
+
+def test_moving_average(store):
+    result = store.moving_average(store.partition("Delhi", "Wheat"), window=2)
+    assert result["end_date"] == "2024-02-02"
+    # mean of the daily means: (2050 + 2200) / 2
+    assert result["overall"] == 2125.0
+    averages = {market["market"]: market["average_modal_price"] for market in result["markets"]}
+    assert averages == {"Azadpur": 2100.0, "Okhla": 2000.0, "Narela": 2500.0}
+
+
+def test_moving_average_for_one_market(store):
+    result = store.moving_average(store.partition("Delhi", "Wheat"), window=2, market="okhla")
+    assert [market["market"] for market in result["markets"]] == ["Okhla"]
+
+
+def test_spread(store):
+    result = store.spread(store.partition("Delhi", "Wheat"), "2024-02-02")
+    assert result["market_count"] == 3
+    assert result["modal_spread"] == 600
+    assert result["cheapest_market"] == "Okhla"
+    assert result["most_expensive_market"] == "Narela"
+
+
+def test_day_over_day(store):
+    result = store.day_over_day(store.partition("Delhi", "Wheat"), "2024-02-02")
+    changes = {market["market"]: market for market in result["markets"]}
+    assert changes["Azadpur"]["change"] == 200
+    assert changes["Azadpur"]["change_pct"] == 10.0
+    assert changes["Azadpur"]["previous_date"] == "2024-02-01"
+    assert changes["Narela"]["previous_modal_price"] is None
+
+
+def test_top_markets(store):
+    partition = store.partition("Delhi", "Wheat")
+    cheapest = store.top_markets(partition, 2, cheapest=True)
+    dearest = store.top_markets(partition, 1, cheapest=False)
+    assert [market["market"] for market in cheapest["markets"]] == ["Okhla", "Azadpur"]
+    assert [market["market"] for market in dearest["markets"]] == ["Narela"]
+
+
+def test_empty_partition():
+    store = ColumnarPriceStore()
+    partition = store.partition("Delhi", "Wheat")
+    assert store.spread(partition) == {"date": None, "market_count": 0}
+    assert store.moving_average(partition, 7)["markets"] == []
+    assert store.top_markets(partition, 3)["markets"] == []
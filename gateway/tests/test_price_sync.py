@@ -0,0 +1,47 @@
+import base64
+import json
+from datetime import datetime, timezone
+
+import pytest
+
+from app.services.price_sync import InvalidCursorError, decode_cursor, encode_cursor
+
+SINCE = datetime(2024, 2, 1, tzinfo=timezone.utc)
+
+
+def raw_cursor(payload) -> str:
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+
+def test_round_trip_of_timestamp_and_xid_positions():
+    watermarks = {
+        "delhi/wheat": (datetime(2024, 2, 3, 4, 5, 6, tzinfo=timezone.utc), "2024-02-03_azadpur", SINCE),
+        "delhi/onion": (123456789, "2024-02-03_okhla", SINCE),
+        "delhi/potato": (SINCE, "", SINCE),
+    }
+    assert decode_cursor(encode_cursor(watermarks)) == watermarks
+
+
+def test_cursor_is_url_safe():
+    cursor = encode_cursor({"delhi/wheat": (2 ** 40, "id?&/", SINCE)})
+    assert "=" not in cursor and "+" not in cursor and "/" not in cursor
+
+
+def test_no_cursor():
+    assert decode_cursor(None) == {}
+    assert decode_cursor("") == {}
+
+
+def test_cursor_without_lower_bound_still_decodes():
+    assert decode_cursor(raw_cursor({"v": 1, "w": {"delhi/wheat": [5, "id"]}})) == {"delhi/wheat": (5, "id", None)}
+
+
+@pytest.mark.parametrize("cursor", [
+    "not base64 json",
+    raw_cursor({"v": 99, "w": {}}),
+    raw_cursor({"v": 1}),
+    raw_cursor({"v": 1, "w": {"delhi/wheat": ["not a date", "id", None]}}),
+])
+def test_invalid_cursors(cursor):
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(cursor)
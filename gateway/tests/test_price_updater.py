@@ -0,0 +1,84 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.core.config import config
+from app.services.price_updater import CropPriceUpdater
+from app.utils.circuit_breaker import CircuitOpenError
+
+
+class Response:
+    def __init__(self, page):
+        self.page = page
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.page
+
+
+def paged(total_records: int, with_total: bool):
+    """ a _get serving `total_records` records in pages of the requested limit """
+    calls = []
+
+    async def get(url, params):
+        calls.append(params["offset"])
+        end = min(total_records, params["offset"] + params["limit"])
+        page = {"records": [{"i": i} for i in range(params["offset"], end)]}
+        if with_total:
+            page["total"] = total_records
+        return Response(page)
+
+    return get, calls
+
+
+async def collect(updater):
+    return [entry async for entry in updater.stream_records()]
+
+
+@pytest.fixture
+def updater(monkeypatch):
+    monkeypatch.setattr(config, "PRICE_API_PAGE_SIZE", 2)
+    return CropPriceUpdater("SECRET-KEY", "resource", "Wheat", "Delhi", days_back=3)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("records, with_total, pages", [
+    (5, True, 3),
+    (4, True, 2),
+    (5, False, 3),
+    (4, False, 3),  # a full last page can't be told apart from a partial result without a total
+    (0, False, 1),
+])
+async def test_pagination(updater, records, with_total, pages):
+    updater._get, calls = paged(records, with_total)
+    assert len(await collect(updater)) == records
+    assert len(calls) == pages
+
+
+@pytest.mark.asyncio
+async def test_failed_days_are_skipped(updater):
+    failures = iter([CircuitOpenError("resource", 5), asyncio.TimeoutError(), httpx.ConnectError("down")])
+
+    async def stream(fetch_date):
+        error = next(failures, None)
+        if error is not None:
+            raise error
+        yield {"arrival_date": fetch_date}
+
+    updater.stream_records = stream
+    assert len(await updater.fetch_multi_day_data()) == 1
+
+
+@pytest.mark.asyncio
+async def test_debug_log_does_not_print_the_api_key(updater, capsys):
+    async def refresh(fetch_date):
+        return {"total": 0, "success": 0}
+
+    updater.refresh = refresh
+    await updater.update_daily_prices()
+    output = capsys.readouterr().out
+    assert "filters[commodity]" in output
+    assert "SECRET-KEY" not in output
@@ -0,0 +1,42 @@
+import asyncio
+import time
+
+import pytest
+
+from app.utils.rate_limiter import TokenBucket
+
+
+@pytest.mark.asyncio
+async def test_burst_is_served_immediately():
+    bucket = TokenBucket(rate=1, burst=5)
+    start = time.monotonic()
+    for _ in range(5):
+        await bucket.acquire()
+    assert time.monotonic() - start < 0.05
+
+
+@pytest.mark.asyncio
+async def test_waits_for_refill_once_the_burst_is_spent():
+    bucket = TokenBucket(rate=20, burst=1)
+    start = time.monotonic()
+    for _ in range(3):
+        await bucket.acquire()
+    # two refills at 20 tokens per second
+    assert time.monotonic() - start >= 0.09
+
+
+@pytest.mark.asyncio
+async def test_concurrent_callers_are_paced():
+    bucket = TokenBucket(rate=50, burst=1)
+    start = time.monotonic()
+    await asyncio.gather(*(bucket.acquire() for _ in range(6)))
+    assert time.monotonic() - start >= 0.09
+
+
+@pytest.mark.asyncio
+async def test_zero_rate_disables_limiting():
+    bucket = TokenBucket(rate=0, burst=1)
+    start = time.monotonic()
+    for _ in range(100):
+        await bucket.acquire()
+    assert time.monotonic() - start < 0.05
@@ -0,0 +1,88 @@
+import asyncio
+
+import pytest
+
+from app.utils.single_flight import SingleFlight
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    calls = 0
+    release = asyncio.Event()
+
+    async def work():
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        return "result"
+
+    waiters = [asyncio.ensure_future(flight.do("key", work)) for _ in range(5)]
+    await asyncio.sleep(0)
+    release.set()
+    assert await asyncio.gather(*waiters) == ["result"] * 5
+    assert calls == 1
+    assert flight.stats()["coalesced"] == 4
+    assert flight.stats()["inflight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_different_keys_run_separately():
+    flight = SingleFlight()
+
+    async def work(value):
+        await asyncio.sleep(0)
+        return value
+
+    assert await asyncio.gather(flight.do("a", lambda: work(1)), flight.do("b", lambda: work(2))) == [1, 2]
+    assert flight.stats()["executions"] == 2
+
+
+@pytest.mark.asyncio
+async def test_failures_are_shared_but_not_kept():
+    flight = SingleFlight(window=60)
+    attempts = 0
+
+    async def failing():
+        nonlocal attempts
+        attempts += 1
+        raise RuntimeError("upstream down")
+
+    with pytest.raises(RuntimeError):
+        await flight.do("key", failing)
+    with pytest.raises(RuntimeError):
+        await flight.do("key", failing)
+    assert attempts == 2
+
+
+@pytest.mark.asyncio
+async def test_results_within_the_window_are_reused():
+    flight = SingleFlight(window=60)
+    calls = 0
+
+    async def work():
+        nonlocal calls
+        calls += 1
+        return calls
+
+    assert await flight.do("key", work) == 1
+    await asyncio.sleep(0)  # let the done callback record the result
+    assert await flight.do("key", work) == 1
+    assert flight.stats()["recent_hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_cancelled_leader_does_not_cancel_the_work():
+    flight = SingleFlight()
+    release = asyncio.Event()
+
+    async def work():
+        await release.wait()
+        return "done"
+
+    leader = asyncio.ensure_future(flight.do("key", work))
+    follower = asyncio.ensure_future(flight.do("key", work))
+    await asyncio.sleep(0)
+    leader.cancel()
+    release.set()
+    assert await follower == "done"